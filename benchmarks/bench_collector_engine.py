@@ -0,0 +1,48 @@
+"""
+Misura durata del ciclo e latenza per ticker del motore di raccolta concorrente
+al variare del numero di worker, contro un finto yfinance locale.
+
+    python benchmarks/bench_collector_engine.py --tickers 2000 --workers 1 4 8 16 --rate 50
+"""
+import argparse
+
+from bench_utils import add_service_paths, print_report
+from fake_yfinance import FakeYFinance
+
+add_service_paths('data_collector')
+
+from circuit_breaker import BreakerRegistry  # noqa: E402
+from engine import CollectionEngine  # noqa: E402
+from price_source import BatchYFinancePriceSource, YFinancePriceSource  # noqa: E402
+from rate_limiter import HostRateLimiter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=0, help="richieste/s per host, 0 = illimitato")
+    parser.add_argument('--burst', type=float, default=10)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:05d}" for i in range(args.tickers)]
+    results = []
+    for workers in args.workers:
+        fake = FakeYFinance(args.latency, seed=1)
+        if args.batch_size > 1:
+            source = BatchYFinancePriceSource(args.batch_size, yf_module=fake)
+        else:
+            source = YFinancePriceSource(yf_module=fake)
+        rate_limiter = HostRateLimiter(args.rate, args.burst) if args.rate > 0 else None
+        engine = CollectionEngine(source, BreakerRegistry(), max_workers=workers, rate_limiter=rate_limiter)
+        summary = engine.collect(tickers).summary()
+        summary['workers'] = workers
+        summary['upstream_calls'] = fake.calls
+        results.append(summary)
+    print_report({'tickers': args.tickers, 'batch_size': args.batch_size, 'rate': args.rate, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Benchmark end-to-end offline: server gRPC, data collector e cleaner girano nello
+stesso processo contro un finto yfinance (latenza ed errori configurabili) e un
+database locale. Un gruppo di client esegue un mix di RPC per la durata indicata.
+Il report JSON contiene throughput, percentili di latenza per RPC e numero di query
+SQL per componente, da confrontare tra versioni.
+
+Usa DATABASE_URL se impostata, altrimenti un database SQLite temporaneo.
+I parametri possono arrivare da un file di scenario JSON (stessi nomi delle opzioni,
+con '_' al posto di '-'); le opzioni da riga di comando hanno la precedenza.
+
+    python benchmarks/bench_end_to_end.py --scenario benchmarks/scenarios/baseline.json
+    python benchmarks/bench_end_to_end.py --users 500 --tickers 50 --duration 30 \\
+        --mix GetLatestValue=60,GetAverageValue=30,LoginUser=5,UpdateUser=5 --output e2e.json
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent import futures
+
+from bench_utils import add_service_paths, percentile, print_report
+from fake_yfinance import FakeYFinance
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ.setdefault('METRICS_PORT', '0')
+
+add_service_paths('client', 'server', 'data_collector', 'cleaner')
+
+import grpc  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from common.database import SessionLocal, engine  # noqa: E402
+from common.models import FinancialData, User  # noqa: E402
+from common.rollups import RollupPipeline  # noqa: E402
+from common.symbol_catalog import SymbolCatalog  # noqa: E402
+from change_detector import CHANGE_DETECTION, ChangeDetector  # noqa: E402
+from circuit_breaker import BreakerRegistry  # noqa: E402
+from cleaner import IncrementalRetention  # noqa: E402
+from collector import ROWS_WRITTEN, collect_and_write  # noqa: E402
+from engine import CollectionEngine  # noqa: E402
+from metrics_interceptor import MetricsInterceptor  # noqa: E402
+from price_source import BatchYFinancePriceSource, YFinancePriceSource  # noqa: E402
+import server  # noqa: E402
+import service_pb2_grpc  # noqa: E402
+from workload import RequestFactory  # noqa: E402
+
+DEFAULTS = {
+    'users': 200,
+    'tickers': 20,
+    'clients': 16,
+    'duration': 20.0,
+    'mix': 'GetLatestValue=50,GetAverageValue=30,LoginUser=10,UpdateUser=4,RegisterUser=3,DeleteUser=2,GetLatestValues=1',
+    'duplicate_rate': 0.05,
+    'server_workers': 16,
+    'collect_interval': 5.0,
+    'cleaner_interval': 5.0,
+    'retention_depth': 20,
+    'latency': 0.02,
+    'error_rate': 0.0,
+    'batch_size': 1,
+    'collector_workers': 8,
+    'seed': 1,
+}
+
+
+class QueryCounter:
+    """
+    Conta le istruzioni SQL eseguite, per componente (dal nome del thread) e per tipo.
+    """
+    COMPONENTS = ('server', 'price-hub', 'collector', 'cleaner')
+
+    def __init__(self, db_engine):
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        event.listen(db_engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        name = threading.current_thread().name
+        component = next((c for c in self.COMPONENTS if name.startswith(c)), 'other')
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        with self.lock:
+            self.counts[(component, kind)] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+    def report(self, elapsed):
+        with self.lock:
+            counts = dict(self.counts)
+        by_component = collections.defaultdict(dict)
+        for (component, kind), count in sorted(counts.items()):
+            by_component[component][kind] = count
+        total = sum(counts.values())
+        return {'total': total, 'per_second': round(total / elapsed, 1), 'by_component': by_component}
+
+
+class BackgroundLoop(threading.Thread):
+    def __init__(self, name, interval, step):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.step = step
+        self.stopped = threading.Event()
+        self.runs = 0
+        self.errors = 0
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.step()
+                self.runs += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Errore in {self.name}: {e}")
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Collector:
+    """
+    Un ciclo del data collector (lettura dei ticker, poi collect_and_write del servizio)
+    con il finto yfinance. Il catalogo dei simboli resta solo in memoria.
+    """
+    def __init__(self, params):
+        self.fake = FakeYFinance(params['latency'], error_rate=params['error_rate'], seed=params['seed'])
+        if params['batch_size'] > 1:
+            source = BatchYFinancePriceSource(params['batch_size'], yf_module=self.fake)
+        else:
+            source = YFinancePriceSource(yf_module=self.fake)
+        self.engine = CollectionEngine(source, BreakerRegistry(), max_workers=params['collector_workers'])
+        self.detector = ChangeDetector() if CHANGE_DETECTION else None
+        self.symbols = SymbolCatalog(path='')
+        self.rows_written_start = ROWS_WRITTEN.default.value
+        self.cycle_seconds = []
+
+    @property
+    def rows_written(self):
+        return int(ROWS_WRITTEN.default.value - self.rows_written_start)
+
+    def run_cycle(self):
+        start = time.perf_counter()
+        with SessionLocal() as session:
+            tickers = [t[0] for t in session.query(User.ticker).distinct()]
+        collect_and_write(self.engine, self.detector, self.symbols, tickers)
+        self.cycle_seconds.append(time.perf_counter() - start)
+
+
+class Cleaner:
+    def __init__(self, depth):
+        self.retention = IncrementalRetention(depth=depth, rollups=RollupPipeline(SessionLocal))
+        self.deleted = 0
+
+    def run_once(self):
+        self.deleted += self.retention.run_once()
+
+
+def create_workload(params):
+    tickers = [f"T{i:04d}" for i in range(params['tickers'])]
+    return RequestFactory(params['mix'], params['users'], tickers, params['duplicate_rate'],
+                          user_prefix='user', domain='bench.it')
+
+
+def seed_users(workload):
+    with SessionLocal() as session:
+        session.query(User).filter(User.email.like(f"%@{workload.domain}")).delete(synchronize_session=False)
+        session.query(FinancialData).filter(FinancialData.ticker.like('T____')).delete(synchronize_session=False)
+        session.add_all(
+            User(email=workload.user_email(i), ticker=workload.tickers[i % len(workload.tickers)])
+            for i in range(workload.users)
+        )
+        session.commit()
+
+
+def run_clients(stub, workload, params):
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + params['duration']
+
+    def client(index):
+        rng = random.Random(params['seed'] * 1000 + index)
+        local_latencies = collections.defaultdict(list)
+        local_errors = collections.Counter()
+        while time.perf_counter() < deadline:
+            method, request = workload.next_request(rng)
+            call = getattr(stub, method)
+            start = time.perf_counter()
+            try:
+                call(request, timeout=10)
+                local_latencies[method].append(time.perf_counter() - start)
+            except grpc.RpcError as e:
+                local_errors[f"{method}:{e.code().name}"] += 1
+        with lock:
+            for method, values in local_latencies.items():
+                latencies[method].extend(values)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(params['clients'])]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(values, elapsed):
+    return {
+        'requests': len(values),
+        'rps': round(len(values) / elapsed, 1),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p90_ms': round(percentile(values, 90) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+
+def run_scenario(params):
+    queries = QueryCounter(engine)
+    workload = create_workload(params)
+    seed_users(workload)
+
+    service = server.UserService()
+    service.latest_cache.ttl = params['collect_interval']
+    grpc_server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=params['server_workers'], thread_name_prefix='server'),
+        interceptors=[MetricsInterceptor()],
+    )
+    service_pb2_grpc.add_UserServiceServicer_to_server(service, grpc_server)
+    port = grpc_server.add_insecure_port('127.0.0.1:0')
+    grpc_server.start()
+
+    collector = Collector(params)
+    cleaner = Cleaner(params['retention_depth'])
+    # Un primo ciclo prima del carico, così le letture trovano dati.
+    collector.run_cycle()
+    loops = [
+        BackgroundLoop('collector', params['collect_interval'], collector.run_cycle),
+        BackgroundLoop('cleaner', params['cleaner_interval'], cleaner.run_once),
+    ]
+    queries.reset()
+    for loop in loops:
+        loop.start()
+    try:
+        with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+            stub = service_pb2_grpc.UserServiceStub(channel)
+            latencies, errors, elapsed = run_clients(stub, workload, params)
+    finally:
+        for loop in loops:
+            loop.stop()
+        grpc_server.stop(0)
+        service.price_hub.stop()
+
+    merged = [value for values in latencies.values() for value in values]
+    return {
+        'scenario': params,
+        'dialect': engine.dialect.name,
+        'elapsed_seconds': round(elapsed, 3),
+        'overall': summarize(merged, elapsed),
+        'rpc': {method: summarize(values, elapsed) for method, values in sorted(latencies.items())},
+        'errors': dict(errors),
+        'queries': queries.report(elapsed),
+        'collector': {
+            'cycles': loops[0].runs + 1,
+            'errors': loops[0].errors,
+            'rows_written': collector.rows_written,
+            'upstream_calls': collector.fake.calls,
+            'cycle_p50_ms': round(percentile(collector.cycle_seconds, 50) * 1000, 3),
+        },
+        'cleaner': {'runs': loops[1].runs, 'errors': loops[1].errors, 'deleted_rows': cleaner.deleted},
+        'caches': {
+            'latest_cache': service.latest_cache.stats(),
+            'user_cache': service.user_cache.stats(),
+            'rolling_averages': service.rolling_averages.stats(),
+            'idempotency_requests': service.in_progress.stats(),
+        },
+    }
+
+
+def parse_params():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenario', help="file JSON con i parametri dello scenario")
+    parser.add_argument('--output', help="scrive il report anche su questo file")
+    for name, default in DEFAULTS.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=type(default), default=None)
+    args = parser.parse_args()
+
+    params = dict(DEFAULTS)
+    if args.scenario:
+        with open(args.scenario) as scenario_file:
+            scenario = json.load(scenario_file)
+        unknown = set(scenario) - set(DEFAULTS)
+        if unknown:
+            parser.error(f"parametri sconosciuti nello scenario: {sorted(unknown)}")
+        params.update(scenario)
+    params.update({name: getattr(args, name) for name in DEFAULTS if getattr(args, name) is not None})
+    return params, args.output
+
+
+def main():
+    params, output = parse_params()
+    report = run_scenario(params)
+    print_report(report)
+    if output:
+        with open(output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
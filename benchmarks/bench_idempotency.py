@@ -0,0 +1,91 @@
+"""
+Confronta gli store di idempotenza (memory, sharded, database) sotto contesa:
+più thread controllano e registrano request_id, una parte dei quali duplicati,
+passando per InProgressRequests come fanno le RPC di scrittura del server.
+Usa DATABASE_URL se impostata, altrimenti un database SQLite temporaneo.
+
+    python benchmarks/bench_idempotency.py --threads 16 --ops 2000 --duplicates 0.2
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+from bench_utils import add_service_paths, percentile, print_report
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+add_service_paths('server')
+
+from common.database import SessionLocal, engine  # noqa: E402
+from common.migrations import init_db  # noqa: E402
+from idempotency import InProgressRequests, create_idempotency_store  # noqa: E402
+
+
+def run(store, threads, ops, duplicates):
+    in_progress = InProgressRequests(store)
+    issued = []
+    issued_lock = threading.Lock()
+    latencies = [[] for _ in range(threads)]
+    hits = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        rng = random.Random(index)
+        barrier.wait()
+        for _ in range(ops):
+            with issued_lock:
+                duplicate = issued and rng.random() < duplicates
+                request_id = rng.choice(issued) if duplicate else str(uuid.uuid4())
+                if not duplicate:
+                    issued.append(request_id)
+            start = time.perf_counter()
+            response, flight = in_progress.begin(request_id)
+            if flight is None:
+                hits[index] += 1
+            else:
+                in_progress.complete(request_id, flight, "Registrazione avvenuta con successo!")
+            latencies[index].append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    merged = [value for values in latencies for value in values]
+    return {
+        'ops_per_second': round(len(merged) / elapsed, 1),
+        'duplicate_hits': sum(hits),
+        'p50_ms': round(percentile(merged, 50), 4),
+        'p99_ms': round(percentile(merged, 99), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=2000, help="operazioni per thread")
+    parser.add_argument('--duplicates', type=float, default=0.2, help="frazione di request_id ripetuti")
+    parser.add_argument('--stores', default='memory,sharded,database')
+    args = parser.parse_args()
+
+    init_db(engine)
+    results = {}
+    for kind in args.stores.split(','):
+        ops = args.ops if kind != 'database' else max(1, args.ops // 10)
+        store = create_idempotency_store(kind, SessionLocal, maxsize=args.threads * args.ops)
+        results[kind] = run(store, args.threads, ops, args.duplicates)
+        results[kind]['ops_per_thread'] = ops
+    print_report({'dialect': engine.dialect.name, 'threads': args.threads,
+                  'duplicates': args.duplicates, 'stores': results})
+
+
+if __name__ == '__main__':
+    main()
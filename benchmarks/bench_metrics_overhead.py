@@ -0,0 +1,88 @@
+"""
+Costo della registrazione delle metriche sul percorso critico: operazioni singole
+(counter, istogramma) e latenza di una RPC con e senza MetricsInterceptor.
+Usa DATABASE_URL se impostata, altrimenti un database SQLite temporaneo.
+
+    python benchmarks/bench_metrics_overhead.py --operations 200000 --rpcs 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent import futures
+
+from bench_utils import add_service_paths, percentile, print_report
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ.setdefault('PRICE_FEED_INTERVAL', '3600')
+
+add_service_paths('server')
+
+import grpc  # noqa: E402
+
+from common import metrics  # noqa: E402
+from metrics_interceptor import MetricsInterceptor  # noqa: E402
+import server  # noqa: E402
+import service_pb2  # noqa: E402
+import service_pb2_grpc  # noqa: E402
+
+
+def per_operation(operations):
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter('bench_requests', "", ('method', 'code')))
+    histogram = registry.register(metrics.Histogram('bench_seconds', "", ('method',)))
+    child = histogram.labels('LoginUser')
+    cases = {
+        'counter_labels_inc': lambda: counter.labels('LoginUser', 'OK').inc(),
+        'histogram_labels_observe': lambda: histogram.labels('LoginUser').observe(0.003),
+        'histogram_child_observe': lambda: child.observe(0.003),
+        'baseline_noop': lambda: None,
+    }
+    results = {}
+    for name, operation in cases.items():
+        start = time.perf_counter()
+        for _ in range(operations):
+            operation()
+        results[name] = round((time.perf_counter() - start) / operations * 1e9, 1)
+    return {'ns_per_operation': results}
+
+
+def rpc_latency(service, interceptors, rpcs):
+    grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=4), interceptors=interceptors)
+    service_pb2_grpc.add_UserServiceServicer_to_server(service, grpc_server)
+    port = grpc_server.add_insecure_port('127.0.0.1:0')
+    grpc_server.start()
+    try:
+        with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+            stub = service_pb2_grpc.UserServiceStub(channel)
+            # Email non valida: la RPC non tocca il database e misura solo il percorso gRPC.
+            request = service_pb2.LoginUserRequest(email='non-valida')
+            for _ in range(200):
+                stub.LoginUser(request)
+            latencies = []
+            for _ in range(rpcs):
+                start = time.perf_counter()
+                stub.LoginUser(request)
+                latencies.append((time.perf_counter() - start) * 1e6)
+    finally:
+        grpc_server.stop(0)
+    return {'p50_us': round(percentile(latencies, 50), 1), 'p99_us': round(percentile(latencies, 99), 1),
+            'mean_us': round(sum(latencies) / len(latencies), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operations', type=int, default=200000)
+    parser.add_argument('--rpcs', type=int, default=5000)
+    args = parser.parse_args()
+
+    service = server.UserService()
+    report = per_operation(args.operations)
+    report['rpc_without_interceptor'] = rpc_latency(service, [], args.rpcs)
+    report['rpc_with_interceptor'] = rpc_latency(service, [MetricsInterceptor()], args.rpcs)
+    print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Confronta il recupero dei prezzi un ticker alla volta con quello a gruppi,
+usando un finto yfinance locale (nessun accesso alla rete).
+
+    python benchmarks/bench_price_source.py --tickers 2000 --latency 0.05 --batch-size 100
+"""
+import argparse
+import time
+
+from bench_utils import add_service_paths, print_report
+from fake_yfinance import FakeYFinance
+
+add_service_paths('data_collector')
+
+from price_source import BatchYFinancePriceSource, YFinancePriceSource  # noqa: E402
+
+
+def run(source, tickers):
+    start = time.perf_counter()
+    fetched, failed = 0, 0
+    for chunk in source.chunks(tickers):
+        try:
+            prices, errors = source.get_prices(chunk)
+        except Exception:
+            failed += len(chunk)
+            continue
+        fetched += len(prices)
+        failed += len(errors)
+    elapsed = time.perf_counter() - start
+    return {
+        'source': source.name,
+        'upstream_calls': source.yf.calls,
+        'fetched': fetched,
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'tickers_per_second': round(len(tickers) / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:05d}" for i in range(args.tickers)]
+    results = []
+    for source in (
+        YFinancePriceSource(yf_module=FakeYFinance(args.latency, error_rate=args.error_rate, seed=1)),
+        BatchYFinancePriceSource(args.batch_size, yf_module=FakeYFinance(args.latency, error_rate=args.error_rate, seed=1)),
+    ):
+        results.append(run(source, tickers))
+    print_report({'tickers': args.tickers, 'batch_size': args.batch_size, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Misura la latenza delle query di GetLatestValue e GetAverageValue su un dataset
+generato, prima (solo indice su ticker) e dopo l'indice composto (ticker, timestamp DESC).
+Usa DATABASE_URL se impostata, altrimenti un database SQLite temporaneo.
+
+    python benchmarks/bench_read_queries.py --tickers 200 --rows-per-ticker 2000
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from bench_utils import add_service_paths, percentile, print_report
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+add_service_paths()
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from common.database import SessionLocal, engine  # noqa: E402
+from common.migrations import init_db  # noqa: E402
+from common.models import FinancialData  # noqa: E402
+
+INDEX_NAME = 'ix_financial_data_ticker_timestamp'
+
+
+def seed(tickers, rows_per_ticker):
+    start = datetime.datetime(2024, 1, 1)
+    with SessionLocal() as session:
+        session.query(FinancialData).filter(FinancialData.ticker.like('BENCH%')).delete(synchronize_session=False)
+        for t in range(tickers):
+            rows = [
+                {'ticker': f"BENCH{t:05d}", 'value': 100.0 + random.random(),
+                 'timestamp': start + datetime.timedelta(minutes=3 * i)}
+                for i in range(rows_per_ticker)
+            ]
+            random.shuffle(rows)
+            for chunk in range(0, len(rows), 1000):
+                session.execute(insert(FinancialData).values(rows[chunk:chunk + 1000]))
+        session.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def latest(session, ticker):
+    return session.query(FinancialData).filter_by(ticker=ticker)\
+        .order_by(FinancialData.timestamp.desc()).first()
+
+
+def average(session, ticker, count=20):
+    return session.query(FinancialData).filter_by(ticker=ticker)\
+        .order_by(FinancialData.timestamp.desc()).limit(count).all()
+
+
+def plan(ticker):
+    sql = ("SELECT * FROM financial_data WHERE ticker = :ticker "
+           "ORDER BY timestamp DESC LIMIT 20")
+    prefix = 'EXPLAIN ANALYZE ' if engine.dialect.name == 'postgresql' else 'EXPLAIN QUERY PLAN '
+    with engine.connect() as connection:
+        return [' '.join(str(c) for c in row) for row in connection.execute(text(prefix + sql), {'ticker': ticker})]
+
+
+def measure(tickers, samples):
+    results = {}
+    for name, query in (('latest', latest), ('average', average)):
+        latencies = []
+        with SessionLocal() as session:
+            for _ in range(samples):
+                ticker = f"BENCH{random.randrange(tickers):05d}"
+                start = time.perf_counter()
+                query(session, ticker)
+                latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = {'p50_ms': round(percentile(latencies, 50), 3),
+                         'p99_ms': round(percentile(latencies, 99), 3)}
+    results['plan'] = plan("BENCH00000")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=100)
+    parser.add_argument('--rows-per-ticker', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=500)
+    args = parser.parse_args()
+
+    init_db(engine)
+    seed(args.tickers, args.rows_per_ticker)
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+    before = measure(args.tickers, args.samples)
+
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON financial_data (ticker, timestamp DESC)"))
+        connection.execute(text("ANALYZE"))
+    after = measure(args.tickers, args.samples)
+
+    with SessionLocal() as session:
+        session.query(FinancialData).filter(FinancialData.ticker.like('BENCH%')).delete(synchronize_session=False)
+        session.commit()
+    print_report({'dialect': engine.dialect.name, 'tickers': args.tickers,
+                  'rows_per_ticker': args.rows_per_ticker, 'before': before, 'after': after})
+
+
+if __name__ == '__main__':
+    main()
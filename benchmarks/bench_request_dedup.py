@@ -0,0 +1,114 @@
+"""
+Stress test multi-thread della deduplicazione per request_id: ogni request_id viene
+inviato più volte in parallelo e si conta quante volte la richiesta viene davvero
+eseguita, con il solo controllo sullo store (come prima) e con lo stato "in corso".
+
+    python benchmarks/bench_request_dedup.py --threads 32 --requests 2000 --copies 4
+"""
+import argparse
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+from bench_utils import add_service_paths, percentile, print_report
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+add_service_paths('server')
+
+from idempotency import InMemoryIdempotencyStore, InProgressRequests, ShardedIdempotencyStore  # noqa: E402
+
+
+def check_then_put(store, work):
+    def handle(request_id):
+        response = store.get(request_id)
+        if response is not None:
+            return False
+        time.sleep(work)
+        store.put(request_id, "ok")
+        return True
+    return handle
+
+
+def in_progress(store, work, stripes):
+    requests = InProgressRequests(store, stripes=stripes)
+
+    def handle(request_id):
+        response, flight = requests.begin(request_id)
+        if flight is None:
+            return False
+        try:
+            time.sleep(work)
+            requests.complete(request_id, flight, "ok")
+        finally:
+            requests.abandon(request_id, flight)
+        return True
+    return handle
+
+
+def run(handle, threads, request_ids, copies):
+    work = queue.Queue()
+    for request_id in request_ids:
+        for _ in range(copies):
+            work.put(request_id)
+    executions = [0] * threads
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index):
+        while True:
+            try:
+                request_id = work.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            if handle(request_id):
+                executions[index] += 1
+            latencies[index].append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    merged = [value for values in latencies for value in values]
+    return {
+        'requests_per_second': round(len(merged) / elapsed, 1),
+        'executions': sum(executions),
+        'duplicate_executions': sum(executions) - len(request_ids),
+        'p50_ms': round(percentile(merged, 50), 3),
+        'p99_ms': round(percentile(merged, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000, help="request_id distinti")
+    parser.add_argument('--copies', type=int, default=4, help="invii paralleli per request_id")
+    parser.add_argument('--work-ms', type=float, default=2.0, help="durata simulata della richiesta")
+    parser.add_argument('--stripes', type=int, default=16)
+    args = parser.parse_args()
+
+    work = args.work_ms / 1000.0
+    maxsize = args.requests * 2
+    scenarios = {
+        'global_lock_check_then_put': check_then_put(InMemoryIdempotencyStore(maxsize), work),
+        'sharded_check_then_put': check_then_put(ShardedIdempotencyStore(maxsize, shards=args.stripes), work),
+        'sharded_in_progress': in_progress(ShardedIdempotencyStore(maxsize, shards=args.stripes), work, args.stripes),
+    }
+    results = {}
+    for name, handle in scenarios.items():
+        request_ids = [str(uuid.uuid4()) for _ in range(args.requests)]
+        results[name] = run(handle, args.threads, request_ids, args.copies)
+    print_report({'threads': args.threads, 'requests': args.requests, 'copies': args.copies,
+                  'work_ms': args.work_ms, 'scenarios': results})
+
+
+if __name__ == '__main__':
+    main()
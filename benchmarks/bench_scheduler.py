@@ -0,0 +1,172 @@
+"""
+Simula (con orologio virtuale, senza rete né database) la raccolta dei prezzi con il
+ciclo fisso del collector e con AdaptiveScheduler, a parità di budget di chiamate a
+monte. I ticker hanno un numero di utenti con distribuzione di Zipf e volatilità
+diverse; per ciascuna strategia riporta le chiamate a monte, l'età media del prezzo
+servito e l'errore atteso rispetto al prezzo reale, pesati per numero di utenti.
+
+    python benchmarks/bench_scheduler.py --tickers 200 --hours 6
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+
+from bench_utils import add_service_paths, print_report
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+add_service_paths('data_collector')
+
+from scheduler import AdaptiveScheduler  # noqa: E402
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AlwaysOpen:
+    def is_open(self, now=None, ticker=None):
+        return True
+
+
+class SimSource:
+    """
+    Prezzi a passeggiata aleatoria: la volatilità `sigma` è per minuto.
+    """
+    def __init__(self, tickers, sigmas, batch_size, seed):
+        self.batch_size = batch_size
+        self.sigmas = sigmas
+        self.rng = random.Random(seed)
+        self.prices = {ticker: 100.0 for ticker in tickers}
+        self.updated = {ticker: 0.0 for ticker in tickers}
+
+    def chunks(self, tickers):
+        for start in range(0, len(tickers), self.batch_size):
+            yield tickers[start:start + self.batch_size]
+
+    def get_prices(self, tickers, now):
+        for ticker in tickers:
+            minutes = (now - self.updated[ticker]) / 60.0
+            if minutes > 0:
+                step = self.sigmas[ticker] * math.sqrt(minutes) * self.rng.gauss(0, 1)
+                self.prices[ticker] *= math.exp(step)
+                self.updated[ticker] = now
+        return {ticker: self.prices[ticker] for ticker in tickers}
+
+
+class Freshness:
+    """
+    Per ogni ticker accumula l'età del prezzo servito (integrale nel tempo) e l'errore
+    atteso, proporzionale a sigma * sqrt(età).
+    """
+    def __init__(self, tickers, sigmas):
+        self.sigmas = sigmas
+        self.last_fetch = {ticker: 0.0 for ticker in tickers}
+        self.age_area = {ticker: 0.0 for ticker in tickers}
+        self.error_area = {ticker: 0.0 for ticker in tickers}
+        self.fetches = {ticker: 0 for ticker in tickers}
+
+    def fetched(self, ticker, now):
+        gap = now - self.last_fetch[ticker]
+        self.age_area[ticker] += gap * gap / 2
+        self.error_area[ticker] += self.sigmas[ticker] * (2.0 / 3.0) * (gap / 60.0) ** 1.5 * 60.0
+        self.last_fetch[ticker] = now
+        self.fetches[ticker] += 1
+
+    def report(self, subscribers, duration):
+        for ticker in self.last_fetch:
+            self.fetched(ticker, duration)
+            self.fetches[ticker] -= 1
+        total = sum(subscribers.values())
+        hot = sorted(subscribers, key=subscribers.get, reverse=True)[:max(1, len(subscribers) // 10)]
+        weighted_age = sum(self.age_area[t] / duration * subscribers[t] for t in subscribers) / total
+        weighted_error = sum(self.error_area[t] / duration * subscribers[t] for t in subscribers) / total
+        return {
+            'price_age_weighted_seconds': round(weighted_age, 1),
+            'price_age_hot_seconds': round(sum(self.age_area[t] / duration for t in hot) / len(hot), 1),
+            'expected_error_weighted_pct': round(weighted_error * 100, 4),
+            'fetches_hot_avg': round(sum(self.fetches[t] for t in hot) / len(hot), 1),
+            'fetches_total': sum(self.fetches.values()),
+        }
+
+
+def make_tickers(count, seed):
+    rng = random.Random(seed)
+    tickers = [f"T{i:04d}" for i in range(count)]
+    subscribers = {ticker: int(1000 / (rank + 1) ** 1.1) + 1 for rank, ticker in enumerate(tickers)}
+    sigmas = {ticker: 0.002 * math.exp(rng.gauss(0, 0.7)) for ticker in tickers}
+    return tickers, subscribers, sigmas
+
+
+def run_fixed(args, tickers, subscribers, sigmas):
+    source = SimSource(tickers, sigmas, args.batch_size, args.seed)
+    freshness = Freshness(tickers, sigmas)
+    duration = args.hours * 3600
+    calls = 0
+    now = 0.0
+    while now < duration:
+        for chunk in source.chunks(tickers):
+            source.get_prices(chunk, now)
+            calls += 1
+            for ticker in chunk:
+                freshness.fetched(ticker, now)
+        now += args.base_interval
+    report = freshness.report(subscribers, duration)
+    report.update({'upstream_calls': calls, 'calls_per_minute': round(calls / (duration / 60), 2)})
+    return report
+
+
+def run_adaptive(args, tickers, subscribers, sigmas, budget):
+    clock = SimClock()
+    source = SimSource(tickers, sigmas, args.batch_size, args.seed)
+    scheduler = AdaptiveScheduler(source, base_interval=args.base_interval, budget_per_minute=budget,
+                                  market=AlwaysOpen(), clock=clock)
+    scheduler.update_tickers(subscribers)
+    freshness = Freshness(tickers, sigmas)
+    duration = args.hours * 3600
+    while clock.now < duration:
+        due = scheduler.pop_due()
+        if due:
+            prices = source.get_prices(due, clock.now)
+            for ticker in due:
+                freshness.fetched(ticker, clock.now)
+            scheduler.observe(due, prices, {})
+        clock.now += max(scheduler.next_wakeup(), 0.1)
+    report = freshness.report(subscribers, duration)
+    report.update({'upstream_calls': scheduler.requests,
+                   'calls_per_minute': round(scheduler.requests / (duration / 60), 2),
+                   'deferred': scheduler.deferred})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--hours', type=float, default=6)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--base-interval', type=float, default=180)
+    parser.add_argument('--budget', type=float, help="chiamate al minuto (di default quelle del ciclo fisso)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    tickers, subscribers, sigmas = make_tickers(args.tickers, args.seed)
+    fixed_budget = math.ceil(args.tickers / args.batch_size) * 60 / args.base_interval
+    budget = args.budget or fixed_budget
+    print_report({
+        'tickers': args.tickers,
+        'hours': args.hours,
+        'budget_per_minute': round(budget, 2),
+        'fixed': run_fixed(args, tickers, subscribers, sigmas),
+        'adaptive': run_adaptive(args, tickers, subscribers, sigmas, budget),
+    })
+
+
+if __name__ == '__main__':
+    main()
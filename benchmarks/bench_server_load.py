@@ -0,0 +1,120 @@
+"""
+Benchmark di carico del server gRPC: avvia server/server.py in modalità 'threads'
+e 'async', apre N client concorrenti (closed loop) e riporta RPS e latenza p50/p99.
+Usa DATABASE_URL se impostata, altrimenti un database SQLite temporaneo
+(per la modalità async servono rispettivamente asyncpg o aiosqlite).
+
+    python benchmarks/bench_server_load.py --clients 100 500 1000 --duration 20
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_utils import ROOT, add_service_paths, percentile, print_report
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+add_service_paths('server')
+
+import grpc  # noqa: E402
+
+from common.database import SessionLocal, engine  # noqa: E402
+from common.migrations import init_db  # noqa: E402
+from common.models import FinancialData, User  # noqa: E402
+import service_pb2  # noqa: E402
+import service_pb2_grpc  # noqa: E402
+
+
+def seed(users, tickers):
+    init_db(engine)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with SessionLocal() as session:
+        session.query(User).filter(User.email.like('bench%')).delete(synchronize_session=False)
+        session.query(FinancialData).filter(FinancialData.ticker.like('BENCH%')).delete(synchronize_session=False)
+        session.add_all(User(email=f"bench{i}@example.com", ticker=f"BENCH{i % tickers}") for i in range(users))
+        session.add_all(
+            FinancialData(ticker=f"BENCH{t}", value=100.0 + i, timestamp=now - datetime.timedelta(minutes=3 * i))
+            for t in range(tickers) for i in range(20)
+        )
+        session.commit()
+
+
+def start_server(mode, port):
+    env = dict(os.environ, SERVER_MODE=mode, SERVER_PORT=str(port),
+               METRICS_PORT=os.environ.get('METRICS_PORT', '0'),
+               PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'server')]))
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server', 'server.py')], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    channel = grpc.insecure_channel(f'localhost:{port}')
+    grpc.channel_ready_future(channel).result(timeout=30)
+    channel.close()
+    return process
+
+
+async def client_loop(stub, index, users, deadline, latencies, errors):
+    email = f"bench{index % users}@example.com"
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if i % 2:
+                await stub.GetAverageValue(service_pb2.GetAverageValueRequest(email=email, count=10), timeout=10)
+            else:
+                await stub.GetLatestValue(service_pb2.GetLatestValueRequest(email=email), timeout=10)
+            latencies.append(time.perf_counter() - start)
+        except grpc.RpcError:
+            errors.append(1)
+        i += 1
+
+
+async def run_load(port, clients, users, duration):
+    latencies, errors = [], []
+    async with grpc.aio.insecure_channel(f'localhost:{port}') as channel:
+        stub = service_pb2_grpc.UserServiceStub(channel)
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(stub, i, users, deadline, latencies, errors) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', default=['threads', 'async'])
+    parser.add_argument('--clients', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--tickers', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=50061)
+    args = parser.parse_args()
+
+    seed(args.users, args.tickers)
+    results = []
+    for mode in args.modes:
+        process = start_server(mode, args.port)
+        try:
+            for clients in args.clients:
+                result = asyncio.run(run_load(args.port, clients, args.users, args.duration))
+                result['mode'] = mode
+                results.append(result)
+        finally:
+            process.terminate()
+            process.wait()
+    print_report({'dialect': engine.dialect.name, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Funzioni di supporto condivise dagli script di benchmark.
+"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_service_paths(*services):
+    """
+    Rende importabili i moduli dei servizi come avviene nei container
+    (ogni servizio importa i propri moduli in modo "piatto" e il pacchetto common).
+    """
+    for path in (ROOT,) + tuple(os.path.join(ROOT, s) for s in services):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def print_report(report):
+    print(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,58 @@
+"""
+Modulo che imita l'interfaccia di yfinance usata dal data collector
+(Ticker(...).history() e download()), senza accesso alla rete.
+Latenza per chiamata e tasso di errore sono configurabili.
+"""
+import random
+import threading
+import time
+
+import pandas as pd
+
+
+class FakeYFinance:
+    def __init__(self, latency=0.05, per_ticker_latency=0.0005, error_rate=0.0,
+                 invalid_tickers=(), seed=None):
+        self.latency = latency
+        self.per_ticker_latency = per_ticker_latency
+        self.error_rate = error_rate
+        self.invalid_tickers = set(invalid_tickers)
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _simulate_call(self, n_tickers):
+        with self._lock:
+            self.calls += 1
+            fail = self.random.random() < self.error_rate
+        time.sleep(self.latency + self.per_ticker_latency * n_tickers)
+        if fail:
+            raise ConnectionError("Errore simulato della sorgente dati")
+
+    def _price(self, ticker):
+        return 100.0 + (hash(ticker) % 10000) / 100.0 + self.random.random()
+
+    def _frame(self, ticker):
+        if ticker in self.invalid_tickers:
+            return pd.DataFrame({'Close': []})
+        return pd.DataFrame({'Close': [self._price(ticker)]}, index=[pd.Timestamp.now()])
+
+    def Ticker(self, ticker):
+        fake = self
+
+        class _Ticker:
+            def history(self, period="1d"):
+                fake._simulate_call(1)
+                return fake._frame(ticker)
+
+        return _Ticker()
+
+    def download(self, tickers, period="1d", group_by="ticker", **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        self._simulate_call(len(tickers))
+        frames = {ticker: self._frame(ticker) for ticker in tickers}
+        frames = {t: f for t, f in frames.items() if not f.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
@@ -1,43 +1,206 @@
+import os
 import time
+from sqlalchemy import Column, Integer, MetaData, Table, delete, func, insert, select
 from sqlalchemy.orm import sessionmaker
 from common.models import FinancialData
 from sqlalchemy.exc import OperationalError
-from common.database import SessionLocal
+from common import metrics
+from common.database import SessionLocal, engine, pool_status
+from common.partitioning import PartitionManager, partitioning_enabled
+from common.rollups import ROLLUPS_ENABLED, RollupPipeline, rolled_up_id
 
+RETENTION_DEPTH = int(os.environ.get('RETENTION_DEPTH', '20'))
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '5000'))
+METRICS_PORT = 8002
 
-def remove_outdated_entries():
+RUNS = metrics.counter('cleaner_runs', "Passate di pulizia eseguite", ('mode',))
+RUN_DURATION = metrics.histogram('cleaner_run_seconds', "Durata delle passate di pulizia", ('mode',))
+DELETED = metrics.counter('cleaner_deleted_rows', "Record obsoleti cancellati", ('mode',))
+PARTITIONS_CREATED = metrics.counter('cleaner_partitions_created', "Partizioni di financial_data create")
+PARTITIONS_DROPPED = metrics.counter('cleaner_partitions_dropped', "Partizioni di financial_data eliminate")
+ROLLUP_ROWS = metrics.counter('cleaner_rollup_rows', "Record grezzi aggregati nei rollup")
+ROLLUP_DURATION = metrics.histogram('cleaner_rollup_seconds', "Durata dell'aggiornamento dei rollup")
+
+# Tabella temporanea (per connessione) con gli id da cancellare in una passata.
+_outdated_ids = Table('retention_outdated_ids', MetaData(), Column('id', Integer, primary_key=True),
+                      prefixes=['TEMPORARY'])
+
+
+def outdated_ids_query(depth, tickers=None, max_id=None):
+    """
+    Id dei record oltre i `depth` più recenti di ciascun ticker, calcolati con una
+    sola passata ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY timestamp DESC).
+    Con `max_id` esclude i record non ancora aggregati nei rollup.
+    """
+    ranked = select(
+        FinancialData.id.label('id'),
+        func.row_number().over(
+            partition_by=FinancialData.ticker,
+            order_by=(FinancialData.timestamp.desc(), FinancialData.id.desc()),
+        ).label('position'),
+    )
+    if tickers is not None:
+        ranked = ranked.where(FinancialData.ticker.in_(tickers))
+    ranked = ranked.subquery()
+    statement = select(ranked.c.id).where(ranked.c.position > depth)
+    if max_id is not None:
+        statement = statement.where(ranked.c.id <= max_id)
+    return statement
+
+
+def delete_outdated_in_batches(depth, batch_size, tickers=None, max_id=None):
+    """
+    Cancella i record individuati da outdated_ids_query interamente nel database.
+    La classifica ROW_NUMBER() viene calcolata una sola volta e salvata in una tabella
+    temporanea; i record vengono poi cancellati per intervalli di id della tabella
+    temporanea, `batch_size` alla volta, ciascuno nella propria transazione.
+    """
+    deleted = 0
+    with engine.connect() as connection:
+        with connection.begin():
+            _outdated_ids.drop(connection, checkfirst=True)
+            _outdated_ids.create(connection)
+            connection.execute(insert(_outdated_ids).from_select(['id'], outdated_ids_query(depth, tickers, max_id)))
+        try:
+            last_id = None
+            while True:
+                with connection.begin():
+                    batch = select(_outdated_ids.c.id)
+                    if last_id is not None:
+                        batch = batch.where(_outdated_ids.c.id > last_id)
+                    upper = connection.execute(
+                        batch.order_by(_outdated_ids.c.id).offset(batch_size - 1).limit(1)).scalar()
+                    if upper is not None:
+                        batch = batch.where(_outdated_ids.c.id <= upper)
+                    result = connection.execute(delete(FinancialData).where(FinancialData.id.in_(batch)))
+                deleted += result.rowcount
+                if upper is None:
+                    return deleted
+                last_id = upper
+        finally:
+            with connection.begin():
+                _outdated_ids.drop(connection)
+
+
+def _report(deleted, start, label, mode):
+    elapsed = time.perf_counter() - start
+    RUNS.labels(mode).inc()
+    RUN_DURATION.labels(mode).observe(elapsed)
+    DELETED.labels(mode).inc(deleted)
+    rate = deleted / elapsed if elapsed > 0 else 0.0
+    print(f"{label}: rimossi {deleted} record obsoleti in {elapsed:.2f}s ({rate:.1f} record/s)")
+    print(f"Pool di connessioni: {pool_status()}")
+
+
+def update_rollups(pipeline):
+    """
+    Aggiorna i rollup con i record arrivati dall'ultima passata. Restituisce l'ultimo
+    id aggregato, oltre il quale la retention non deve cancellare.
+    """
+    with ROLLUP_DURATION.time():
+        result = pipeline.run_once()
+    ROLLUP_ROWS.inc(result['aggregated'])
+    if result['aggregated'] or result['pruned']:
+        print(f"Rollup: aggregati {result['aggregated']} record, rimossi {result['pruned']} intervalli scaduti")
     with SessionLocal() as db_session:
-        ticker_list = db_session.query(FinancialData.ticker).distinct().all()
-        unique_tickers = [t[0] for t in ticker_list]
+        return rolled_up_id(db_session)
 
-        for current_ticker in unique_tickers:
-            count_records = db_session.query(FinancialData).filter_by(ticker=current_ticker).count()
 
-            if count_records > 20:
-                excess_records = count_records - 20
+def remove_outdated_entries(depth=RETENTION_DEPTH, batch_size=RETENTION_BATCH_SIZE, max_id=None):
+    """
+    Mantiene solo i `depth` record più recenti per ticker, cancellando gli altri
+    a blocchi di `batch_size` righe. Restituisce il numero di record cancellati.
+    """
+    start = time.perf_counter()
+    deleted = delete_outdated_in_batches(depth, batch_size, max_id=max_id)
+    _report(deleted, start, "Pulizia completa", 'full')
+    return deleted
 
-                obsolete_records = (
-                    db_session.query(FinancialData.id)
-                    .filter_by(ticker=current_ticker)
-                    .order_by(FinancialData.timestamp.asc())
-                    .limit(excess_records)
-                    .all()
-                )
 
-                ids_to_delete = [record.id for record in obsolete_records]
+class IncrementalRetention:
+    """
+    Retention incrementale: a ogni passata considera solo i ticker che hanno
+    ricevuto nuovi record dopo l'ultimo id visto (high-water mark su FinancialData.id),
+    quindi il costo cresce con i nuovi inserimenti e non con la dimensione della tabella.
+    La prima passata è completa e inizializza l'high-water mark. Con `rollups`
+    aggiorna prima i rollup e non cancella i record non ancora aggregati.
+    """
+    def __init__(self, depth=RETENTION_DEPTH, batch_size=RETENTION_BATCH_SIZE, rollups=None):
+        self.depth = depth
+        self.batch_size = batch_size
+        self.rollups = rollups
+        self.high_water_mark = None
 
-                db_session.query(FinancialData).filter(FinancialData.id.in_(ids_to_delete)).delete(synchronize_session=False)
+    def run_once(self):
+        max_rolled_up = update_rollups(self.rollups) if self.rollups is not None else None
+        with SessionLocal() as db_session:
+            max_id = db_session.query(func.max(FinancialData.id)).scalar()
+        if max_id is None:
+            return 0
+        # I record non ancora aggregati non vengono cancellati: l'high-water mark non li
+        # supera, così i loro ticker restano da riconsiderare alla passata successiva.
+        covered = max_id if max_rolled_up is None else min(max_id, max_rolled_up)
+        if self.high_water_mark is None:
+            deleted = remove_outdated_entries(self.depth, self.batch_size, max_rolled_up)
+            self.high_water_mark = covered
+            return deleted
+        if max_id <= self.high_water_mark:
+            return 0
 
-                db_session.commit()
-                print(f"Rimossi {excess_records} record obsoleti per il ticker {current_ticker}")
-            else:
-                print(f"Nessun record da eliminare per il ticker {current_ticker}")
+        start = time.perf_counter()
+        with SessionLocal() as db_session:
+            touched = db_session.execute(
+                select(FinancialData.ticker)
+                .where(FinancialData.id > self.high_water_mark, FinancialData.id <= max_id)
+                .distinct()
+            ).scalars().all()
+        deleted = delete_outdated_in_batches(self.depth, self.batch_size, touched, max_rolled_up)
+        self.high_water_mark = covered
+        _report(deleted, start, f"Pulizia incrementale su {len(touched)} ticker", 'incremental')
+        return deleted
 
 
-if __name__ == '__main__':
-    while True:
-        print("Avvio processo di pulizia dei dati...")
-        remove_outdated_entries()
-        print("Pulizia completata. Il processo andrÃ  in pausa per 24 ore.")
+def maintain_partitions(manager, rollups=None):
+    """
+    Crea le partizioni future ed elimina quelle oltre la retention: una DROP TABLE
+    per partizione al posto della cancellazione riga per riga.
+    """
+    if rollups is not None:
+        update_rollups(rollups)
+    start = time.perf_counter()
+    result = manager.maintain(engine)
+    PARTITIONS_CREATED.inc(len(result['created']))
+    PARTITIONS_DROPPED.inc(len(result['dropped']))
+    _report(result['default_rows_deleted'], start, "Manutenzione partizioni", 'partitions')
+    print(f"Partizioni create: {result['created']}, eliminate: {result['dropped']}")
+    return result
+
 
-        time.sleep(86400)
\ No newline at end of file
+if __name__ == '__main__':
+    metrics.register_stats('db_pool', pool_status)
+    metrics.start_metrics_server(METRICS_PORT)
+    mode = os.environ.get('CLEANER_MODE', 'incremental').lower()
+    rollups = RollupPipeline(SessionLocal) if ROLLUPS_ENABLED else None
+    if partitioning_enabled(engine):
+        # Con financial_data partizionata la retention è per tempo (PARTITION_RETENTION_DAYS)
+        # e non per numero di record per ticker.
+        interval = int(os.environ.get('PARTITION_MAINTENANCE_INTERVAL', '3600'))
+        manager = PartitionManager()
+        print(f"Manutenzione delle partizioni ({manager.interval}) ogni {interval} secondi...")
+        while True:
+            maintain_partitions(manager, rollups)
+            time.sleep(interval)
+    elif mode == 'full':
+        interval = int(os.environ.get('CLEANER_INTERVAL', '86400'))
+        while True:
+            print("Avvio processo di pulizia dei dati...")
+            remove_outdated_entries(max_id=update_rollups(rollups) if rollups is not None else None)
+            print(f"Pulizia completata. Il processo andrà in pausa per {interval} secondi.")
+            time.sleep(interval)
+    else:
+        interval = int(os.environ.get('CLEANER_INTERVAL', '60'))
+        retention = IncrementalRetention(rollups=rollups)
+        print(f"Avvio pulizia incrementale ogni {interval} secondi...")
+        while True:
+            retention.run_once()
+            time.sleep(interval)
@@ -19,22 +19,35 @@ def generate_request_id():
     random_str = ''.join(random.choices(string.ascii_letters + string.digits, k=6))
     return f"{timestamp}_{random_str}"
 
-def ticker_verifier(ticker):
+def download_ticker_check(ticker):
     """
-    Verifica se il ticker è valido utilizzando yfinance.
+    Verifica il ticker scaricando i dati dell'ultimo giorno con yfinance.
+    Restituisce None se la verifica non è stata possibile.
     """
     logging.getLogger('yfinance').setLevel(logging.CRITICAL)
     try:
         dati = yf.download(ticker, period="1d", progress=False)
-        if not dati.empty:
-            print(f"Il ticker '{ticker}' è valido.")
-            return True
-        else:
-            print(f"Il ticker '{ticker}' non è valido o non è possibile scaricare i dati.")
-            return False
+        return not dati.empty
     except Exception as e:
         print(f"Errore durante la verifica del ticker: {e}")
-        return False
+        return None
+
+def ticker_verifier(stub, ticker):
+    """
+    Verifica se il ticker è valido: chiede prima al server l'esito registrato nel suo
+    catalogo dei simboli e usa yfinance solo per i ticker non ancora verificati.
+    """
+    response = send_request_with_retry(stub.CheckTicker, service_pb2.CheckTickerRequest(ticker=ticker))
+    if response is not None and response.status != service_pb2.TICKER_UNKNOWN:
+        valid = response.status == service_pb2.TICKER_VALID
+    else:
+        valid = download_ticker_check(ticker)
+    if valid:
+        print(f"Il ticker '{ticker}' è valido.")
+        return True
+    if valid is False:
+        print(f"Il ticker '{ticker}' non è valido o non è possibile scaricare i dati.")
+    return False
 
 def send_request_with_retry(stub_method, request, max_retries=5, channel=None, stub=None):
     """
@@ -92,7 +105,7 @@ def run():
             elif scelta == '2':
                 email = input("Inserisci l'email dell'utente: ")
                 ticker = input("Inserisci il ticker di interesse: ")
-                if ticker_verifier(ticker):
+                if ticker_verifier(stub, ticker):
                     request_id = generate_request_id()
                     request = service_pb2.RegisterUserRequest(email=email, ticker=ticker, request_id=request_id)
                     response = send_request_with_retry(stub.RegisterUser, request)
@@ -112,6 +125,16 @@ def run():
                 print("Scelta non valida. Riprova.")
 
 
+def parse_window(window):
+    """
+    Converte una finestra come '30m', '1h' o '7d' in secondi (None se non valida).
+    """
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    if len(window) < 2 or window[-1] not in units or not window[:-1].isdigit():
+        return None
+    return int(window[:-1]) * units[window[-1]] or None
+
+
 def user_session(stub):
     """
     Gestisce le operazioni utente dopo il login.
@@ -124,12 +147,13 @@ def user_session(stub):
         print("2. Cancellazione Account")
         print("3. Recupero dell'ultimo valore disponibile")
         print("4. Calcolo della media degli ultimi X valori")
-        print("5. Logout")
+        print("5. Statistiche su una finestra temporale (es. 1h, 24h, 7d)")
+        print("6. Logout")
         scelta = input("Inserisci il numero dell'operazione desiderata: ")
 
         if scelta == '1':
             ticker = input("Inserisci il nuovo ticker: ")
-            if ticker_verifier(ticker):
+            if ticker_verifier(stub, ticker):
                 request_id = generate_request_id()
                 request = service_pb2.UpdateUserRequest(
                     email=session_email,
@@ -191,6 +215,24 @@ def user_session(stub):
 
 
         elif scelta == '5':
+            window = input("Inserisci la finestra temporale (es. 30m, 1h, 24h, 7d): ").strip().lower()
+            window_seconds = parse_window(window)
+            if window_seconds is None:
+                print("Finestra non valida. Usa un numero seguito da m, h o d.")
+                continue
+            request = service_pb2.GetWindowStatsRequest(email=session_email, window_seconds=window_seconds)
+            try:
+                response = stub.GetWindowStats(request, timeout=10)
+                print(f"Statistiche per {response.ticker} dal {response.start} al {response.end} "
+                      f"({response.samples} valori, risoluzione {response.resolution}):")
+                print(f"  media {response.average_value:.4f}, minimo {response.min_value:.4f}, "
+                      f"massimo {response.max_value:.4f}, deviazione standard {response.stddev:.4f}")
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.NOT_FOUND:
+                    print("Nessun valore disponibile nella finestra richiesta.")
+                else:
+                    print(f"Errore durante il calcolo delle statistiche: {e.details()}")
+        elif scelta == '6':
             print("Logout effettuato.")
             session_email = None
             break
@@ -0,0 +1,218 @@
+"""
+Generatore di carico per il server gRPC, basato su UserServiceStub.
+
+Modalità:
+  closed  N client concorrenti, ognuno invia la richiesta successiva appena riceve la risposta;
+  open    richieste inviate a tasso fisso (o con arrivi di Poisson) indipendentemente dalle
+          risposte; la latenza parte dall'istante di invio previsto, così i ritardi del
+          server non vengono nascosti (coordinated omission).
+
+Le scritture (Register/Update/Delete) ripetono con probabilità --duplicate-rate una
+richiesta già inviata con lo stesso request_id, come un client che ritenta.
+
+    python load_generator.py --mode closed --concurrency 50 --duration 60 --setup
+    python load_generator.py --mode open --rate 500 --duration 60 \\
+        --mix GetLatestValue=60,GetAverageValue=30,LoginUser=10 --output report.json
+"""
+import argparse
+import collections
+import io
+import json
+import random
+import threading
+import time
+import uuid
+
+import grpc
+from hdrh.histogram import HdrHistogram
+
+import service_pb2
+import service_pb2_grpc
+from workload import RequestFactory
+
+DEFAULT_MIX = 'GetLatestValue=45,GetAverageValue=30,LoginUser=15,UpdateUser=5,RegisterUser=3,DeleteUser=2'
+# Latenze in microsecondi, da 1 µs a 60 s con 3 cifre significative.
+HISTOGRAM_RANGE = (1, 60 * 1000 * 1000, 3)
+
+
+class LatencyRecorder:
+    """
+    Istogrammi HDR per RPC e complessivo, più il conteggio degli errori per codice.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.overall = HdrHistogram(*HISTOGRAM_RANGE)
+        self.per_method = {}
+        self.errors = collections.Counter()
+
+    def record(self, method, seconds, code=None):
+        value = max(1, int(seconds * 1e6))
+        with self.lock:
+            if code is not None:
+                self.errors[f"{method}:{code}"] += 1
+                return
+            histogram = self.per_method.get(method)
+            if histogram is None:
+                histogram = self.per_method[method] = HdrHistogram(*HISTOGRAM_RANGE)
+            histogram.record_value(value)
+            self.overall.record_value(value)
+
+    @staticmethod
+    def _summary(histogram, elapsed):
+        count = histogram.get_total_count()
+        return {
+            'requests': count,
+            'rps': round(count / elapsed, 1) if elapsed else 0.0,
+            'mean_ms': round(histogram.get_mean_value() / 1000, 3),
+            'p50_ms': histogram.get_value_at_percentile(50) / 1000,
+            'p90_ms': histogram.get_value_at_percentile(90) / 1000,
+            'p99_ms': histogram.get_value_at_percentile(99) / 1000,
+            'p999_ms': histogram.get_value_at_percentile(99.9) / 1000,
+            'max_ms': histogram.get_max_value() / 1000,
+        }
+
+    def report(self, elapsed):
+        with self.lock:
+            return {
+                'overall': self._summary(self.overall, elapsed),
+                'rpc': {method: self._summary(h, elapsed) for method, h in sorted(self.per_method.items())},
+                'errors': dict(self.errors),
+            }
+
+    def distribution(self):
+        """
+        Distribuzione dei percentili complessivi nel formato testuale HDR (valori in ms).
+        """
+        output = io.StringIO()
+        with self.lock:
+            self.overall.output_percentile_distribution(output, 1000.0)
+        return output.getvalue()
+
+
+def setup_users(stub, factory):
+    """
+    Registra gli utenti sintetici usati dal mix (le registrazioni già presenti sono ignorate).
+    """
+    for index in range(factory.users):
+        stub.RegisterUser(service_pb2.RegisterUserRequest(
+            email=factory.user_email(index),
+            ticker=factory.tickers[index % len(factory.tickers)],
+            request_id=str(uuid.uuid4()),
+        ), timeout=30)
+
+
+def run_closed(stub, factory, recorder, args):
+    deadline = time.perf_counter() + args.duration
+
+    def client(index):
+        rng = random.Random(args.seed * 100003 + index)
+        while time.perf_counter() < deadline:
+            method, request = factory.next_request(rng)
+            start = time.perf_counter()
+            try:
+                getattr(stub, method)(request, timeout=args.timeout)
+                recorder.record(method, time.perf_counter() - start)
+            except grpc.RpcError as e:
+                recorder.record(method, time.perf_counter() - start, e.code().name)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {}
+
+
+def run_open(stub, factory, recorder, args):
+    rng = random.Random(args.seed)
+    in_flight = threading.Semaphore(args.max_in_flight)
+    outstanding = []
+    saturated = 0
+    start = time.perf_counter()
+    deadline = start + args.duration
+    scheduled = start
+    interval = 1.0 / args.rate
+
+    def on_done(method, intended, future):
+        elapsed = time.perf_counter() - intended
+        error = future.exception()
+        recorder.record(method, elapsed, error.code().name if error is not None else None)
+        in_flight.release()
+
+    while scheduled < deadline:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        method, request = factory.next_request(rng)
+        if not in_flight.acquire(blocking=False):
+            # Limite di richieste pendenti raggiunto: l'invio attende uno slot, ma la latenza
+            # parte comunque da `scheduled`, così l'attesa compare nei percentili.
+            saturated += 1
+            in_flight.acquire()
+        future = getattr(stub, method).future(request, timeout=args.timeout)
+        future.add_done_callback(lambda f, m=method, t=scheduled: on_done(m, t, f))
+        outstanding.append(future)
+        scheduled += rng.expovariate(args.rate) if args.arrival == 'poisson' else interval
+        if len(outstanding) > 10000:
+            outstanding = [f for f in outstanding if not f.done()]
+    for future in outstanding:
+        try:
+            future.result()
+        except grpc.RpcError:
+            pass
+    return {'target_rate': args.rate, 'saturated_max_in_flight': saturated}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generatore di carico per il server gRPC")
+    parser.add_argument('--target', default='localhost:50051')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--concurrency', type=int, default=20, help="client concorrenti (closed loop)")
+    parser.add_argument('--rate', type=float, default=200, help="richieste al secondo (open loop)")
+    parser.add_argument('--arrival', choices=['constant', 'poisson'], default='constant')
+    parser.add_argument('--max-in-flight', type=int, default=1000, help="richieste pendenti massime (open loop); oltre il limite l'invio attende")
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--user-prefix', default='load')
+    parser.add_argument('--tickers', default='AAPL,MSFT,GOOGL,AMZN,TSLA,META,NVDA,NFLX')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05)
+    parser.add_argument('--setup', action='store_true', help="registra gli utenti prima del test")
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="scrive il report JSON su questo file")
+    parser.add_argument('--distribution', action='store_true', help="stampa la distribuzione HDR dei percentili")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    factory = RequestFactory(args.mix, args.users, args.tickers.split(','), args.duplicate_rate, args.user_prefix)
+    recorder = LatencyRecorder()
+    with grpc.insecure_channel(args.target) as channel:
+        grpc.channel_ready_future(channel).result(timeout=30)
+        stub = service_pb2_grpc.UserServiceStub(channel)
+        if args.setup:
+            print(f"Registrazione di {args.users} utenti di test...")
+            setup_users(stub, factory)
+        print(f"Avvio test di carico ({args.mode} loop) per {args.duration} secondi su {args.target}")
+        start = time.perf_counter()
+        extra = run_open(stub, factory, recorder, args) if args.mode == 'open' else run_closed(stub, factory, recorder, args)
+        elapsed = time.perf_counter() - start
+
+    report = recorder.report(elapsed)
+    report.update(extra)
+    report.update({'mode': args.mode, 'duration_seconds': round(elapsed, 3), 'mix': args.mix,
+                   'duplicate_rate': args.duplicate_rate})
+    if args.mode == 'closed':
+        report['concurrency'] = args.concurrency
+    print(json.dumps(report, indent=2, sort_keys=True))
+    if args.distribution:
+        print(recorder.distribution())
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -54,6 +54,11 @@ class UserServiceStub(object):
                 request_serializer=service__pb2.LoginUserRequest.SerializeToString,
                 response_deserializer=service__pb2.LoginUserResponse.FromString,
                 _registered_method=True)
+        self.CheckTicker = channel.unary_unary(
+                '/user_service.UserService/CheckTicker',
+                request_serializer=service__pb2.CheckTickerRequest.SerializeToString,
+                response_deserializer=service__pb2.CheckTickerResponse.FromString,
+                _registered_method=True)
         self.GetLatestValue = channel.unary_unary(
                 '/user_service.UserService/GetLatestValue',
                 request_serializer=service__pb2.GetLatestValueRequest.SerializeToString,
@@ -64,6 +69,26 @@ class UserServiceStub(object):
                 request_serializer=service__pb2.GetAverageValueRequest.SerializeToString,
                 response_deserializer=service__pb2.GetAverageValueResponse.FromString,
                 _registered_method=True)
+        self.GetWindowStats = channel.unary_unary(
+                '/user_service.UserService/GetWindowStats',
+                request_serializer=service__pb2.GetWindowStatsRequest.SerializeToString,
+                response_deserializer=service__pb2.GetWindowStatsResponse.FromString,
+                _registered_method=True)
+        self.GetLatestValues = channel.unary_unary(
+                '/user_service.UserService/GetLatestValues',
+                request_serializer=service__pb2.GetLatestValuesRequest.SerializeToString,
+                response_deserializer=service__pb2.GetLatestValuesResponse.FromString,
+                _registered_method=True)
+        self.GetAverageValues = channel.unary_unary(
+                '/user_service.UserService/GetAverageValues',
+                request_serializer=service__pb2.GetAverageValuesRequest.SerializeToString,
+                response_deserializer=service__pb2.GetAverageValuesResponse.FromString,
+                _registered_method=True)
+        self.SubscribePrices = channel.unary_stream(
+                '/user_service.UserService/SubscribePrices',
+                request_serializer=service__pb2.SubscribePricesRequest.SerializeToString,
+                response_deserializer=service__pb2.PriceUpdate.FromString,
+                _registered_method=True)
 
 
 class UserServiceServicer(object):
@@ -93,6 +118,12 @@ class UserServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def CheckTicker(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetLatestValue(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -105,6 +136,30 @@ class UserServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetWindowStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetLatestValues(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetAverageValues(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SubscribePrices(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_UserServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -128,6 +183,11 @@ def add_UserServiceServicer_to_server(servicer, server):
                     request_deserializer=service__pb2.LoginUserRequest.FromString,
                     response_serializer=service__pb2.LoginUserResponse.SerializeToString,
             ),
+            'CheckTicker': grpc.unary_unary_rpc_method_handler(
+                    servicer.CheckTicker,
+                    request_deserializer=service__pb2.CheckTickerRequest.FromString,
+                    response_serializer=service__pb2.CheckTickerResponse.SerializeToString,
+            ),
             'GetLatestValue': grpc.unary_unary_rpc_method_handler(
                     servicer.GetLatestValue,
                     request_deserializer=service__pb2.GetLatestValueRequest.FromString,
@@ -138,6 +198,26 @@ def add_UserServiceServicer_to_server(servicer, server):
                     request_deserializer=service__pb2.GetAverageValueRequest.FromString,
                     response_serializer=service__pb2.GetAverageValueResponse.SerializeToString,
             ),
+            'GetWindowStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetWindowStats,
+                    request_deserializer=service__pb2.GetWindowStatsRequest.FromString,
+                    response_serializer=service__pb2.GetWindowStatsResponse.SerializeToString,
+            ),
+            'GetLatestValues': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetLatestValues,
+                    request_deserializer=service__pb2.GetLatestValuesRequest.FromString,
+                    response_serializer=service__pb2.GetLatestValuesResponse.SerializeToString,
+            ),
+            'GetAverageValues': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetAverageValues,
+                    request_deserializer=service__pb2.GetAverageValuesRequest.FromString,
+                    response_serializer=service__pb2.GetAverageValuesResponse.SerializeToString,
+            ),
+            'SubscribePrices': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribePrices,
+                    request_deserializer=service__pb2.SubscribePricesRequest.FromString,
+                    response_serializer=service__pb2.PriceUpdate.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'user_service.UserService', rpc_method_handlers)
@@ -257,6 +337,33 @@ class UserService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def CheckTicker(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/user_service.UserService/CheckTicker',
+            service__pb2.CheckTickerRequest.SerializeToString,
+            service__pb2.CheckTickerResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def GetLatestValue(request,
             target,
@@ -310,3 +417,111 @@ class UserService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetWindowStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/user_service.UserService/GetWindowStats',
+            service__pb2.GetWindowStatsRequest.SerializeToString,
+            service__pb2.GetWindowStatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetLatestValues(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/user_service.UserService/GetLatestValues',
+            service__pb2.GetLatestValuesRequest.SerializeToString,
+            service__pb2.GetLatestValuesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetAverageValues(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/user_service.UserService/GetAverageValues',
+            service__pb2.GetAverageValuesRequest.SerializeToString,
+            service__pb2.GetAverageValuesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SubscribePrices(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/user_service.UserService/SubscribePrices',
+            service__pb2.SubscribePricesRequest.SerializeToString,
+            service__pb2.PriceUpdate.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
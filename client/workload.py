@@ -0,0 +1,80 @@
+"""
+Mix di richieste sintetiche per i test di carico, condiviso dal generatore di carico
+e dal benchmark end-to-end.
+"""
+import collections
+import threading
+import uuid
+
+import service_pb2
+
+WRITES = ('RegisterUser', 'UpdateUser', 'DeleteUser')
+
+
+class RequestFactory:
+    """
+    Costruisce le richieste del mix (es. 'GetLatestValue=60,LoginUser=10') su un insieme
+    di utenti sintetici. Le scritture ripetono con probabilità `duplicate_rate` una
+    richiesta già inviata con lo stesso request_id, come un client che ritenta.
+    """
+    def __init__(self, mix, users, tickers, duplicate_rate, user_prefix='load', domain='loadtest.it'):
+        entries = [item.split('=') for item in mix.split(',') if item]
+        self.methods = [name.strip() for name, _ in entries]
+        self.weights = [float(weight) for _, weight in entries]
+        self.users = users
+        self.tickers = tickers
+        self.duplicate_rate = duplicate_rate
+        self.user_prefix = user_prefix
+        self.domain = domain
+        self.lock = threading.Lock()
+        self.sent = collections.deque(maxlen=1000)
+        self.registered = []
+
+    def user_email(self, index):
+        return f"{self.user_prefix}{index}@{self.domain}"
+
+    def _email(self, rng):
+        return self.user_email(rng.randrange(self.users))
+
+    def next_request(self, rng):
+        method = rng.choices(self.methods, self.weights)[0]
+        if method in WRITES:
+            with self.lock:
+                if self.sent and rng.random() < self.duplicate_rate:
+                    return rng.choice(self.sent)
+        request = self._new_request(method, rng)
+        if method in WRITES:
+            with self.lock:
+                self.sent.append((method, request))
+        return method, request
+
+    def _new_request(self, method, rng):
+        request_id = str(uuid.uuid4())
+        ticker = rng.choice(self.tickers)
+        if method == 'RegisterUser':
+            email = f"{self.user_prefix}-new-{uuid.uuid4().hex[:12]}@{self.domain}"
+            with self.lock:
+                self.registered.append(email)
+            return service_pb2.RegisterUserRequest(email=email, ticker=ticker, request_id=request_id)
+        if method == 'UpdateUser':
+            return service_pb2.UpdateUserRequest(email=self._email(rng), ticker=ticker, request_id=request_id)
+        if method == 'DeleteUser':
+            # Senza utenti registrati dal mix si cancella un utente inesistente, così gli
+            # utenti sintetici di base restano disponibili per tutto il test.
+            with self.lock:
+                email = self.registered.pop() if self.registered else None
+            email = email or f"{self.user_prefix}-missing-{rng.randrange(10 ** 6)}@{self.domain}"
+            return service_pb2.DeleteUserRequest(email=email, request_id=request_id)
+        if method == 'LoginUser':
+            return service_pb2.LoginUserRequest(email=self._email(rng))
+        if method == 'GetLatestValue':
+            return service_pb2.GetLatestValueRequest(email=self._email(rng))
+        if method == 'GetAverageValue':
+            return service_pb2.GetAverageValueRequest(email=self._email(rng), count=rng.randint(1, 20))
+        if method == 'GetWindowStats':
+            return service_pb2.GetWindowStatsRequest(email=self._email(rng), window_seconds=rng.choice((3600, 86400, 604800)))
+        if method == 'GetLatestValues':
+            return service_pb2.GetLatestValuesRequest(emails=[self._email(rng) for _ in range(10)])
+        if method == 'GetAverageValues':
+            return service_pb2.GetAverageValuesRequest(emails=[self._email(rng) for _ in range(10)], count=10)
+        raise ValueError(f"RPC sconosciuta nel mix: {method}")
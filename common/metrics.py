@@ -0,0 +1,293 @@
+"""
+Metriche in formato testuale Prometheus (contatori, gauge e istogrammi con label),
+esposte da ogni servizio su un endpoint HTTP locale (/metrics).
+"""
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self.default = self._new_child()
+            self.children[()] = self.default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        Serie temporale per i valori di label indicati (nello stesso ordine di labelnames).
+        """
+        child = self.children.get(values)
+        if child is None:
+            values = tuple(str(value) for value in values)
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: attese le label {self.labelnames}")
+            with self.lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = self.children[values] = self._new_child()
+        return child
+
+    def samples(self):
+        with self.lock:
+            children = list(self.children.items())
+        for values, child in children:
+            labels = list(zip(self.labelnames, values))
+            for suffix, extra, value in child.samples():
+                yield self.name + suffix, labels + extra, value
+
+
+class _CounterChild:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        return [('_total', [], self.value)]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.default.inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def samples(self):
+        return [('', [], self.value)]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.default.set(value)
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            result.append(('_bucket', [('le', _format_value(bound))], cumulative))
+        result.append(('_sum', [], total))
+        result.append(('_count', [], cumulative))
+        return result
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.default.observe(value)
+
+    def time(self):
+        return self.default.time()
+
+
+class Registry:
+    """
+    Insieme delle metriche del processo. Oltre alle metriche registrate accetta
+    funzioni di raccolta, chiamate a ogni scrape, per i valori letti da altre
+    strutture (cache, pool di connessioni, circuit breaker).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = {}
+
+    def register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metrica già registrata con un altro tipo o altre label: {metric.name}")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def add_collector(self, name, callback):
+        """
+        Registra (o sostituisce) una funzione che restituisce famiglie di metriche
+        come tuple (nome, tipo, descrizione, [(labels, valore), ...]).
+        """
+        with self.lock:
+            self.collectors[name] = callback
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+            collectors = list(self.collectors.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for callback in collectors:
+            try:
+                families = list(callback())
+            except Exception as e:
+                lines.append(f"# Errore nella raccolta delle metriche: {_escape(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {_escape(documentation)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_stats(prefix, stats, documentation=''):
+    """
+    Espone come gauge `<prefix>_<chiave>` i valori numerici del dizionario restituito
+    da `stats()` (ad esempio LatestValueCache.stats o pool_status).
+    """
+    def collect():
+        for key, value in stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{prefix}_{key}", 'gauge', documentation or f"{prefix} {key}", [({}, value)]
+    REGISTRY.add_collector(prefix, collect)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(default_port, registry=REGISTRY):
+    """
+    Avvia in un thread l'endpoint /metrics sulla porta METRICS_PORT (o `default_port`).
+    Con porta 0 l'endpoint non viene avviato.
+    """
+    port = int(os.environ.get('METRICS_PORT', default_port))
+    if port == 0:
+        return None
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    http_server = ThreadingHTTPServer(('0.0.0.0', port), handler)
+    http_server.daemon_threads = True
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    print(f"Metriche disponibili su http://0.0.0.0:{port}/metrics")
+    return http_server
@@ -0,0 +1,57 @@
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+import datetime
+
+from .database import Base
+from .partitioning import setup_partitioning
+
+# Migrazioni dello schema, applicate in ordine e una sola volta per database.
+# Servono per i database già esistenti: su un database nuovo create_all()
+# crea già lo schema aggiornato e le istruzioni devono quindi essere idempotenti.
+MIGRATIONS = [
+    (
+        '0001_financial_data_ticker_timestamp_index',
+        "CREATE INDEX IF NOT EXISTS ix_financial_data_ticker_timestamp "
+        "ON financial_data (ticker, timestamp DESC)",
+    ),
+]
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations',
+    _metadata,
+    Column('id', String, primary_key=True),
+    Column('applied_at', DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc)),
+)
+
+
+def apply_migrations(engine):
+    """
+    Applica le migrazioni non ancora registrate nella tabella schema_migrations.
+    Su Postgres un advisory lock evita che più repliche le applichino in parallelo.
+    """
+    _metadata.create_all(bind=engine)
+    applied_now = []
+    with engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            # Le migrazioni possono superare lo statement_timeout del profilo del servizio.
+            connection.execute(text("SET LOCAL statement_timeout = 0"))
+            connection.execute(text("SELECT pg_advisory_xact_lock(724011)"))
+        applied = set(connection.execute(select(schema_migrations.c.id)).scalars())
+        for migration_id, statement in MIGRATIONS:
+            if migration_id in applied:
+                continue
+            connection.execute(text(statement))
+            connection.execute(schema_migrations.insert().values(id=migration_id))
+            applied_now.append(migration_id)
+    return applied_now
+
+
+def init_db(engine):
+    """
+    Crea le tabelle mancanti e porta lo schema all'ultima versione. Con il
+    partizionamento attivo financial_data viene creata partizionata prima di create_all().
+    """
+    setup_partitioning(engine)
+    Base.metadata.create_all(bind=engine)
+    return apply_migrations(engine)
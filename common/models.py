@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, Integer
+from sqlalchemy import Column, String, Float, DateTime, Integer, Index
 from .database import Base
 import datetime
 
@@ -12,4 +12,48 @@ class FinancialData(Base):
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String, index=True)
     value = Column(Float)
-    timestamp = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
+    timestamp = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    # Serve le letture "ultimi N valori di un ticker" (GetLatestValue, GetAverageValue)
+    # senza ordinare tutte le righe del ticker.
+    __table_args__ = (
+        Index('ix_financial_data_ticker_timestamp', 'ticker', timestamp.desc()),
+    )
+
+class ProcessedRequest(Base):
+    """
+    Risposte già inviate per request_id, condivise tra le repliche del server
+    quando IDEMPOTENCY_STORE=database.
+    """
+    __tablename__ = 'processed_requests'
+    request_id = Column(String, primary_key=True)
+    response = Column(String)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), index=True)
+
+class FinancialDataRollup(Base):
+    """
+    Aggregati OHLC di FinancialData per ticker e intervallo (resolution = '1m', '1h', '1d').
+    Somma e somma dei quadrati permettono di ricombinare media e deviazione standard
+    su più intervalli; first_at/last_at servono a unire correttamente open e close.
+    """
+    __tablename__ = 'financial_data_rollups'
+    resolution = Column(String, primary_key=True)
+    ticker = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    total = Column(Float)
+    total_sq = Column(Float)
+    samples = Column(Integer)
+    first_at = Column(DateTime)
+    last_at = Column(DateTime)
+
+class RollupState(Base):
+    """
+    Ultimo id di FinancialData già aggregato nei rollup.
+    """
+    __tablename__ = 'rollup_state'
+    name = Column(String, primary_key=True)
+    high_water_mark = Column(Integer, default=0)
@@ -0,0 +1,210 @@
+"""
+Modalità opzionale (solo Postgres) in cui financial_data è partizionata per intervalli
+di timestamp (FINANCIAL_DATA_PARTITIONING = 'day', 'week' o 'month'). Le partizioni
+vengono create in anticipo dal cleaner e quelle scadute vengono staccate ed eliminate,
+invece di cancellare le righe una per una.
+"""
+import datetime
+import os
+
+from sqlalchemy import text
+
+from .models import FinancialData
+
+FINANCIAL_DATA_PARTITIONING = os.environ.get('FINANCIAL_DATA_PARTITIONING', 'none').lower()
+PARTITION_PREMAKE = int(os.environ.get('PARTITION_PREMAKE', '3'))
+PARTITION_RETENTION_DAYS = float(os.environ.get('PARTITION_RETENTION_DAYS', '30'))
+
+INTERVALS = ('day', 'week', 'month')
+# Lock condiviso con le migrazioni: creazione dello schema e manutenzione non si sovrappongono.
+ADVISORY_LOCK_ID = 724011
+
+
+def interval_start(timestamp, interval):
+    day = datetime.datetime(timestamp.year, timestamp.month, timestamp.day)
+    if interval == 'day':
+        return day
+    if interval == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_start(start, interval):
+    if interval == 'day':
+        return start + datetime.timedelta(days=1)
+    if interval == 'week':
+        return start + datetime.timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class PartitionManager:
+    """
+    Crea e mantiene le partizioni per intervallo di una tabella partizionata per timestamp.
+    Le righe fuori da ogni intervallo finiscono nella partizione di default e vengono
+    spostate nella partizione corretta quando questa viene creata.
+    """
+    def __init__(self, table=FinancialData.__tablename__, interval=FINANCIAL_DATA_PARTITIONING,
+                 premake=PARTITION_PREMAKE, retention_days=PARTITION_RETENTION_DAYS):
+        if interval not in INTERVALS:
+            raise ValueError(f"Intervallo di partizionamento non valido: {interval}")
+        self.table = table
+        self.interval = interval
+        self.premake = premake
+        self.retention_days = retention_days
+
+    @property
+    def default_partition(self):
+        return f"{self.table}_default"
+
+    def partition_name(self, start):
+        return f"{self.table}_p{start:%Y%m%d}"
+
+    def _partition_start(self, name):
+        prefix = f"{self.table}_p"
+        if not name.startswith(prefix):
+            return None
+        try:
+            return datetime.datetime.strptime(name[len(prefix):], '%Y%m%d')
+        except ValueError:
+            return None
+
+    def exists(self, connection, name):
+        return connection.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None
+
+    def is_partitioned(self, connection):
+        return connection.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"),
+            {'name': self.table},
+        ).scalar() is not None
+
+    def create_table(self, connection, indexes=()):
+        """
+        Crea la tabella partizionata con la stessa struttura di FinancialData. La chiave
+        primaria deve includere la colonna di partizionamento, quindi è (id, timestamp).
+        """
+        connection.execute(text(
+            f"CREATE TABLE {self.table} ("
+            " id SERIAL NOT NULL,"
+            " ticker VARCHAR,"
+            " value DOUBLE PRECISION,"
+            " timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+            " PRIMARY KEY (id, timestamp)"
+            ") PARTITION BY RANGE (timestamp)"
+        ))
+        connection.execute(text(f"CREATE TABLE {self.default_partition} PARTITION OF {self.table} DEFAULT"))
+        for index in indexes:
+            index.create(connection, checkfirst=True)
+
+    def list_partitions(self, connection):
+        """
+        Partizioni per intervallo esistenti, come lista ordinata di (inizio, nome).
+        """
+        names = connection.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ), {'name': self.table}).scalars()
+        partitions = []
+        for name in names:
+            start = self._partition_start(name)
+            if start is not None:
+                partitions.append((start, name))
+        return sorted(partitions)
+
+    def create_partition(self, connection, start):
+        """
+        Crea la partizione [start, intervallo successivo) spostandovi le righe dello
+        stesso intervallo eventualmente finite nella partizione di default.
+        """
+        end = next_start(start, self.interval)
+        name = self.partition_name(start)
+        bounds = {'start': start, 'end': end}
+        connection.execute(text(
+            f"CREATE TABLE {name} (LIKE {self.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        connection.execute(text(
+            f"INSERT INTO {name} SELECT * FROM {self.default_partition} "
+            "WHERE timestamp >= :start AND timestamp < :end"
+        ), bounds)
+        connection.execute(text(
+            f"DELETE FROM {self.default_partition} WHERE timestamp >= :start AND timestamp < :end"
+        ), bounds)
+        connection.execute(text(
+            f"ALTER TABLE {self.table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d %H:%M:%S}') TO ('{end:%Y-%m-%d %H:%M:%S}')"
+        ))
+        return name
+
+    def ensure_partitions(self, connection, now=None):
+        """
+        Garantisce le partizioni dall'intervallo precedente a quello corrente fino a
+        `premake` intervalli futuri. Restituisce i nomi delle partizioni create.
+        """
+        now = now or _utcnow()
+        current = interval_start(now, self.interval)
+        start = interval_start(current - datetime.timedelta(days=1), self.interval)
+        created = []
+        for _ in range(self.premake + 2):
+            if not self.exists(connection, self.partition_name(start)):
+                created.append(self.create_partition(connection, start))
+            start = next_start(start, self.interval)
+        return created
+
+    def drop_expired(self, connection, now=None):
+        """
+        Stacca ed elimina le partizioni che terminano prima di now - retention.
+        Restituisce i nomi delle partizioni eliminate.
+        """
+        cutoff = (now or _utcnow()) - datetime.timedelta(days=self.retention_days)
+        dropped = []
+        for start, name in self.list_partitions(connection):
+            if next_start(start, self.interval) <= cutoff:
+                connection.execute(text(f"ALTER TABLE {self.table} DETACH PARTITION {name}"))
+                connection.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        # Le righe scadute finite nella partizione di default vengono cancellate.
+        result = connection.execute(
+            text(f"DELETE FROM {self.default_partition} WHERE timestamp < :cutoff"), {'cutoff': cutoff})
+        return dropped, result.rowcount
+
+    def maintain(self, engine, now=None):
+        """
+        Passata di manutenzione: crea le partizioni future ed elimina quelle scadute.
+        """
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': ADVISORY_LOCK_ID})
+            created = self.ensure_partitions(connection, now)
+            dropped, default_deleted = self.drop_expired(connection, now)
+        return {'created': created, 'dropped': dropped, 'default_rows_deleted': default_deleted}
+
+
+def partitioning_enabled(engine):
+    return FINANCIAL_DATA_PARTITIONING != 'none' and engine.dialect.name == 'postgresql'
+
+
+def setup_partitioning(engine):
+    """
+    Chiamata da init_db prima di create_all(): se il partizionamento è attivo e la
+    tabella non esiste la crea partizionata. Una tabella esistente non partizionata
+    non viene convertita automaticamente.
+    """
+    if FINANCIAL_DATA_PARTITIONING == 'none':
+        return
+    if engine.dialect.name != 'postgresql':
+        print(f"Partizionamento di financial_data non supportato su {engine.dialect.name}: ignorato")
+        return
+    manager = PartitionManager()
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': ADVISORY_LOCK_ID})
+        if not manager.exists(connection, manager.table):
+            manager.create_table(connection, FinancialData.__table__.indexes)
+        elif not manager.is_partitioned(connection):
+            print("La tabella financial_data esiste già e non è partizionata: "
+                  "il partizionamento richiede una migrazione manuale dei dati")
+            return
+        manager.ensure_partitions(connection)
@@ -0,0 +1,152 @@
+import math
+
+from sqlalchemy import func, select
+
+from .models import FinancialData, User
+from .rollups import RESOLUTIONS, bucket_start, choose_resolution, rolled_up_id, rollup_stats
+
+
+def users_tickers(session, emails):
+    """
+    Ticker di più utenti con una sola query: dizionario email -> ticker.
+    """
+    if not emails:
+        return {}
+    rows = session.execute(select(User.email, User.ticker).where(User.email.in_(emails)))
+    return {email: ticker for email, ticker in rows}
+
+
+def _ranked(tickers):
+    return select(
+        FinancialData.ticker.label('ticker'),
+        FinancialData.value.label('value'),
+        FinancialData.timestamp.label('timestamp'),
+        func.row_number().over(
+            partition_by=FinancialData.ticker,
+            order_by=(FinancialData.timestamp.desc(), FinancialData.id.desc()),
+        ).label('position'),
+    ).where(FinancialData.ticker.in_(tickers)).subquery()
+
+
+def latest_values(session, tickers):
+    """
+    Ultimo valore di più ticker con una sola query: dizionario ticker -> (valore, timestamp).
+    Su Postgres usa DISTINCT ON (ticker), altrove ROW_NUMBER().
+    """
+    if not tickers:
+        return {}
+    if session.get_bind().dialect.name == 'postgresql':
+        statement = select(FinancialData.ticker, FinancialData.value, FinancialData.timestamp)\
+            .where(FinancialData.ticker.in_(tickers))\
+            .order_by(FinancialData.ticker, FinancialData.timestamp.desc(), FinancialData.id.desc())\
+            .distinct(FinancialData.ticker)
+    else:
+        ranked = _ranked(tickers)
+        statement = select(ranked.c.ticker, ranked.c.value, ranked.c.timestamp).where(ranked.c.position == 1)
+    return {ticker: (value, timestamp) for ticker, value, timestamp in session.execute(statement)}
+
+
+def average_values(session, tickers, count):
+    """
+    Media degli ultimi `count` valori di più ticker con una sola query: dizionario ticker -> media.
+    """
+    if not tickers or count <= 0:
+        return {}
+    ranked = _ranked(tickers)
+    statement = select(ranked.c.ticker, func.avg(ranked.c.value))\
+        .where(ranked.c.position <= count)\
+        .group_by(ranked.c.ticker)
+    return {ticker: average for ticker, average in session.execute(statement)}
+
+
+class WindowStats:
+    """
+    Statistiche di un ticker su una finestra temporale. `resolution` è 'raw' se
+    calcolate solo sui dati grezzi, altrimenti la risoluzione dei rollup usati;
+    `start` è l'inizio effettivo della finestra, arrotondato se si usano i rollup.
+    """
+    __slots__ = ('samples', 'total', 'total_sq', 'minimum', 'maximum', 'resolution', 'start')
+
+    def __init__(self, resolution, start):
+        self.samples = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.resolution = resolution
+        self.start = start
+
+    def add(self, samples, total, total_sq, minimum, maximum):
+        if not samples:
+            return
+        self.samples += int(samples)
+        self.total += total
+        self.total_sq += total_sq
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+
+    @property
+    def average(self):
+        return self.total / self.samples if self.samples else None
+
+    @property
+    def stddev(self):
+        """
+        Deviazione standard della popolazione, ricavata da somma e somma dei quadrati.
+        """
+        if not self.samples:
+            return None
+        mean = self.total / self.samples
+        return math.sqrt(max(0.0, self.total_sq / self.samples - mean * mean))
+
+
+def raw_window_stats(session, tickers, start, end=None, after_id=None):
+    """
+    Aggregati dei dati grezzi per ticker nella finestra [start, end], calcolati nel
+    database con una scansione per intervallo su (ticker, timestamp): dizionario
+    ticker -> (campioni, somma, somma dei quadrati, minimo, massimo).
+    Con `after_id` considera solo i record non ancora aggregati nei rollup.
+    """
+    if not tickers:
+        return {}
+    statement = select(
+        FinancialData.ticker,
+        func.count(FinancialData.value),
+        func.sum(FinancialData.value),
+        func.sum(FinancialData.value * FinancialData.value),
+        func.min(FinancialData.value),
+        func.max(FinancialData.value),
+    ).where(FinancialData.ticker.in_(tickers), FinancialData.timestamp >= start)
+    if end is not None:
+        statement = statement.where(FinancialData.timestamp <= end)
+    if after_id is not None:
+        statement = statement.where(FinancialData.id > after_id)
+    statement = statement.group_by(FinancialData.ticker)
+    return {ticker: tuple(values) for ticker, *values in session.execute(statement)}
+
+
+def window_stats(session, tickers, start, end=None):
+    """
+    Statistiche per ticker sulla finestra [start, end]: dizionario ticker -> WindowStats.
+    Per le finestre lunghe usa i rollup alla risoluzione scelta da choose_resolution
+    (l'inizio della finestra è arrotondato all'intervallo) e aggiunge i record grezzi
+    arrivati dopo l'ultima aggregazione; per le finestre brevi usa i dati grezzi.
+    """
+    resolution = choose_resolution(start, end)
+    parts = []
+    if resolution is None:
+        parts.append(raw_window_stats(session, tickers, start, end))
+    else:
+        # Rollup e record grezzi recenti usano lo stesso inizio, arrotondato all'intervallo.
+        start = bucket_start(start, RESOLUTIONS[resolution][0])
+        after_id = rolled_up_id(session)
+        parts.append(rollup_stats(session, tickers, start, end, resolution))
+        parts.append(raw_window_stats(session, tickers, start, end, after_id))
+    result = {}
+    for part in parts:
+        for ticker, values in part.items():
+            stats = result.get(ticker)
+            if stats is None:
+                stats = result[ticker] = WindowStats(resolution or 'raw', start)
+            stats.add(*values)
+    return {ticker: stats for ticker, stats in result.items() if stats.samples}
@@ -0,0 +1,248 @@
+"""
+Rollup a più risoluzioni (1 minuto, 1 ora, 1 giorno) dei dati grezzi di FinancialData:
+open/high/low/close, somma, somma dei quadrati e numero di campioni per intervallo.
+Il cleaner li aggiorna prima della retention, così la storia resta disponibile anche
+dopo la cancellazione dei record grezzi.
+"""
+import datetime
+import os
+
+from sqlalchemy import func, select, tuple_
+
+from .models import FinancialData, FinancialDataRollup, RollupState
+
+ROLLUPS_ENABLED = os.environ.get('ROLLUPS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ROLLUP_BATCH_SIZE = int(os.environ.get('ROLLUP_BATCH_SIZE', '50000'))
+ROLLUP_MIN_BUCKETS = int(os.environ.get('ROLLUP_MIN_BUCKETS', '24'))
+
+# Risoluzione -> (durata dell'intervallo in secondi, giorni di conservazione; 0 = sempre).
+RESOLUTIONS = {
+    '1m': (60, int(os.environ.get('ROLLUP_1M_RETENTION_DAYS', '7'))),
+    '1h': (3600, int(os.environ.get('ROLLUP_1H_RETENTION_DAYS', '90'))),
+    '1d': (86400, int(os.environ.get('ROLLUP_1D_RETENTION_DAYS', '0'))),
+}
+STATE_NAME = 'financial_data'
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _naive_utc(timestamp):
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def bucket_start(timestamp, seconds):
+    """
+    Inizio dell'intervallo di `seconds` secondi che contiene `timestamp` (in UTC).
+    """
+    offset = (_naive_utc(timestamp) - _EPOCH) // datetime.timedelta(seconds=seconds)
+    return _EPOCH + datetime.timedelta(seconds=offset * seconds)
+
+
+class _Bucket:
+    __slots__ = ('open', 'high', 'low', 'close', 'total', 'total_sq', 'samples', 'first_at', 'last_at')
+
+    def __init__(self, value, timestamp):
+        self.open = self.high = self.low = self.close = value
+        self.total = value
+        self.total_sq = value * value
+        self.samples = 1
+        self.first_at = self.last_at = timestamp
+
+    def add(self, value, timestamp):
+        if timestamp < self.first_at:
+            self.open, self.first_at = value, timestamp
+        if timestamp >= self.last_at:
+            self.close, self.last_at = value, timestamp
+        self.high = max(self.high, value)
+        self.low = min(self.low, value)
+        self.total += value
+        self.total_sq += value * value
+        self.samples += 1
+
+    def merge_into(self, row):
+        """
+        Unisce l'intervallo a una riga di rollup già presente.
+        """
+        if row.first_at is None or self.first_at < row.first_at:
+            row.open, row.first_at = self.open, self.first_at
+        if row.last_at is None or self.last_at >= row.last_at:
+            row.close, row.last_at = self.close, self.last_at
+        row.high = self.high if row.high is None else max(row.high, self.high)
+        row.low = self.low if row.low is None else min(row.low, self.low)
+        row.total = (row.total or 0.0) + self.total
+        row.total_sq = (row.total_sq or 0.0) + self.total_sq
+        row.samples = (row.samples or 0) + self.samples
+
+
+def aggregate(rows, resolutions=RESOLUTIONS):
+    """
+    Raggruppa righe (ticker, valore, timestamp) per risoluzione e intervallo:
+    dizionario resolution -> {(ticker, bucket_start): _Bucket}.
+    """
+    buckets = {resolution: {} for resolution in resolutions}
+    for ticker, value, timestamp in rows:
+        if value is None or timestamp is None:
+            continue
+        timestamp = _naive_utc(timestamp)
+        for resolution, (seconds, _) in resolutions.items():
+            key = (ticker, bucket_start(timestamp, seconds))
+            bucket = buckets[resolution].get(key)
+            if bucket is None:
+                buckets[resolution][key] = _Bucket(value, timestamp)
+            else:
+                bucket.add(value, timestamp)
+    return buckets
+
+
+def rolled_up_id(session):
+    """
+    Ultimo id di FinancialData incluso nei rollup (0 se non ancora calcolati).
+    """
+    state = session.get(RollupState, STATE_NAME)
+    return state.high_water_mark if state is not None else 0
+
+
+class RollupPipeline:
+    """
+    Aggrega i record di FinancialData con id oltre l'high-water mark salvato in
+    rollup_state, a blocchi di `batch_size` righe. Rollup e high-water mark vengono
+    aggiornati nella stessa transazione, quindi ogni record è contato una sola volta
+    anche se il cleaner si interrompe a metà. I record arrivati in ritardo vengono
+    uniti agli intervalli già esistenti.
+    """
+    def __init__(self, session_factory, batch_size=ROLLUP_BATCH_SIZE, resolutions=RESOLUTIONS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.resolutions = resolutions
+
+    def _existing(self, session, resolution, keys):
+        existing = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start:start + 1000]
+            rows = session.execute(
+                select(FinancialDataRollup).where(
+                    FinancialDataRollup.resolution == resolution,
+                    tuple_(FinancialDataRollup.ticker, FinancialDataRollup.bucket_start).in_(chunk),
+                )
+            ).scalars()
+            for row in rows:
+                existing[(row.ticker, row.bucket_start)] = row
+        return existing
+
+    def run_batch(self):
+        """
+        Aggrega un blocco di record. Restituisce il numero di record aggregati.
+        """
+        with self.session_factory() as session:
+            state = session.get(RollupState, STATE_NAME)
+            if state is None:
+                state = RollupState(name=STATE_NAME, high_water_mark=0)
+                session.add(state)
+            rows = session.execute(
+                select(FinancialData.id, FinancialData.ticker, FinancialData.value, FinancialData.timestamp)
+                .where(FinancialData.id > state.high_water_mark)
+                .order_by(FinancialData.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                session.commit()
+                return 0
+            buckets = aggregate(((ticker, value, timestamp) for _, ticker, value, timestamp in rows),
+                                self.resolutions)
+            for resolution, entries in buckets.items():
+                existing = self._existing(session, resolution, entries.keys())
+                for (ticker, start), bucket in entries.items():
+                    row = existing.get((ticker, start))
+                    if row is None:
+                        row = FinancialDataRollup(resolution=resolution, ticker=ticker, bucket_start=start)
+                        session.add(row)
+                    bucket.merge_into(row)
+            state.high_water_mark = rows[-1][0]
+            session.commit()
+            return len(rows)
+
+    def prune(self, now=None):
+        """
+        Cancella i rollup oltre la conservazione prevista per ciascuna risoluzione.
+        """
+        now = now or _utcnow()
+        deleted = 0
+        with self.session_factory() as session:
+            for resolution, (_, retention_days) in self.resolutions.items():
+                if retention_days <= 0:
+                    continue
+                cutoff = now - datetime.timedelta(days=retention_days)
+                result = session.query(FinancialDataRollup).filter(
+                    FinancialDataRollup.resolution == resolution,
+                    FinancialDataRollup.bucket_start < cutoff,
+                ).delete(synchronize_session=False)
+                deleted += result
+            session.commit()
+        return deleted
+
+    def run_once(self, max_batches=100):
+        """
+        Aggrega i nuovi record fino a raggiungere la fine della tabella (al più
+        `max_batches` blocchi) e cancella i rollup scaduti.
+        """
+        aggregated = 0
+        for _ in range(max_batches):
+            count = self.run_batch()
+            aggregated += count
+            if count < self.batch_size:
+                break
+        return {'aggregated': aggregated, 'pruned': self.prune()}
+
+
+def choose_resolution(start, end=None, now=None, resolutions=RESOLUTIONS, min_buckets=ROLLUP_MIN_BUCKETS):
+    """
+    Risoluzione più grossolana che copre la finestra [start, end] con almeno
+    `min_buckets` intervalli ed è ancora conservata per l'inizio della finestra.
+    None se nessuna risoluzione è adatta (finestra troppo corta: vanno usati i dati grezzi).
+    """
+    now = now or _utcnow()
+    end = end or now
+    window = (_naive_utc(end) - _naive_utc(start)).total_seconds()
+    chosen = None
+    for resolution, (seconds, retention_days) in sorted(resolutions.items(), key=lambda item: item[1][0]):
+        if window < seconds * min_buckets:
+            break
+        if retention_days and _naive_utc(start) < now - datetime.timedelta(days=retention_days):
+            continue
+        chosen = resolution
+    return chosen
+
+
+def rollup_stats(session, tickers, start, end=None, resolution=None):
+    """
+    Statistiche per ticker calcolate nel database dai rollup: dizionario
+    ticker -> (campioni, somma, somma dei quadrati, minimo, massimo). La finestra è
+    approssimata ai confini degli intervalli della risoluzione usata.
+    """
+    if not tickers:
+        return {}
+    resolution = resolution or choose_resolution(start, end)
+    if resolution is None:
+        return {}
+    statement = select(
+        FinancialDataRollup.ticker,
+        func.sum(FinancialDataRollup.samples),
+        func.sum(FinancialDataRollup.total),
+        func.sum(FinancialDataRollup.total_sq),
+        func.min(FinancialDataRollup.low),
+        func.max(FinancialDataRollup.high),
+    ).where(
+        FinancialDataRollup.resolution == resolution,
+        FinancialDataRollup.ticker.in_(tickers),
+        FinancialDataRollup.bucket_start >= bucket_start(start, RESOLUTIONS[resolution][0]),
+    )
+    if end is not None:
+        statement = statement.where(FinancialDataRollup.bucket_start <= _naive_utc(end))
+    statement = statement.group_by(FinancialDataRollup.ticker)
+    return {ticker: tuple(values) for ticker, *values in session.execute(statement)}
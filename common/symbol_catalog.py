@@ -0,0 +1,143 @@
+"""
+Catalogo locale dei simboli: ricorda quali ticker sono validi e quali no, in memoria
+e su un file JSON condiviso tra server e data collector (SYMBOL_CATALOG_PATH, nello
+stesso volume per entrambi). Il client lo consulta tramite l'RPC CheckTicker. I ticker
+validi e quelli non validi hanno TTL diversi; gli errori transitori di verifica non
+vengono memorizzati.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+SYMBOL_CATALOG_PATH = os.environ.get(
+    'SYMBOL_CATALOG_PATH', os.path.join(os.path.expanduser('~'), '.hw1_symbols.json'))
+SYMBOL_VALID_TTL = float(os.environ.get('SYMBOL_VALID_TTL', str(7 * 86400)))
+SYMBOL_INVALID_TTL = float(os.environ.get('SYMBOL_INVALID_TTL', '86400'))
+
+
+def normalize(symbol):
+    return (symbol or '').strip().upper()
+
+
+class SymbolCatalog:
+    """
+    Ogni voce è {simbolo: [valido, istante della verifica]}. Le ricerche leggono solo
+    la mappa in memoria; un thread in background rilegge il file ogni `reload_interval`
+    secondi se modificato da un altro processo. Il file viene riscritto in modo atomico,
+    dopo aver unito le voci più recenti presenti su disco, solo quando una voce cambia
+    esito o va rinnovata (oltre metà del suo TTL).
+    """
+    def __init__(self, path=SYMBOL_CATALOG_PATH, valid_ttl=SYMBOL_VALID_TTL,
+                 invalid_ttl=SYMBOL_INVALID_TTL, reload_interval=5.0):
+        self.path = path
+        self.valid_ttl = valid_ttl
+        self.invalid_ttl = invalid_ttl
+        self.reload_interval = reload_interval
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.loaded_mtime = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._reload()
+        if self.path:
+            threading.Thread(target=self._reload_loop, name='symbol-catalog', daemon=True).start()
+
+    def _read_file(self):
+        try:
+            with open(self.path) as catalog_file:
+                data = json.load(catalog_file)
+        except (OSError, ValueError):
+            return {}
+        return {symbol: (bool(entry[0]), float(entry[1])) for symbol, entry in data.items()}
+
+    def _merge(self, entries):
+        for symbol, entry in entries.items():
+            current = self.entries.get(symbol)
+            if current is None or current[1] < entry[1]:
+                self.entries[symbol] = entry
+
+    def _reload(self):
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self.loaded_mtime:
+            entries = self._read_file()
+            with self.lock:
+                self._merge(entries)
+                self.loaded_mtime = mtime
+
+    def _reload_loop(self):
+        while True:
+            time.sleep(self.reload_interval)
+            self._reload()
+
+    def _save(self):
+        if not self.path:
+            return
+        with self.save_lock:
+            on_disk = self._read_file()
+            with self.lock:
+                self._merge(on_disk)
+                data = {symbol: list(entry) for symbol, entry in self.entries.items()}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                os.makedirs(directory, exist_ok=True)
+                descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                with os.fdopen(descriptor, 'w') as catalog_file:
+                    json.dump(data, catalog_file)
+                os.replace(temporary, self.path)
+                mtime = os.stat(self.path).st_mtime
+                with self.lock:
+                    self.loaded_mtime = mtime
+                    self.writes += 1
+            except OSError as e:
+                print(f"Impossibile salvare il catalogo dei simboli in {self.path}: {e}")
+
+    def lookup(self, symbol):
+        """
+        True o False se il simbolo è noto e la voce non è scaduta, altrimenti None.
+        """
+        symbol = normalize(symbol)
+        with self.lock:
+            entry = self.entries.get(symbol)
+            if entry is not None:
+                valid, checked_at = entry
+                ttl = self.valid_ttl if valid else self.invalid_ttl
+                if time.time() - checked_at < ttl:
+                    self.hits += 1
+                    return valid
+            self.misses += 1
+            return None
+
+    def record_many(self, results):
+        """
+        Registra l'esito di più verifiche, con al più una scrittura del file: solo se
+        un simbolo è nuovo, ha cambiato esito o ha superato metà del proprio TTL.
+        """
+        now = time.time()
+        changed = False
+        with self.lock:
+            for symbol, valid in results.items():
+                symbol, valid = normalize(symbol), bool(valid)
+                entry = self.entries.get(symbol)
+                ttl = self.valid_ttl if valid else self.invalid_ttl
+                if entry is None or entry[0] != valid or now - entry[1] >= ttl / 2:
+                    self.entries[symbol] = (valid, now)
+                    changed = True
+        if changed:
+            self._save()
+
+    def is_known_invalid(self, symbol):
+        return self.lookup(symbol) is False
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                    'writes': self.writes}
@@ -0,0 +1,113 @@
+import datetime
+import os
+import threading
+
+from common.queries import latest_values
+from market_hours import MarketHours
+
+CHANGE_DETECTION = os.environ.get('CHANGE_DETECTION', 'true').lower() in ('1', 'true', 'yes')
+# Variazione relativa sotto la quale un prezzo è considerato invariato (0 = uguaglianza esatta).
+CHANGE_TOLERANCE = float(os.environ.get('CHANGE_TOLERANCE', '0'))
+HEARTBEAT_INTERVAL = float(os.environ.get('HEARTBEAT_INTERVAL', '900'))
+MARKET_CLOSED_HEARTBEAT_INTERVAL = float(os.environ.get('MARKET_CLOSED_HEARTBEAT_INTERVAL', '21600'))
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _epoch_seconds(timestamp):
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return (timestamp - _EPOCH).total_seconds()
+
+
+class ChangeDetector:
+    """
+    Ricorda l'ultimo valore scritto per ticker e scarta i prezzi invariati, salvo
+    quando è trascorso l'intervallo di heartbeat dall'ultima scrittura: i lettori
+    vedono così un timestamp recente anche a prezzo fermo. A mercato chiuso
+    l'heartbeat è più lungo. Al primo incontro di un ticker l'ultimo valore viene
+    letto dal database, così un riavvio del collector non riscrive tutti i ticker.
+    """
+    def __init__(self, tolerance=CHANGE_TOLERANCE, heartbeat=HEARTBEAT_INTERVAL,
+                 closed_heartbeat=MARKET_CLOSED_HEARTBEAT_INTERVAL, market=None):
+        self.tolerance = tolerance
+        self.heartbeat = heartbeat
+        self.closed_heartbeat = closed_heartbeat
+        self.market = market or MarketHours()
+        self.last_written = {}
+        self.lock = threading.Lock()
+        self.seen = 0
+        self.suppressed = 0
+        self.heartbeats = 0
+
+    def bootstrap(self, session, tickers):
+        """
+        Carica dal database l'ultimo valore dei ticker non ancora noti.
+        """
+        with self.lock:
+            missing = [ticker for ticker in tickers if ticker not in self.last_written]
+        if not missing:
+            return
+        loaded = latest_values(session, missing)
+        with self.lock:
+            for ticker, (value, timestamp) in loaded.items():
+                if ticker not in self.last_written and value is not None and timestamp is not None:
+                    self.last_written[ticker] = (value, _epoch_seconds(timestamp))
+
+    def _unchanged(self, previous, value):
+        if self.tolerance <= 0:
+            return previous == value
+        return abs(value - previous) <= self.tolerance * max(abs(previous), abs(value))
+
+    def changed(self, prices, now=None):
+        """
+        Prezzi del ciclo da scrivere: quelli nuovi o variati e quelli invariati il cui
+        heartbeat è scaduto.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        now_seconds = _epoch_seconds(now)
+        to_write = {}
+        with self.lock:
+            for ticker, price in prices.items():
+                self.seen += 1
+                last = self.last_written.get(ticker)
+                try:
+                    unchanged = last is not None and self._unchanged(last[0], float(price))
+                except (TypeError, ValueError):
+                    unchanged = False
+                if unchanged:
+                    heartbeat = self.heartbeat if self.market.is_open(now, ticker) else self.closed_heartbeat
+                    if now_seconds - last[1] < heartbeat:
+                        self.suppressed += 1
+                        continue
+                    self.heartbeats += 1
+                to_write[ticker] = price
+        return to_write
+
+    def mark_written(self, prices, now=None):
+        """
+        Registra i prezzi effettivamente salvati (da chiamare dopo la scrittura).
+        """
+        now_seconds = _epoch_seconds(now or datetime.datetime.now(datetime.timezone.utc))
+        with self.lock:
+            for ticker, price in prices.items():
+                self.last_written[ticker] = (float(price), now_seconds)
+
+    def forget(self, tickers_in_use):
+        """
+        Dimentica i ticker non più seguiti da alcun utente.
+        """
+        tickers_in_use = set(tickers_in_use)
+        with self.lock:
+            for ticker in [t for t in self.last_written if t not in tickers_in_use]:
+                del self.last_written[ticker]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'tracked': len(self.last_written),
+                'seen': self.seen,
+                'suppressed': self.suppressed,
+                'heartbeats': self.heartbeats,
+                'write_reduction_ratio': round(self.suppressed / self.seen, 4) if self.seen else 0.0,
+            }
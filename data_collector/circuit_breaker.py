@@ -1,36 +1,116 @@
+import threading
 import time
 
+
+class CircuitOpenError(Exception):
+    def __init__(self, name=None):
+        super().__init__(f"Circuit is open: {name}" if name else "Circuit is open")
+
+
 class CircuitBreaker:
-    def __init__(self, failure_threshold=5, recovery_time=60):
+    """
+    Circuit breaker thread-safe. In stato HALF-OPEN lascia passare una sola
+    chiamata di prova alla volta: le altre vengono rifiutate finché la prova non termina.
+    """
+    def __init__(self, failure_threshold=5, recovery_time=60, name=None):
         self.failure_threshold = failure_threshold
         self.failure_count = 0
         self.last_failure_time = 0
         self.recovery_time = recovery_time
         self.state = 'CLOSED'
+        self.name = name or 'default'
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
 
-    def call(self, func, *args, **kwargs):
-        if self.state == 'OPEN':
-            if time.time() - self.last_failure_time > self.recovery_time:
-               
-                self.state = 'HALF-OPEN'
-                print("Circuito in stato HALF-OPEN: sto tentando di ripristinare il servizio...")
-            else:
-                print("Circuito in stato OPEN: le richieste sono attualmente bloccate.")
-                raise Exception("Circuit is open")
+    def allow_request(self):
+        with self.lock:
+            if self.state == 'CLOSED':
+                return True
+            if self.state == 'OPEN':
+                if time.time() - self.last_failure_time > self.recovery_time:
+                    self.state = 'HALF-OPEN'
+                    print(f"Circuito {self.name} in stato HALF-OPEN: sto tentando di ripristinare il servizio...")
+                else:
+                    return False
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
 
-        try:
-            result = func(*args, **kwargs)
-         
+    def record_success(self):
+        with self.lock:
             self.failure_count = 0
+            self.trial_in_flight = False
             self.state = 'CLOSED'
-            return result
-        except Exception as e:
+
+    def record_failure(self, error=None):
+        with self.lock:
             self.failure_count += 1
             self.last_failure_time = time.time()
-            print(f"Errore durante la chiamata a '{func.__name__}': {e}. Numero di fallimenti: {self.failure_count}/{self.failure_threshold}")
-
-            if self.failure_count >= self.failure_threshold:
+            self.trial_in_flight = False
+            if error is not None:
+                print(f"Errore sul circuito {self.name}: {error}. Numero di fallimenti: {self.failure_count}/{self.failure_threshold}")
+            if self.state != 'OPEN' and (self.state == 'HALF-OPEN' or self.failure_count >= self.failure_threshold):
                 self.state = 'OPEN'
-                print("Circuito aperto: il numero massimo di fallimenti è stato raggiunto. Bloccando le chiamate per un po'.")
+                print(f"Circuito {self.name} aperto: il numero massimo di fallimenti è stato raggiunto. Bloccando le chiamate per un po'.")
+
+    def release(self):
+        """
+        Libera l'eventuale chiamata di prova senza contarla né come successo né come fallimento.
+        """
+        with self.lock:
+            self.trial_in_flight = False
+
+    def call(self, func, *args, **kwargs):
+        if not self.allow_request():
+            print(f"Circuito {self.name} in stato {self.state}: le richieste sono attualmente bloccate.")
+            raise CircuitOpenError(self.name)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
             raise e
+        self.record_success()
+        return result
+
+
+class BreakerRegistry:
+    """
+    Registro condiviso di circuit breaker, uno per ticker e uno per endpoint a monte,
+    così che pochi ticker non validi non blocchino la raccolta di quelli sani.
+    """
+    def __init__(self, failure_threshold=5, recovery_time=60):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, kind, key):
+        name = f"{kind}:{key}"
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.get(name)
+                if breaker is None:
+                    breaker = CircuitBreaker(self.failure_threshold, self.recovery_time, name=name)
+                    self.breakers[name] = breaker
+        return breaker
+
+    def for_ticker(self, ticker):
+        return self.get('ticker', ticker)
+
+    def for_endpoint(self, host):
+        return self.get('endpoint', host)
 
+    def state_counts(self):
+        """
+        Numero di breaker per tipo e stato, es. {'ticker': {'CLOSED': 10, 'OPEN': 2, 'HALF-OPEN': 0}}.
+        """
+        with self.lock:
+            breakers = list(self.breakers.values())
+        counts = {}
+        for breaker in breakers:
+            kind = breaker.name.split(':', 1)[0]
+            per_state = counts.setdefault(kind, {'CLOSED': 0, 'OPEN': 0, 'HALF-OPEN': 0})
+            per_state[breaker.state] += 1
+        return counts
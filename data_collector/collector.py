@@ -1,41 +1,162 @@
-import yfinance as yf
+import datetime
+import os
 import time
-from common.database import SessionLocal
-from common.models import FinancialData, User
-from circuit_breaker import CircuitBreaker
-import logging
-
-logging.getLogger('yfinance').setLevel(logging.CRITICAL)
-def get_stock_price(ticker):
-    data = yf.Ticker(ticker)
-    hist = data.history(period="1d")
-    if not hist.empty:
-        return float(hist['Close'][0])  
-    else:
-        raise ValueError(f"Nessun dato trovato per il ticker: {ticker}")
+from common import metrics
+from common.database import SessionLocal, pool_status
+from common.models import User
+from common.symbol_catalog import SymbolCatalog
+from change_detector import CHANGE_DETECTION, ChangeDetector
+from engine import create_collection_engine
+from price_source import create_price_source
+from scheduler import AdaptiveScheduler, subscriber_counts
+from writer import write_prices
 
-def main():
-    circuit_breaker = CircuitBreaker()
+
+COLLECTION_INTERVAL = int(os.environ.get('COLLECTION_INTERVAL', '180'))
+COLLECTOR_SCHEDULER = os.environ.get('COLLECTOR_SCHEDULER', 'fixed').lower()
+SCHEDULER_REFRESH_INTERVAL = float(os.environ.get('SCHEDULER_REFRESH_INTERVAL', '60'))
+METRICS_PORT = 8001
+
+CYCLES = metrics.counter('collector_cycles', "Cicli di raccolta completati")
+CYCLE_DURATION = metrics.histogram(
+    'collector_cycle_seconds', "Durata dei cicli di raccolta",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+FETCH_DURATION = metrics.histogram('collector_fetch_seconds', "Latenza del recupero del prezzo per ticker")
+FETCHED = metrics.counter('collector_prices_fetched', "Prezzi recuperati dalla sorgente")
+FETCH_ERRORS = metrics.counter('collector_fetch_errors', "Ticker per cui il recupero del prezzo è fallito")
+ROWS_WRITTEN = metrics.counter('collector_rows_written', "Prezzi salvati nel database")
+WRITE_ERRORS = metrics.counter('collector_write_errors', "Prezzi non salvati per errore")
+ROWS_SUPPRESSED = metrics.counter('collector_rows_suppressed', "Prezzi invariati non salvati")
+RATE_LIMIT_WAIT = metrics.counter('collector_rate_limit_wait_seconds', "Tempo di attesa imposto dal rate limiter")
+
+
+def register_engine_metrics(engine):
+    def breaker_states():
+        samples = [
+            ({'kind': kind, 'state': state}, count)
+            for kind, states in engine.breakers.state_counts().items()
+            for state, count in states.items()
+        ]
+        yield 'collector_circuit_breakers', 'gauge', "Circuit breaker per tipo e stato", samples
+    metrics.REGISTRY.add_collector('collector_circuit_breakers', breaker_states)
+    metrics.register_stats('db_pool', pool_status)
+
+
+def record_cycle(report, written, skipped):
+    CYCLES.inc()
+    CYCLE_DURATION.observe(report.duration)
+    for latency in report.latencies.values():
+        FETCH_DURATION.observe(latency)
+    FETCHED.inc(len(report.prices))
+    FETCH_ERRORS.inc(len(report.errors))
+    ROWS_WRITTEN.inc(written)
+    WRITE_ERRORS.inc(len(skipped))
+    RATE_LIMIT_WAIT.inc(report.rate_limit_wait)
+
+
+def symbol_results(report):
+    """
+    Esito del ciclo per il catalogo dei simboli: validi i ticker con un prezzo, non
+    validi solo quelli confermati dal motore di raccolta (report.invalid). Un gruppo
+    interamente vuoto è un errore della sorgente e non rende non validi i suoi ticker.
+    """
+    results = {ticker: True for ticker in report.prices}
+    results.update({ticker: False for ticker in report.invalid})
+    return results
+
+
+def changed_prices(detector, session, tickers, prices):
+    """
+    Prezzi da scrivere dopo il filtro dei valori invariati (tutti senza detector).
+    """
+    if detector is None:
+        return prices
+    detector.bootstrap(session, tickers)
+    to_write = detector.changed(prices)
+    ROWS_SUPPRESSED.inc(len(prices) - len(to_write))
+    return to_write
+
+
+def collect_and_write(engine, detector, symbols, tickers):
+    """
+    Recupera i prezzi dei ticker indicati e salva quelli variati. Restituisce il CycleReport.
+    """
+    with SessionLocal() as session:
+        report = engine.collect(tickers)
+        for ticker, error in report.errors.items():
+            print(f"Errore nel recupero dei dati per ticker {ticker}: {error}")
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+        prices = changed_prices(detector, session, tickers, report.prices)
+        written, skipped = write_prices(session, prices, timestamp)
+        for ticker, error in skipped.items():
+            print(f"Errore nel salvataggio dei dati per ticker {ticker}: {error}")
+        print(f"Dati salvati per {written} ticker")
+        if detector is not None:
+            detector.mark_written({t: v for t, v in prices.items() if t not in skipped}, timestamp)
+            print(f"Prezzi invariati non salvati: {len(report.prices) - len(prices)}, "
+                  f"riduzione delle scritture: {detector.stats()['write_reduction_ratio']:.1%}")
+    record_cycle(report, written, skipped)
+    symbols.record_many(symbol_results(report))
+    print(f"Statistiche del ciclo: {report.summary()}")
+    print(f"Pool di connessioni: {pool_status()}")
+    return report
+
+
+def run_fixed(engine, detector, symbols):
+    """
+    Un ciclo completo su tutti i ticker ogni COLLECTION_INTERVAL secondi.
+    """
     while True:
         print("Avvio ciclo di raccolta dati")
         with SessionLocal() as session:
             tickers = session.query(User.ticker).distinct()
             tickers = [t[0] for t in tickers]
-            for ticker in tickers:
-                try:
-                    price = circuit_breaker.call(get_stock_price, ticker)
-                    price = float(price)
-                    financial_data = FinancialData(
-                        ticker=ticker,
-                        value=price
-                    )
-                    session.add(financial_data)
-                    session.commit()
-                    print(f"Dato salvato per ticker {ticker}: {price}")
-                except Exception as e:
-                    print(f"Errore nel recupero dei dati per ticker {ticker}: {e}")
-        print("Ciclo di raccolta dati completato, attesa 3 minuti")
-        time.sleep(180)
+        if detector is not None:
+            detector.forget(tickers)
+        collect_and_write(engine, detector, symbols, tickers)
+        print(f"Ciclo di raccolta dati completato, attesa {COLLECTION_INTERVAL} secondi")
+        time.sleep(COLLECTION_INTERVAL)
+
+
+def run_adaptive(engine, detector, symbols):
+    """
+    Ogni ticker viene richiesto alla propria scadenza, decisa da AdaptiveScheduler;
+    l'elenco dei ticker e degli utenti che li seguono è riletto ogni
+    SCHEDULER_REFRESH_INTERVAL secondi.
+    """
+    scheduler = AdaptiveScheduler(engine.price_source)
+    metrics.register_stats('collector_scheduler', scheduler.stats)
+    next_refresh = 0.0
+    print("Avvio raccolta dati con pianificazione adattiva per ticker")
+    while True:
+        if time.monotonic() >= next_refresh:
+            with SessionLocal() as session:
+                counts = subscriber_counts(session)
+            scheduler.update_tickers(counts)
+            if detector is not None:
+                detector.forget(counts)
+            next_refresh = time.monotonic() + SCHEDULER_REFRESH_INTERVAL
+        tickers = scheduler.pop_due()
+        if tickers:
+            report = collect_and_write(engine, detector, symbols, tickers)
+            scheduler.observe(tickers, report.prices, report.errors)
+            print(f"Pianificazione: {scheduler.stats()}")
+        wait = min(scheduler.next_wakeup(), max(0.0, next_refresh - time.monotonic()))
+        time.sleep(max(wait, 0.1))
+
+
+def main():
+    engine = create_collection_engine(create_price_source())
+    register_engine_metrics(engine)
+    detector = ChangeDetector() if CHANGE_DETECTION else None
+    if detector is not None:
+        metrics.register_stats('collector_change_detection', detector.stats)
+    symbols = SymbolCatalog()
+    metrics.start_metrics_server(METRICS_PORT)
+    if COLLECTOR_SCHEDULER == 'adaptive':
+        run_adaptive(engine, detector, symbols)
+    else:
+        run_fixed(engine, detector, symbols)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,155 @@
+import os
+import time
+from concurrent import futures
+
+from circuit_breaker import BreakerRegistry, CircuitOpenError
+from price_source import EmptyResponseError, TickerDataError
+from rate_limiter import HostRateLimiter
+
+# Fallimenti consecutivi dopo cui un ticker richiesto da solo è considerato non valido.
+INVALID_AFTER_FAILURES = int(os.environ.get('SYMBOL_INVALID_AFTER_FAILURES', '3'))
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class CycleReport:
+    """
+    Risultato di un ciclo di raccolta: prezzi ottenuti, errori per ticker,
+    latenza per ticker (secondi) e durata complessiva del ciclo. `invalid` contiene
+    i ticker senza dati per cui l'errore è certamente del ticker: la stessa risposta
+    conteneva dati per altri ticker, oppure il ticker fallisce da più cicli di fila.
+    """
+    def __init__(self):
+        self.prices = {}
+        self.errors = {}
+        self.invalid = set()
+        self.latencies = {}
+        self.breaker_states = {}
+        self.rate_limit_wait = 0.0
+        self.duration = 0.0
+
+    def summary(self):
+        latencies = list(self.latencies.values())
+        return {
+            'tickers': len(self.prices) + len(self.errors),
+            'fetched': len(self.prices),
+            'failed': len(self.errors),
+            'cycle_seconds': round(self.duration, 3),
+            'latency_p50': round(_percentile(latencies, 50), 3),
+            'latency_p95': round(_percentile(latencies, 95), 3),
+            'latency_max': round(max(latencies), 3) if latencies else 0.0,
+            'rate_limit_wait_seconds': round(self.rate_limit_wait, 3),
+            'breaker_states': self.breaker_states,
+        }
+
+
+class CollectionEngine:
+    """
+    Esegue il recupero dei prezzi in parallelo su un pool di thread limitato.
+    Ogni chiamata a monte passa dai circuit breaker del registro (per endpoint e
+    per ticker) e dal rate limiter dell'host.
+    """
+    def __init__(self, price_source, breakers, max_workers=8, rate_limiter=None):
+        self.price_source = price_source
+        self.breakers = breakers
+        self.max_workers = max(1, int(max_workers))
+        self.rate_limiter = rate_limiter
+
+    def _fetch_chunk(self, chunk):
+        prices, errors = {}, {}
+        allowed = []
+        for ticker in chunk:
+            if self.breakers.for_ticker(ticker).allow_request():
+                allowed.append(ticker)
+            else:
+                errors[ticker] = CircuitOpenError(f"ticker:{ticker}")
+        if not allowed:
+            return prices, errors, 0.0, 0.0
+
+        endpoint = self.breakers.for_endpoint(self.price_source.host)
+        if not endpoint.allow_request():
+            for ticker in allowed:
+                self.breakers.for_ticker(ticker).release()
+                errors[ticker] = CircuitOpenError(endpoint.name)
+            return prices, errors, 0.0, 0.0
+
+        waited = 0.0
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire(self.price_source.host)
+        start = time.perf_counter()
+        try:
+            fetched, fetch_errors = self.price_source.get_prices(allowed)
+        except Exception as e:
+            fetched, fetch_errors = {}, {ticker: e for ticker in allowed}
+        latency = time.perf_counter() - start
+        if len(allowed) > 1 and not fetched and all(isinstance(e, TickerDataError) for e in fetch_errors.values()):
+            # Nessun ticker del gruppo ha dati: è l'endpoint a non rispondere, non i ticker.
+            error = EmptyResponseError(f"Risposta vuota per {len(allowed)} ticker")
+            fetch_errors = {ticker: error for ticker in allowed}
+
+        endpoint_errors = [e for e in fetch_errors.values() if not isinstance(e, TickerDataError)]
+        if endpoint_errors:
+            endpoint.record_failure(endpoint_errors[-1])
+        else:
+            endpoint.record_success()
+
+        for ticker in allowed:
+            breaker = self.breakers.for_ticker(ticker)
+            error = fetch_errors.get(ticker)
+            if error is None and ticker in fetched:
+                breaker.record_success()
+                prices[ticker] = fetched[ticker]
+            elif isinstance(error, TickerDataError):
+                breaker.record_failure()
+                errors[ticker] = error
+            else:
+                breaker.release()
+                errors[ticker] = error or TickerDataError(f"Nessun dato trovato per il ticker: {ticker}")
+        return prices, errors, latency, waited
+
+    def collect(self, tickers):
+        report = CycleReport()
+        start = time.perf_counter()
+        with futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {
+                executor.submit(self._fetch_chunk, chunk): chunk
+                for chunk in self.price_source.chunks(tickers)
+            }
+            for future in futures.as_completed(pending):
+                chunk = pending[future]
+                prices, errors, latency, waited = future.result()
+                report.prices.update(prices)
+                report.errors.update(errors)
+                report.rate_limit_wait += waited
+                for ticker, error in errors.items():
+                    if isinstance(error, TickerDataError) and (
+                            prices or self.breakers.for_ticker(ticker).failure_count >= INVALID_AFTER_FAILURES):
+                        report.invalid.add(ticker)
+                for ticker in chunk:
+                    report.latencies[ticker] = latency
+        report.duration = time.perf_counter() - start
+        report.breaker_states = self.breakers.state_counts()
+        return report
+
+
+def create_collection_engine(price_source):
+    """
+    Crea il motore di raccolta configurato tramite COLLECTOR_WORKERS,
+    RATE_LIMIT_PER_SECOND e RATE_LIMIT_BURST (0 disattiva il rate limiting),
+    BREAKER_FAILURE_THRESHOLD e BREAKER_RECOVERY_TIME.
+    """
+    workers = int(os.environ.get('COLLECTOR_WORKERS', '8'))
+    rate = float(os.environ.get('RATE_LIMIT_PER_SECOND', '5'))
+    burst = float(os.environ.get('RATE_LIMIT_BURST', '10'))
+    rate_limiter = HostRateLimiter(rate, burst) if rate > 0 else None
+    breakers = BreakerRegistry(
+        failure_threshold=int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5')),
+        recovery_time=float(os.environ.get('BREAKER_RECOVERY_TIME', '60')),
+    )
+    return CollectionEngine(price_source, breakers, max_workers=workers, rate_limiter=rate_limiter)
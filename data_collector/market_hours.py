@@ -0,0 +1,49 @@
+import datetime
+import os
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # pragma: no cover
+    ZoneInfo = None
+
+MARKET_TIMEZONE = os.environ.get('MARKET_TIMEZONE', 'America/New_York')
+MARKET_OPEN = os.environ.get('MARKET_OPEN', '09:30')
+MARKET_CLOSE = os.environ.get('MARKET_CLOSE', '16:00')
+MARKET_DAYS = os.environ.get('MARKET_DAYS', 'mon,tue,wed,thu,fri')
+# Ticker scambiati 24/7 (criptovalute, cambi): per loro il mercato è sempre aperto.
+MARKET_24H_SUFFIXES = os.environ.get('MARKET_24H_SUFFIXES', '-USD,-EUR,=X')
+
+_DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _parse_time(value):
+    hours, minutes = value.split(':')
+    return datetime.time(int(hours), int(minutes))
+
+
+class MarketHours:
+    """
+    Orario di apertura della borsa nel fuso orario del mercato (festività escluse).
+    Serve a distinguere i periodi in cui un prezzo invariato è atteso (mercato chiuso)
+    da quelli in cui il ticker dovrebbe muoversi.
+    """
+    def __init__(self, timezone=MARKET_TIMEZONE, open_time=MARKET_OPEN, close_time=MARKET_CLOSE,
+                 days=MARKET_DAYS, always_open_suffixes=MARKET_24H_SUFFIXES):
+        try:
+            self.timezone = ZoneInfo(timezone)
+        except Exception as e:
+            print(f"Fuso orario {timezone} non disponibile ({e}), uso UTC")
+            self.timezone = datetime.timezone.utc
+        self.open_time = _parse_time(open_time)
+        self.close_time = _parse_time(close_time)
+        self.days = {_DAY_NAMES.index(day.strip().lower()[:3]) for day in days.split(',') if day.strip()}
+        self.always_open_suffixes = tuple(s.strip().upper() for s in always_open_suffixes.split(',') if s.strip())
+
+    def always_open(self, ticker):
+        return bool(ticker) and ticker.upper().endswith(self.always_open_suffixes)
+
+    def is_open(self, now=None, ticker=None):
+        if ticker is not None and self.always_open(ticker):
+            return True
+        local = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(self.timezone)
+        return local.weekday() in self.days and self.open_time <= local.time() < self.close_time
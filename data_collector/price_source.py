@@ -0,0 +1,140 @@
+import logging
+import os
+
+
+def _load_yfinance(yf_module=None):
+    """
+    Restituisce il modulo yfinance da usare. Permette di iniettare un modulo finto
+    (ad esempio nei benchmark offline) senza dover installare yfinance.
+    """
+    if yf_module is not None:
+        return yf_module
+    import yfinance
+    logging.getLogger('yfinance').setLevel(logging.CRITICAL)
+    return yfinance
+
+
+class TickerDataError(ValueError):
+    """
+    Nessun dato disponibile per un ticker: è un errore del ticker, non dell'endpoint a monte.
+    """
+
+
+class EmptyResponseError(Exception):
+    """
+    Nessun dato per tutti i ticker di una richiesta multipla: yfinance nasconde così
+    errori di rete e rate limit, quindi è un errore dell'endpoint e non dei ticker.
+    """
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class PriceSource:
+    """
+    Interfaccia comune per le sorgenti di prezzo usate dal data collector.
+    """
+    name = "base"
+    host = "localhost"
+    batch_size = 1
+
+    def get_price(self, ticker):
+        raise NotImplementedError
+
+    def chunks(self, tickers):
+        """
+        Divide la lista di ticker nei gruppi richiesti a monte con una singola chiamata.
+        """
+        return chunked(list(tickers), self.batch_size)
+
+    def get_prices(self, tickers):
+        """
+        Restituisce una coppia (prezzi, errori) di dizionari indicizzati per ticker.
+        Gli errori dei ticker senza dati sono TickerDataError; ogni altra eccezione
+        indica un problema dell'endpoint a monte.
+        """
+        prices, errors = {}, {}
+        for ticker in tickers:
+            try:
+                prices[ticker] = self.get_price(ticker)
+            except Exception as e:
+                errors[ticker] = e
+        return prices, errors
+
+
+class YFinancePriceSource(PriceSource):
+    """
+    Una richiesta history() per ticker, come nella versione originale del collector.
+    """
+    name = "single"
+    host = "query2.finance.yahoo.com"
+
+    def __init__(self, yf_module=None):
+        self.yf = _load_yfinance(yf_module)
+
+    def get_price(self, ticker):
+        hist = self.yf.Ticker(ticker).history(period="1d")
+        if not hist.empty:
+            return float(hist['Close'].iloc[0])
+        raise TickerDataError(f"Nessun dato trovato per il ticker: {ticker}")
+
+
+class BatchYFinancePriceSource(YFinancePriceSource):
+    """
+    Scarica i prezzi di più ticker con una sola chiamata yf.download() per gruppo
+    e rimappa i risultati sul singolo ticker.
+    """
+    name = "batch"
+
+    def __init__(self, batch_size=50, yf_module=None):
+        super().__init__(yf_module)
+        self.batch_size = max(1, int(batch_size))
+
+    def get_prices(self, tickers):
+        tickers = list(tickers)
+        data = self.yf.download(
+            tickers,
+            period="1d",
+            group_by="ticker",
+            auto_adjust=True,
+            progress=False,
+            threads=False,
+        )
+        if len(tickers) > 1 and (data is None or data.empty):
+            raise EmptyResponseError(f"Risposta vuota per {len(tickers)} ticker")
+        prices, errors = {}, {}
+        for ticker in tickers:
+            try:
+                prices[ticker] = self._extract_close(data, ticker)
+            except TickerDataError as e:
+                errors[ticker] = e
+        return prices, errors
+
+    def _extract_close(self, data, ticker):
+        if data is None or data.empty:
+            raise TickerDataError(f"Nessun dato trovato per il ticker: {ticker}")
+        if data.columns.nlevels > 1:
+            if ticker not in data.columns.get_level_values(0):
+                raise TickerDataError(f"Nessun dato trovato per il ticker: {ticker}")
+            closes = data[ticker]['Close'].dropna()
+        else:
+            closes = data['Close'].dropna()
+        if closes.empty:
+            raise TickerDataError(f"Nessun dato trovato per il ticker: {ticker}")
+        return float(closes.iloc[0])
+
+
+def create_price_source(yf_module=None):
+    """
+    Crea la sorgente di prezzo configurata tramite PRICE_SOURCE ('batch' o 'single')
+    e PRICE_BATCH_SIZE.
+    """
+    kind = os.environ.get('PRICE_SOURCE', 'batch').lower()
+    if kind == 'single':
+        return YFinancePriceSource(yf_module=yf_module)
+    if kind == 'batch':
+        batch_size = int(os.environ.get('PRICE_BATCH_SIZE', '50'))
+        return BatchYFinancePriceSource(batch_size=batch_size, yf_module=yf_module)
+    raise ValueError(f"Sorgente di prezzo sconosciuta: {kind}")
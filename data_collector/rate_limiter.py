@@ -0,0 +1,82 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: concede al massimo `rate` richieste al secondo
+    con picchi fino a `burst` richieste.
+    """
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.last_refill = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.last_refill = now
+
+    def try_acquire(self, tokens=1):
+        with self.lock:
+            self._refill(self.clock())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def available(self):
+        """
+        Gettoni disponibili in questo momento, senza consumarli.
+        """
+        with self.lock:
+            self._refill(self.clock())
+            return self.tokens
+
+    def seconds_until(self, tokens=1):
+        """
+        Secondi di attesa prima che siano disponibili `tokens` gettoni.
+        """
+        with self.lock:
+            self._refill(self.clock())
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def acquire(self, tokens=1):
+        """
+        Blocca finché non sono disponibili `tokens` gettoni; restituisce il tempo atteso.
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """
+    Un token bucket per ogni host a monte, creato alla prima richiesta.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, host, tokens=1):
+        return self.bucket(host).acquire(tokens)
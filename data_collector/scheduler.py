@@ -0,0 +1,188 @@
+import datetime
+import heapq
+import math
+import os
+import time
+
+from sqlalchemy import func, select
+
+from common.models import User
+from market_hours import MarketHours
+from price_source import TickerDataError
+from rate_limiter import TokenBucket
+
+SCHEDULER_BASE_INTERVAL = float(os.environ.get('COLLECTION_INTERVAL', '180'))
+SCHEDULER_MIN_INTERVAL = float(os.environ.get('SCHEDULER_MIN_INTERVAL', '60'))
+SCHEDULER_MAX_INTERVAL = float(os.environ.get('SCHEDULER_MAX_INTERVAL', '900'))
+SCHEDULER_CLOSED_INTERVAL = float(os.environ.get('SCHEDULER_CLOSED_INTERVAL', '3600'))
+# Chiamate a monte (gruppi di ticker) consentite al minuto su tutti i ticker.
+REQUEST_BUDGET_PER_MINUTE = float(os.environ.get('REQUEST_BUDGET_PER_MINUTE', '20'))
+# Variazione relativa media tra due letture considerata "normale": più volatilità, intervallo più breve.
+VOLATILITY_REFERENCE = float(os.environ.get('VOLATILITY_REFERENCE', '0.002'))
+VOLATILITY_SMOOTHING = float(os.environ.get('VOLATILITY_SMOOTHING', '0.3'))
+# Anticipo massimo con cui un ticker quasi scaduto viene aggiunto a un gruppo non pieno.
+SCHEDULER_COALESCE_WINDOW = float(os.environ.get('SCHEDULER_COALESCE_WINDOW', '15'))
+
+
+def subscriber_counts(session):
+    """
+    Numero di utenti che seguono ciascun ticker.
+    """
+    rows = session.execute(select(User.ticker, func.count()).group_by(User.ticker))
+    return {ticker: count for ticker, count in rows if ticker}
+
+
+class _TickerState:
+    __slots__ = ('subscribers', 'volatility', 'last_price', 'interval', 'due', 'version')
+
+    def __init__(self, subscribers, due):
+        self.subscribers = subscribers
+        self.volatility = None
+        self.last_price = None
+        self.interval = None
+        self.due = due
+        self.version = 0
+
+
+class AdaptiveScheduler:
+    """
+    Pianifica ogni ticker in modo indipendente con un heap ordinato per scadenza.
+    L'intervallo di un ticker si accorcia con il numero di utenti che lo seguono e con
+    la volatilità recente (media mobile esponenziale delle variazioni relative), e si
+    allunga a mercato chiuso. Un token bucket limita le chiamate a monte al minuto:
+    i ticker scaduti oltre il budget restano in coda, i più in ritardo per primi.
+    """
+    def __init__(self, price_source, base_interval=SCHEDULER_BASE_INTERVAL,
+                 min_interval=SCHEDULER_MIN_INTERVAL, max_interval=SCHEDULER_MAX_INTERVAL,
+                 closed_interval=SCHEDULER_CLOSED_INTERVAL, budget_per_minute=REQUEST_BUDGET_PER_MINUTE,
+                 market=None, clock=time.monotonic):
+        self.price_source = price_source
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closed_interval = closed_interval
+        self.budget = TokenBucket(budget_per_minute / 60.0, burst=max(1.0, budget_per_minute), clock=clock)
+        self.market = market or MarketHours()
+        self.clock = clock
+        self.tickers = {}
+        self.heap = []
+        self.sequence = 0
+        self.requests = 0
+        self.deferred = 0
+
+    def _push(self, ticker, state, due):
+        self.sequence += 1
+        state.due = due
+        state.version = self.sequence
+        heapq.heappush(self.heap, (due, ticker, state.version))
+
+    def update_tickers(self, counts):
+        """
+        Allinea i ticker pianificati a quelli seguiti dagli utenti (ticker -> numero
+        di utenti). I nuovi ticker vengono richiesti subito.
+        """
+        now = self.clock()
+        for ticker, subscribers in counts.items():
+            state = self.tickers.get(ticker)
+            if state is None:
+                state = self.tickers[ticker] = _TickerState(subscribers, now)
+                self._push(ticker, state, now)
+            else:
+                state.subscribers = subscribers
+        for ticker in [t for t in self.tickers if t not in counts]:
+            # Le voci nell'heap dei ticker rimossi vengono scartate quando estratte.
+            del self.tickers[ticker]
+
+    def interval_for(self, ticker, wall_now=None):
+        state = self.tickers[ticker]
+        if not self.market.is_open(wall_now, ticker):
+            return self.closed_interval
+        interval = self.base_interval / (1.0 + math.log10(max(1, state.subscribers)))
+        if state.volatility is not None:
+            ratio = VOLATILITY_REFERENCE / max(state.volatility, 1e-9)
+            interval *= min(2.0, max(0.5, math.sqrt(ratio)))
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _pop_until(self, deadline, limit=None):
+        tickers = []
+        while self.heap and self.heap[0][0] <= deadline and (limit is None or len(tickers) < limit):
+            _, ticker, version = heapq.heappop(self.heap)
+            state = self.tickers.get(ticker)
+            if state is not None and state.version == version:
+                tickers.append(ticker)
+        return tickers
+
+    def pop_due(self):
+        """
+        Ticker scaduti da richiedere ora, nei limiti del budget di chiamate a monte.
+        """
+        now = self.clock()
+        due = self._pop_until(now)
+        if not due:
+            return []
+        # Completa l'ultimo gruppo con i ticker in scadenza a breve: stessa chiamata a monte.
+        batch_size = max(1, getattr(self.price_source, 'batch_size', 1))
+        if len(due) % batch_size:
+            due.extend(self._pop_until(now + SCHEDULER_COALESCE_WINDOW, batch_size - len(due) % batch_size))
+        chunks = list(self.price_source.chunks(due))
+        allowed = min(len(chunks), int(self.budget.available()))
+        if allowed and not self.budget.try_acquire(allowed):
+            allowed = 0
+        selected = [ticker for chunk in chunks[:allowed] for ticker in chunk]
+        for chunk in chunks[allowed:]:
+            for ticker in chunk:
+                state = self.tickers[ticker]
+                heapq.heappush(self.heap, (state.due, ticker, state.version))
+                self.deferred += 1
+        self.requests += allowed
+        return selected
+
+    def observe(self, tickers, prices, errors):
+        """
+        Aggiorna la volatilità con i prezzi ottenuti e ripianifica i ticker richiesti.
+        Dopo un errore il ticker viene riprovato con l'intervallo massimo.
+        """
+        now = self.clock()
+        wall_now = datetime.datetime.now(datetime.timezone.utc)
+        for ticker in tickers:
+            state = self.tickers.get(ticker)
+            if state is None:
+                continue
+            price = prices.get(ticker)
+            if price is not None:
+                price = float(price)
+                if state.last_price:
+                    change = abs(price - state.last_price) / abs(state.last_price)
+                    state.volatility = change if state.volatility is None else (
+                        VOLATILITY_SMOOTHING * change + (1 - VOLATILITY_SMOOTHING) * state.volatility)
+                state.last_price = price
+                state.interval = self.interval_for(ticker, wall_now)
+            elif isinstance(errors.get(ticker), TickerDataError):
+                state.interval = max(self.max_interval, self.closed_interval)
+            else:
+                state.interval = self.max_interval
+            self._push(ticker, state, now + state.interval)
+
+    def next_wakeup(self):
+        """
+        Secondi fino alla prossima scadenza (o al prossimo gettone se ci sono ticker in attesa).
+        """
+        if not self.heap:
+            return self.base_interval
+        wait = self.heap[0][0] - self.clock()
+        if wait <= 0:
+            return max(self.budget.seconds_until(1), 0.1)
+        return wait
+
+    def stats(self):
+        intervals = [s.interval for s in self.tickers.values() if s.interval is not None]
+        now = self.clock()
+        return {
+            'tickers': len(self.tickers),
+            'overdue': sum(1 for s in self.tickers.values() if s.due <= now),
+            'requests': self.requests,
+            'deferred': self.deferred,
+            'interval_avg': round(sum(intervals) / len(intervals), 1) if intervals else 0.0,
+            'interval_min': min(intervals) if intervals else 0.0,
+            'budget_available': round(self.budget.available(), 2),
+        }
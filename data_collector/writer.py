@@ -0,0 +1,100 @@
+import csv
+import datetime
+import io
+import math
+import os
+
+from sqlalchemy import insert
+
+from common.models import FinancialData
+
+
+def _prepare_rows(prices, timestamp):
+    rows, skipped = [], {}
+    for ticker, price in prices.items():
+        try:
+            value = float(price)
+            if math.isnan(value) or math.isinf(value):
+                raise ValueError(f"Valore non valido: {price}")
+        except (TypeError, ValueError) as e:
+            skipped[ticker] = e
+            continue
+        rows.append({'ticker': ticker, 'value': value, 'timestamp': timestamp})
+    return rows, skipped
+
+
+def _insert_values(session, rows, rows_per_statement):
+    for start in range(0, len(rows), rows_per_statement):
+        session.execute(insert(FinancialData).values(rows[start:start + rows_per_statement]))
+
+
+def _copy_rows(session, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((row['ticker'], repr(row['value']), row['timestamp'].isoformat()))
+    buffer.seek(0)
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {FinancialData.__tablename__} (ticker, value, timestamp) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def write_prices_per_row(session, prices, timestamp=None):
+    """
+    Percorso originale: una INSERT e un commit per ogni ticker.
+    """
+    timestamp = timestamp or datetime.datetime.now(datetime.timezone.utc)
+    rows, skipped = _prepare_rows(prices, timestamp)
+    written = 0
+    for row in rows:
+        try:
+            session.add(FinancialData(**row))
+            session.commit()
+            written += 1
+        except Exception as e:
+            session.rollback()
+            skipped[row['ticker']] = e
+    return written, skipped
+
+
+def write_prices_bulk(session, prices, timestamp=None, method='values', rows_per_statement=1000):
+    """
+    Scrive tutti i prezzi di un ciclo in un'unica transazione, con INSERT multi-riga
+    (method='values') oppure COPY di Postgres (method='copy').
+    I ticker con valori non validi vengono saltati; se la scrittura in blocco fallisce
+    si ripiega sul percorso riga per riga, così un ticker problematico non blocca gli altri.
+    Restituisce il numero di righe scritte e un dizionario ticker -> errore.
+    """
+    timestamp = timestamp or datetime.datetime.now(datetime.timezone.utc)
+    rows, skipped = _prepare_rows(prices, timestamp)
+    if not rows:
+        return 0, skipped
+    try:
+        if method == 'copy' and session.get_bind().dialect.name == 'postgresql':
+            _copy_rows(session, rows)
+        else:
+            _insert_values(session, rows, rows_per_statement)
+        session.commit()
+        return len(rows), skipped
+    except Exception as e:
+        session.rollback()
+        print(f"Scrittura in blocco fallita ({e}), ripiego sul salvataggio riga per riga")
+    written, row_errors = write_prices_per_row(
+        session, {row['ticker']: row['value'] for row in rows}, timestamp
+    )
+    skipped.update(row_errors)
+    return written, skipped
+
+
+def write_prices(session, prices, timestamp=None):
+    """
+    Scrive i prezzi del ciclo con il metodo configurato tramite COLLECTOR_WRITE_METHOD
+    ('values', 'copy' oppure 'row' per il vecchio percorso riga per riga).
+    """
+    method = os.environ.get('COLLECTOR_WRITE_METHOD', 'values').lower()
+    if method == 'row':
+        return write_prices_per_row(session, prices, timestamp)
+    return write_prices_bulk(session, prices, timestamp, method=method)
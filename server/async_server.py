@@ -0,0 +1,342 @@
+import asyncio
+import logging
+
+import grpc
+from sqlalchemy import select
+
+from common import models, queries
+from common.database import get_async_sessionmaker
+from latest_cache import LatestValue
+from price_hub import price_update_message
+import service_pb2
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHandlersMixin:
+    """
+    Versione asincrona (grpc.aio) dei metodi di UserService, con accesso al database
+    tramite AsyncSession. Condivide cache e regole di validazione con la versione a
+    thread; i metodi non ridefiniti qui vengono eseguiti nel thread pool di migrazione.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.async_session = get_async_sessionmaker()
+        self.latest_loads = {}
+
+    async def _begin_request(self, request_id, context):
+        # L'attesa di un duplicato in corso è bloccante: viene eseguita fuori dall'event loop.
+        return await asyncio.to_thread(self.begin_request, request_id, context)
+
+    async def _complete_request(self, request_id, flight, message):
+        if self.idempotency.blocking:
+            await asyncio.to_thread(self.in_progress.complete, request_id, flight, message)
+        else:
+            self.in_progress.complete(request_id, flight, message)
+
+    async def _find_user(self, session, email):
+        result = await session.execute(select(models.User).filter_by(email=email))
+        return result.scalars().first()
+
+    async def _get_user_ticker(self, session, email):
+        found, ticker, generation = self.user_cache.lookup(email)
+        if found:
+            return ticker
+        user = await self._find_user(session, email)
+        ticker = user.ticker if user else None
+        self.user_cache.store(email, ticker, generation)
+        return ticker
+
+    async def _load_latest(self, ticker):
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(models.FinancialData)
+                .filter_by(ticker=ticker)
+                .order_by(models.FinancialData.timestamp.desc())
+                .limit(1)
+            )
+            latest_data = result.scalars().first()
+        if latest_data is None:
+            return None
+        latest = LatestValue(latest_data.ticker, latest_data.value, latest_data.timestamp)
+        self.latest_cache.put(latest)
+        return latest
+
+    async def _get_latest(self, ticker):
+        latest = self.latest_cache.peek(ticker)
+        if latest is not None:
+            return latest
+        task = self.latest_loads.get(ticker)
+        if task is None:
+            task = asyncio.ensure_future(self._load_latest(ticker))
+            self.latest_loads[ticker] = task
+            task.add_done_callback(lambda _: self.latest_loads.pop(ticker, None))
+        return await asyncio.shield(task)
+
+    async def RegisterUser(self, request, context):
+        if not request.request_id:
+            context.set_details("Non esiste nessun request id in cache per questa richiesta")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return service_pb2.RegisterUserResponse()
+
+        message, flight = await self._begin_request(request.request_id, context)
+        if flight is None:
+            return service_pb2.RegisterUserResponse(message=message)
+
+        if not self.is_valid_email(request.email):
+            logger.info(f"Formato email non valido: {request.email}")
+            message = "Formato email non valido."
+            await self._complete_request(request.request_id, flight, message)
+            return service_pb2.RegisterUserResponse(message=message)
+
+        if self.symbols.is_known_invalid(request.ticker):
+            logger.info(f"Ticker non valido: {request.ticker}")
+            message = "Ticker non valido."
+            await self._complete_request(request.request_id, flight, message)
+            return service_pb2.RegisterUserResponse(message=message)
+
+        async with self.async_session() as session:
+            try:
+                existing_user = await self._find_user(session, request.email)
+                if existing_user:
+                    message = "L'utente è già registrato!"
+                    logger.info(f"L'utente è già registrato!: {request.email}")
+                else:
+                    session.add(models.User(email=request.email, ticker=request.ticker))
+                    await session.commit()
+                    await asyncio.to_thread(self.user_cache.invalidate, request.email)
+                    message = "Registrazione avvenuta con successo!"
+                    logger.info(f"User registered: {request.email}")
+
+                await self._complete_request(request.request_id, flight, message)
+                return service_pb2.RegisterUserResponse(message=message)
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Errore nella registrazione utente: {e}")
+                context.set_details(f'Error: {str(e)}')
+                context.set_code(grpc.StatusCode.INTERNAL)
+                return service_pb2.RegisterUserResponse()
+            finally:
+                self.in_progress.abandon(request.request_id, flight)
+
+    async def UpdateUser(self, request, context):
+        if not request.request_id:
+            context.set_details("Non esiste nessun request id in cache per questa richiesta")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return service_pb2.UpdateUserResponse()
+
+        message, flight = await self._begin_request(request.request_id, context)
+        if flight is None:
+            return service_pb2.UpdateUserResponse(message=message)
+
+        if not self.is_valid_email(request.email):
+            logger.info(f"Formato email non valido: {request.email}")
+            message = "Formato email non valido."
+            await self._complete_request(request.request_id, flight, message)
+            return service_pb2.UpdateUserResponse(message=message)
+
+        if self.symbols.is_known_invalid(request.ticker):
+            logger.info(f"Ticker non valido: {request.ticker}")
+            message = "Ticker non valido."
+            await self._complete_request(request.request_id, flight, message)
+            return service_pb2.UpdateUserResponse(message=message)
+
+        async with self.async_session() as session:
+            try:
+                user = await self._find_user(session, request.email)
+                if user:
+                    if user.ticker == request.ticker:
+                        message = "Il ticker è già settato a questo valore!"
+                        logger.info(f"Il ticker è già settato a questo valore per l'utente: {request.email}")
+                    else:
+                        user.ticker = request.ticker
+                        await session.commit()
+                        await asyncio.to_thread(self.user_cache.invalidate, request.email)
+                        message = "Utente aggiornato correttamente!"
+                        logger.info(f"Utente aggiornato: {request.email}")
+                else:
+                    message = "Utente non trovato."
+                    logger.info(f"Utente non trovato: {request.email}")
+
+                await self._complete_request(request.request_id, flight, message)
+                return service_pb2.UpdateUserResponse(message=message)
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Errore nell'aggiornare l'utente: {e}")
+                context.set_details(f'Errore: {str(e)}')
+                context.set_code(grpc.StatusCode.INTERNAL)
+                return service_pb2.UpdateUserResponse()
+            finally:
+                self.in_progress.abandon(request.request_id, flight)
+
+    async def DeleteUser(self, request, context):
+        if not request.request_id:
+            context.set_details("Non esiste nessun request id in cache per questa richiesta")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return service_pb2.DeleteUserResponse()
+
+        message, flight = await self._begin_request(request.request_id, context)
+        if flight is None:
+            return service_pb2.DeleteUserResponse(message=message)
+
+        if not self.is_valid_email(request.email):
+            logger.info(f"Formato email non valido: {request.email}")
+            message = "Formato email non valido."
+            await self._complete_request(request.request_id, flight, message)
+            return service_pb2.DeleteUserResponse(message=message)
+
+        async with self.async_session() as session:
+            try:
+                user = await self._find_user(session, request.email)
+                if user:
+                    await session.delete(user)
+                    await session.commit()
+                    await asyncio.to_thread(self.user_cache.invalidate, request.email)
+                    message = "Utente cancellato correttamente"
+                    logger.info(f"Utente cancellato: {request.email}")
+                else:
+                    message = "Utente non trovato"
+                    logger.info(f"Utente non trovato: {request.email}")
+
+                await self._complete_request(request.request_id, flight, message)
+                return service_pb2.DeleteUserResponse(message=message)
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Errore nel cancellare l'utente: {e}")
+                context.set_details(f'Error: {str(e)}')
+                context.set_code(grpc.StatusCode.INTERNAL)
+                return service_pb2.DeleteUserResponse()
+            finally:
+                self.in_progress.abandon(request.request_id, flight)
+
+    async def LoginUser(self, request, context):
+        if not self.is_valid_email(request.email):
+            logger.info(f"Formato email non valido: {request.email}")
+            return service_pb2.LoginUserResponse(message="Formato email non valido.", success=False)
+
+        try:
+            async with self.async_session() as session:
+                ticker = await self._get_user_ticker(session, request.email)
+            if ticker is not None:
+                logger.info(f"L'utente ha acceduto come: {request.email}")
+                return service_pb2.LoginUserResponse(message="Login avvenuto con successo!", success=True)
+            logger.info(f"Utente non trovato: {request.email}")
+            return service_pb2.LoginUserResponse(message="Utente non trovato!", success=False)
+        except Exception as e:
+            logger.error(f"Errore nel login!: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.LoginUserResponse(message="Internal error.", success=False)
+
+    async def CheckTicker(self, request, context):
+        # Solo una lettura in memoria: non serve passare dal thread pool.
+        return super().CheckTicker(request, context)
+
+    async def GetLatestValue(self, request, context):
+        try:
+            async with self.async_session() as session:
+                ticker = await self._get_user_ticker(session, request.email)
+            if ticker is None:
+                return service_pb2.GetLatestValueResponse(
+                    email=request.email,
+                    ticker="",
+                    value=0.0,
+                    timestamp=""
+                )
+            latest_data = await self._get_latest(ticker)
+            if latest_data:
+                return service_pb2.GetLatestValueResponse(
+                    email=request.email,
+                    ticker=latest_data.ticker,
+                    value=latest_data.value,
+                    timestamp=latest_data.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+                )
+            context.set_details(f"Nessun dato disponibile per il ticker: {ticker}. Il data collector potrebbe non essere aggiornato.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return service_pb2.GetLatestValueResponse()
+        except Exception as e:
+            logger.error(f"Errore nel passare l'ultimo valore: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.GetLatestValueResponse()
+
+    async def GetAverageValue(self, request, context):
+        try:
+            async with self.async_session() as session:
+                ticker = await self._get_user_ticker(session, request.email)
+                if ticker is None:
+                    context.set_details("Utente non trovato.")
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    return service_pb2.GetAverageValueResponse()
+
+                average_value = None
+                latest = await self._get_latest(ticker) if request.count > 0 else None
+                if latest is not None:
+                    average_value = self.rolling_averages.cached_average(ticker, latest, request.count)
+                    if average_value is None:
+                        # Caricamento della finestra (o ripiego su SQL) con le stesse query della versione a thread.
+                        average_value = await session.run_sync(
+                            self.rolling_averages.average, ticker, request.count, latest)
+
+            if average_value is not None:
+                return service_pb2.GetAverageValueResponse(
+                    email=request.email,
+                    ticker=ticker,
+                    average_value=average_value
+                )
+            context.set_details(f"Nessun valore disponibile per il ticker: {ticker}. Il data collector potrebbe non essere aggiornato.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return service_pb2.GetAverageValueResponse()
+        except Exception as e:
+            logger.error(f"Errore nel calcolare la media degli ultimi valori: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.GetAverageValueResponse()
+
+    async def GetWindowStats(self, request, context):
+        bounds = self.window_bounds(request, context)
+        if bounds is None:
+            return service_pb2.GetWindowStatsResponse()
+        start, end = bounds
+        try:
+            async with self.async_session() as session:
+                ticker = await self._get_user_ticker(session, request.email)
+                if ticker is None:
+                    context.set_details("Utente non trovato.")
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    return service_pb2.GetWindowStatsResponse()
+                window_stats = await session.run_sync(queries.window_stats, [ticker], start, end)
+
+            stats = window_stats.get(ticker)
+            if stats is None:
+                context.set_details(f"Nessun valore disponibile per il ticker {ticker} nella finestra richiesta.")
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                return service_pb2.GetWindowStatsResponse()
+            return self.window_stats_response(request, ticker, stats, end)
+        except Exception as e:
+            logger.error(f"Errore nel calcolo delle statistiche sulla finestra: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.GetWindowStatsResponse()
+
+    async def SubscribePrices(self, request, context):
+        async with self.async_session() as session:
+            ticker = await self._get_user_ticker(session, request.email)
+        if ticker is None:
+            context.set_details("Utente non trovato.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return
+
+        subscription = self.price_hub.subscribe(ticker, loop=asyncio.get_running_loop())
+        context.add_done_callback(lambda _: subscription.close())
+        try:
+            latest = await self._get_latest(ticker)
+            if latest is not None:
+                yield price_update_message(latest)
+            while not context.done():
+                update = await subscription.next_async(timeout=1.0)
+                if update is not None and (latest is None or update.timestamp > latest.timestamp):
+                    yield price_update_message(update)
+        finally:
+            self.price_hub.unsubscribe(subscription)
+            logger.info(f"Sottoscrizione ai prezzi terminata: {request.email}")
@@ -0,0 +1,270 @@
+import collections
+import datetime
+import logging
+import threading
+import time
+
+from cachetools import TTLCache
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from common.models import ProcessedRequest
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryIdempotencyStore:
+    """
+    Risposte per request_id in un TTLCache protetto da un unico lock:
+    valido solo per una singola replica e perso al riavvio.
+    """
+    blocking = False
+
+    def __init__(self, maxsize=10000, ttl=600):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+
+    def get(self, request_id):
+        with self.lock:
+            return self.cache.get(request_id)
+
+    def put(self, request_id, response):
+        with self.lock:
+            self.cache[request_id] = response
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.cache)}
+
+
+class ShardedIdempotencyStore:
+    """
+    Come InMemoryIdempotencyStore, ma suddiviso in `shards` cache indipendenti
+    scelte in base all'hash del request_id, così i thread non si contendono un solo lock.
+    """
+    blocking = False
+
+    def __init__(self, maxsize=10000, ttl=600, shards=16):
+        per_shard = max(1, -(-maxsize // shards))
+        self.shards = [InMemoryIdempotencyStore(per_shard, ttl) for _ in range(shards)]
+
+    def _shard(self, request_id):
+        return self.shards[hash(request_id) % len(self.shards)]
+
+    def get(self, request_id):
+        return self._shard(request_id).get(request_id)
+
+    def put(self, request_id, response):
+        self._shard(request_id).put(request_id, response)
+
+    def stats(self):
+        return {'size': sum(shard.stats()['size'] for shard in self.shards), 'shards': len(self.shards)}
+
+
+class DatabaseIdempotencyStore:
+    """
+    Risposte salvate nella tabella processed_requests: condivise tra le repliche e
+    conservate ai riavvii. La prima risposta registrata per un request_id vince
+    (INSERT ... ON CONFLICT, che sostituisce solo una riga già scaduta); le righe più
+    vecchie del ttl vengono ignorate e cancellate periodicamente.
+    """
+    blocking = True
+
+    def __init__(self, session_factory, ttl=600, purge_interval=60):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.next_purge = 0.0
+        self.lock = threading.Lock()
+        # Numero approssimato di righe: ricontato a ogni pulizia, incrementato da put().
+        self.size = 0
+
+    def _cutoff(self):
+        return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.ttl)
+
+    def get(self, request_id):
+        with self.session_factory() as session:
+            return session.execute(
+                select(ProcessedRequest.response)
+                .where(ProcessedRequest.request_id == request_id, ProcessedRequest.created_at >= self._cutoff())
+            ).scalar()
+
+    def _upsert(self, dialect, values):
+        """
+        INSERT che in caso di conflitto sostituisce solo una riga scaduta ma non ancora
+        cancellata; None se il dialetto non supporta ON CONFLICT.
+        """
+        if dialect == 'postgresql':
+            statement = postgresql.insert(ProcessedRequest).values(**values)
+        elif dialect == 'sqlite':
+            statement = sqlite.insert(ProcessedRequest).values(**values)
+        else:
+            return None
+        return statement.on_conflict_do_update(
+            index_elements=['request_id'],
+            set_={'response': statement.excluded.response, 'created_at': statement.excluded.created_at},
+            where=ProcessedRequest.created_at < self._cutoff(),
+        )
+
+    def put(self, request_id, response):
+        values = {'request_id': request_id, 'response': response,
+                  'created_at': datetime.datetime.now(datetime.timezone.utc)}
+        with self.session_factory() as session:
+            statement = self._upsert(session.get_bind().dialect.name, values)
+            if statement is None:
+                # Un request_id scaduto ma non ancora cancellato verrebbe altrimenti rifiutato.
+                session.execute(
+                    delete(ProcessedRequest)
+                    .where(ProcessedRequest.request_id == request_id, ProcessedRequest.created_at < self._cutoff())
+                )
+                statement = insert(ProcessedRequest).values(**values)
+            try:
+                result = session.execute(statement)
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+            else:
+                with self.lock:
+                    self.size += max(result.rowcount, 0)
+        self._maybe_purge()
+
+    def _maybe_purge(self):
+        with self.lock:
+            now = time.monotonic()
+            if now < self.next_purge:
+                return
+            self.next_purge = now + self.purge_interval
+        try:
+            with self.session_factory() as session:
+                session.execute(delete(ProcessedRequest).where(ProcessedRequest.created_at < self._cutoff()))
+                session.commit()
+                size = session.query(ProcessedRequest).count()
+            with self.lock:
+                self.size = size
+        except Exception as e:
+            logger.error(f"Errore nella pulizia delle richieste processate: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {'size': self.size}
+
+
+class RequestInProgressError(Exception):
+    pass
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+
+class _Stripe:
+    # Risposte delle ultime richieste completate, per chi ha letto lo store appena prima.
+    RECENT_SIZE = 64
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.recent = collections.OrderedDict()
+        self.waits = 0
+        self.timeouts = 0
+
+
+class InProgressRequests:
+    """
+    Traccia le richieste in esecuzione su questa replica, con lock suddivisi in
+    `stripes` gruppi in base all'hash del request_id. Un duplicato che arriva mentre
+    la prima richiesta è ancora in corso ne attende il risultato invece di rieseguirla;
+    se la prima richiesta fallisce, uno dei duplicati in attesa prende il suo posto.
+    """
+    def __init__(self, store, stripes=64, wait_timeout=30):
+        self.store = store
+        self.stripes = [_Stripe() for _ in range(stripes)]
+        self.wait_timeout = wait_timeout
+
+    def _stripe(self, request_id):
+        return self.stripes[hash(request_id) % len(self.stripes)]
+
+    def begin(self, request_id):
+        """
+        Restituisce (risposta, None) se il request_id è già stato elaborato, altrimenti
+        (None, flight): il chiamante esegue la richiesta e poi chiama complete o abandon.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        stripe = self._stripe(request_id)
+        while True:
+            response = self.store.get(request_id)
+            if response is not None:
+                return response, None
+            with stripe.lock:
+                # La richiesta potrebbe essere stata completata su questa replica tra la
+                # lettura dello store e la prenotazione: la risposta è tra le recenti.
+                response = stripe.recent.get(request_id)
+                if response is not None:
+                    return response, None
+                flight = stripe.pending.get(request_id)
+                owner = flight is None
+                if owner:
+                    flight = _Flight()
+                    stripe.pending[request_id] = flight
+                else:
+                    stripe.waits += 1
+
+            if owner:
+                return None, flight
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not flight.event.wait(remaining):
+                with stripe.lock:
+                    stripe.timeouts += 1
+                raise RequestInProgressError(request_id)
+            if flight.response is not None:
+                return flight.response, None
+
+    def _finish(self, request_id, flight, response):
+        stripe = self._stripe(request_id)
+        with stripe.lock:
+            if stripe.pending.get(request_id) is flight:
+                del stripe.pending[request_id]
+            if response is not None:
+                stripe.recent[request_id] = response
+                if len(stripe.recent) > stripe.RECENT_SIZE:
+                    stripe.recent.popitem(last=False)
+            flight.response = response
+        flight.event.set()
+
+    def complete(self, request_id, flight, response):
+        self.store.put(request_id, response)
+        self._finish(request_id, flight, response)
+
+    def abandon(self, request_id, flight):
+        """
+        Rilascia la prenotazione senza risposta; non fa nulla se è già stata completata.
+        """
+        if flight is not None and not flight.event.is_set():
+            self._finish(request_id, flight, None)
+
+    def stats(self):
+        in_progress = waits = timeouts = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                in_progress += len(stripe.pending)
+                waits += stripe.waits
+                timeouts += stripe.timeouts
+        return {'in_progress': in_progress, 'waits': waits, 'timeouts': timeouts}
+
+
+def create_idempotency_store(kind, session_factory, maxsize=10000, ttl=600, shards=16):
+    """
+    Crea lo store configurato tramite IDEMPOTENCY_STORE ('memory', 'sharded' o 'database').
+    """
+    kind = (kind or 'sharded').lower()
+    if kind == 'memory':
+        return InMemoryIdempotencyStore(maxsize, ttl)
+    if kind == 'sharded':
+        return ShardedIdempotencyStore(maxsize, ttl, shards)
+    if kind == 'database':
+        return DatabaseIdempotencyStore(session_factory, ttl)
+    raise ValueError(f"Store di idempotenza sconosciuto: {kind}")
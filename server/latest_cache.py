@@ -0,0 +1,135 @@
+import threading
+import time
+
+
+class LatestValue:
+    def __init__(self, ticker, value, timestamp):
+        self.ticker = ticker
+        self.value = value
+        self.timestamp = timestamp
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LatestValueCache:
+    """
+    Cache ticker -> ultimo valore disponibile.
+
+    I nuovi valori arrivano con put() dal feed dei prezzi, quindi una voce resta valida
+    per `ttl` secondi dal caricamento (o dall'ultimo put()) indipendentemente dall'età
+    del dato: con il rilevamento dei prezzi invariati il collector può non scrivere un
+    ticker per ore. Il TTL serve solo a limitare l'obsolescenza se il feed si ferma.
+    Più richieste concorrenti per lo stesso ticker mancante producono una sola query
+    (single-flight).
+    """
+    def __init__(self, loader, ttl=180, maxsize=10000):
+        self.loader = loader
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _store(self, latest):
+        if latest.ticker not in self.entries and len(self.entries) >= self.maxsize:
+            self.entries.pop(next(iter(self.entries)))
+            self.evictions += 1
+        self.entries[latest.ticker] = (latest, time.monotonic() + self.ttl)
+
+    def _store_if_newer(self, latest):
+        """
+        Salva `latest` a meno che la cache contenga già un valore più recente,
+        e restituisce il valore rimasto in cache.
+        """
+        entry = self.entries.get(latest.ticker)
+        if entry is not None and entry[0].timestamp > latest.timestamp:
+            return entry[0]
+        self._store(latest)
+        return latest
+
+    def _fresh(self, ticker):
+        entry = self.entries.get(ticker)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            del self.entries[ticker]
+            self.evictions += 1
+        return None
+
+    def peek(self, ticker):
+        """
+        Restituisce il valore in cache se ancora valido, senza caricarlo dal database.
+        """
+        with self.lock:
+            latest = self._fresh(ticker)
+            if latest is None:
+                self.misses += 1
+            return latest
+
+    def get(self, ticker):
+        """
+        Restituisce l'ultimo valore del ticker (LatestValue) oppure None se non ci sono dati.
+        """
+        with self.lock:
+            latest = self._fresh(ticker)
+            if latest is not None:
+                return latest
+            flight = self.inflight.get(ticker)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = _Flight()
+                self.inflight[ticker] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self.loader(ticker)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(ticker, None)
+                if flight.error is None and flight.result is not None:
+                    # Un put() arrivato durante il caricamento può aver già salvato un valore più recente.
+                    flight.result = self._store_if_newer(flight.result)
+            flight.event.set()
+        return flight.result
+
+    def put(self, latest):
+        """
+        Aggiorna la voce con un valore appena scritto, se è più recente di quello in cache.
+        """
+        with self.lock:
+            self._store_if_newer(latest)
+
+    def invalidate(self, ticker):
+        with self.lock:
+            self.entries.pop(ticker, None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,138 @@
+import inspect
+import time
+
+import grpc
+
+from common import metrics
+
+RPC_DURATION = metrics.histogram(
+    'grpc_server_handling_seconds', "Durata delle RPC unarie per metodo", ('method',))
+RPC_HANDLED = metrics.counter(
+    'grpc_server_handled', "RPC completate per metodo e codice di stato", ('method', 'code'))
+STREAMS_ACTIVE = metrics.gauge(
+    'grpc_server_streams_active', "Stream server-side aperti per metodo", ('method',))
+
+
+def _code(context):
+    # ServicerContext.code() restituisce None se l'handler non ha impostato un codice.
+    code = getattr(context, 'code', lambda: None)()
+    if isinstance(code, grpc.StatusCode):
+        return code.name
+    return 'OK' if code is None else str(code)
+
+
+def _method_name(handler_call_details):
+    return handler_call_details.method.rsplit('/', 1)[-1]
+
+
+class _Series:
+    def __init__(self, method, streaming):
+        self.method = method
+        if streaming:
+            self.streams = STREAMS_ACTIVE.labels(method)
+        else:
+            self.duration = RPC_DURATION.labels(method)
+        self.handled = {}
+
+    def record(self, context, start, failed=False):
+        self.duration.observe(time.perf_counter() - start)
+        self.count(context, failed)
+
+    def count(self, context, failed=False):
+        code = 'UNKNOWN' if failed else _code(context)
+        counter = self.handled.get(code)
+        if counter is None:
+            counter = self.handled[code] = RPC_HANDLED.labels(self.method, code)
+        counter.inc()
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """
+    Registra durata e codice di stato di ogni RPC del server a thread.
+    """
+    def __init__(self):
+        self.series = {}
+
+    def _series(self, handler_call_details, handler):
+        method = _method_name(handler_call_details)
+        series = self.series.get(method)
+        if series is None:
+            series = self.series.setdefault(method, _Series(method, handler.unary_stream is not None))
+        return series
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        series = self._series(handler_call_details, handler)
+        if handler.unary_unary:
+            behavior = handler.unary_unary
+
+            def unary_unary(request, context):
+                start = time.perf_counter()
+                try:
+                    response = behavior(request, context)
+                except Exception:
+                    series.record(context, start, failed=True)
+                    raise
+                series.record(context, start)
+                return response
+            return handler._replace(unary_unary=unary_unary)
+        if handler.unary_stream:
+            behavior = handler.unary_stream
+
+            def unary_stream(request, context):
+                series.streams.inc()
+                try:
+                    yield from behavior(request, context)
+                finally:
+                    series.streams.dec()
+                    series.count(context)
+            return handler._replace(unary_stream=unary_stream)
+        return handler
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    """
+    Come MetricsInterceptor, per il server grpc.aio. Le RPC non ridefinite in
+    AsyncUserService hanno handler sincroni e vengono misurate allo stesso modo.
+    """
+    def __init__(self):
+        self.sync = MetricsInterceptor()
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        series = self.sync._series(handler_call_details, handler)
+        if handler.unary_unary:
+            behavior = handler.unary_unary
+            if not inspect.iscoroutinefunction(behavior):
+                return self.sync.intercept_service(lambda _: handler, handler_call_details)
+
+            async def unary_unary(request, context):
+                start = time.perf_counter()
+                try:
+                    response = await behavior(request, context)
+                except Exception:
+                    series.record(context, start, failed=True)
+                    raise
+                series.record(context, start)
+                return response
+            return handler._replace(unary_unary=unary_unary)
+        if handler.unary_stream:
+            behavior = handler.unary_stream
+            if not inspect.isasyncgenfunction(behavior):
+                return self.sync.intercept_service(lambda _: handler, handler_call_details)
+
+            async def unary_stream(request, context):
+                series.streams.inc()
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                finally:
+                    series.streams.dec()
+                    series.count(context)
+            return handler._replace(unary_stream=unary_stream)
+        return handler
+
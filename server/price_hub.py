@@ -0,0 +1,196 @@
+import asyncio
+import collections
+import logging
+import threading
+
+from sqlalchemy import func, select
+
+from common import models
+from common.database import SessionLocal
+import service_pb2
+
+logger = logging.getLogger(__name__)
+
+
+class PriceUpdate:
+    def __init__(self, row_id, ticker, value, timestamp, dropped=0):
+        self.row_id = row_id
+        self.ticker = ticker
+        self.value = value
+        self.timestamp = timestamp
+        self.dropped = dropped
+
+
+def price_update_message(update):
+    """
+    Messaggio PriceUpdate per un LatestValue o un PriceUpdate del feed.
+    """
+    return service_pb2.PriceUpdate(
+        ticker=update.ticker,
+        value=update.value,
+        timestamp=update.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        dropped=getattr(update, 'dropped', 0),
+    )
+
+
+class Subscription:
+    """
+    Coda limitata di aggiornamenti per un singolo sottoscrittore. Se il client è lento
+    e la coda è piena viene scartato l'aggiornamento più vecchio: il numero di
+    aggiornamenti persi viene riportato nel successivo aggiornamento consegnato.
+    """
+    def __init__(self, ticker, max_pending):
+        self.ticker = ticker
+        self.max_pending = max_pending
+        self.queue = collections.deque()
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def _notify(self):
+        self.condition.notify_all()
+
+    def offer(self, update):
+        with self.condition:
+            if len(self.queue) >= self.max_pending:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(update)
+            self._notify()
+
+    def _pop(self):
+        update = self.queue.popleft()
+        dropped, self.dropped = self.dropped, 0
+        return PriceUpdate(update.row_id, update.ticker, update.value, update.timestamp, dropped)
+
+    def next(self, timeout=None):
+        """
+        Restituisce il prossimo aggiornamento, oppure None allo scadere del timeout.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.queue or self.closed, timeout)
+            if self.queue:
+                return self._pop()
+            return None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self._notify()
+
+
+class AsyncSubscription(Subscription):
+    """
+    Sottoscrizione consumata da un handler grpc.aio: il thread del feed sveglia
+    l'event loop senza bloccarlo.
+    """
+    def __init__(self, ticker, max_pending, loop):
+        super().__init__(ticker, max_pending)
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def _notify(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def next_async(self, timeout=None):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        with self.condition:
+            self.event.clear()
+            if self.queue:
+                update = self._pop()
+                if self.queue:
+                    self.event.set()
+                return update
+            return None
+
+
+class PriceHub:
+    """
+    Feed unico dei nuovi prezzi per tutto il server: un thread interroga periodicamente
+    financial_data oltre l'ultimo id visto e distribuisce i record ai sottoscrittori
+    del ticker e ai listener registrati (cache). Con N sottoscrittori il costo resta
+    di una query per intervallo.
+    """
+    def __init__(self, poll_interval=2.0, max_pending=16, batch_size=5000):
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.subscriptions = collections.defaultdict(set)
+        self.listeners = []
+        self.high_water_mark = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def subscribe(self, ticker, loop=None):
+        if loop is None:
+            subscription = Subscription(ticker, self.max_pending)
+        else:
+            subscription = AsyncSubscription(ticker, self.max_pending, loop)
+        with self.lock:
+            self.subscriptions[ticker].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self.lock:
+            subscribers = self.subscriptions.get(subscription.ticker)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[subscription.ticker]
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self.subscriptions.values())
+
+    def publish(self, update):
+        for callback in self.listeners:
+            try:
+                callback(update)
+            except Exception as e:
+                logger.error(f"Errore in un listener del feed prezzi: {e}")
+        with self.lock:
+            subscribers = list(self.subscriptions.get(update.ticker, ()))
+        for subscription in subscribers:
+            subscription.offer(update)
+
+    def poll_once(self):
+        with SessionLocal() as session:
+            if self.high_water_mark is None:
+                self.high_water_mark = session.execute(select(func.max(models.FinancialData.id))).scalar() or 0
+                return 0
+            rows = session.execute(
+                select(models.FinancialData.id, models.FinancialData.ticker,
+                       models.FinancialData.value, models.FinancialData.timestamp)
+                .where(models.FinancialData.id > self.high_water_mark)
+                .order_by(models.FinancialData.id)
+                .limit(self.batch_size)
+            ).all()
+        for row_id, ticker, value, timestamp in rows:
+            self.publish(PriceUpdate(row_id, ticker, value, timestamp))
+            self.high_water_mark = row_id
+        return len(rows)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                if self.poll_once() >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Errore nel feed dei prezzi: {e}")
+            self.stopped.wait(self.poll_interval)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True, name='price-hub')
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
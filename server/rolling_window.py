@@ -0,0 +1,145 @@
+import threading
+
+from cachetools import LRUCache
+from sqlalchemy import func, select
+
+from common import models
+
+
+class RollingWindow:
+    """
+    Ultimi `capacity` valori di un ticker in un buffer circolare con somme prefisse:
+    la media degli ultimi k valori costa O(1), indipendentemente da k.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        # cumulative[n % (capacity + 1)] = somma dei primi n valori inseriti
+        self.cumulative = [0.0] * (capacity + 1)
+        self.last_id = 0
+        self.last_timestamp = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, row_id, value, timestamp):
+        with self.lock:
+            if row_id <= self.last_id:
+                return
+            total = self.cumulative[self.count % (self.capacity + 1)]
+            self.count += 1
+            self.cumulative[self.count % (self.capacity + 1)] = total + value
+            self.last_id = row_id
+            self.last_timestamp = timestamp
+
+    def average(self, k):
+        """
+        Media degli ultimi k valori, oppure None se il buffer non ne contiene abbastanza.
+        """
+        with self.lock:
+            if k <= 0 or k > len(self):
+                return None
+            size = self.capacity + 1
+            newest = self.cumulative[self.count % size]
+            oldest = self.cumulative[(self.count - k) % size]
+            return (newest - oldest) / k
+
+
+def average_statement(ticker, count):
+    """
+    Media degli ultimi `count` valori calcolata dal database con AVG su una sottoquery.
+    """
+    latest_rows = select(models.FinancialData.value)\
+        .where(models.FinancialData.ticker == ticker)\
+        .order_by(models.FinancialData.timestamp.desc())\
+        .limit(count)\
+        .subquery()
+    return select(func.avg(latest_rows.c.value))
+
+
+def sql_average(session, ticker, count):
+    return session.execute(average_statement(ticker, count)).scalar()
+
+
+class RollingAverages:
+    """
+    Finestre mobili per ticker usate da GetAverageValue. Una finestra viene caricata
+    al primo utilizzo e riallineata con i soli record nuovi quando la cache degli
+    ultimi valori segnala un dato più recente. Le richieste che eccedono la finestra
+    ripiegano su sql_average().
+    """
+    def __init__(self, latest_cache, capacity=20, maxsize=10000):
+        self.latest_cache = latest_cache
+        self.capacity = capacity
+        self.windows = LRUCache(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.window_hits = 0
+        self.sql_fallbacks = 0
+
+    def _rows(self, session, ticker, after_id=None):
+        query = session.query(models.FinancialData.id, models.FinancialData.value, models.FinancialData.timestamp)\
+            .filter_by(ticker=ticker)
+        if after_id is None:
+            rows = query.order_by(models.FinancialData.timestamp.desc()).limit(self.capacity).all()
+            return list(reversed(rows))
+        return query.filter(models.FinancialData.id > after_id).order_by(models.FinancialData.id).all()
+
+    def _window(self, session, ticker, latest):
+        with self.lock:
+            window = self.windows.get(ticker)
+        if window is None:
+            window = RollingWindow(self.capacity)
+            for row_id, value, timestamp in self._rows(session, ticker):
+                window.append(row_id, value, timestamp)
+            with self.lock:
+                window = self.windows.setdefault(ticker, window)
+        elif window.last_timestamp is None or latest.timestamp > window.last_timestamp:
+            for row_id, value, timestamp in self._rows(session, ticker, after_id=window.last_id):
+                window.append(row_id, value, timestamp)
+        return window
+
+    def append(self, ticker, row_id, value, timestamp):
+        """
+        Aggiunge un valore appena scritto alla finestra del ticker, se è già in memoria.
+        """
+        with self.lock:
+            window = self.windows.get(ticker)
+        if window is not None:
+            window.append(row_id, value, timestamp)
+
+    def cached_average(self, ticker, latest, count):
+        """
+        Media servita solo dalla memoria: None se la finestra manca, è indietro
+        rispetto a `latest` o non contiene abbastanza valori.
+        """
+        with self.lock:
+            window = self.windows.get(ticker)
+        if window is None or window.last_timestamp is None or latest.timestamp > window.last_timestamp:
+            return None
+        average = window.average(count)
+        if average is not None:
+            self.window_hits += 1
+        return average
+
+    def average(self, session, ticker, count, latest=None):
+        """
+        Media degli ultimi `count` valori del ticker, oppure None se non ci sono dati.
+        `latest` è l'ultimo valore del ticker, se il chiamante lo ha già ottenuto.
+        """
+        if count <= 0:
+            return None
+        latest = latest or self.latest_cache.get(ticker)
+        if latest is None:
+            return None
+        average = self._window(session, ticker, latest).average(count)
+        if average is not None:
+            self.window_hits += 1
+            return average
+        self.sql_fallbacks += 1
+        return sql_average(session, ticker, count)
+
+    def stats(self):
+        with self.lock:
+            return {'windows': len(self.windows), 'window_hits': self.window_hits,
+                    'sql_fallbacks': self.sql_fallbacks}
@@ -1,24 +1,191 @@
 from concurrent import futures
+import asyncio
+import datetime
 import grpc
 import time
 import re
-import threading
-from cachetools import TTLCache
 import logging
-from common.database import SessionLocal, engine
-from common import models
+import os
+import threading
+from common.database import SessionLocal, async_pool_status, engine, pool_status
+from common import metrics, models, queries
+from common.migrations import init_db
+from common.symbol_catalog import SymbolCatalog
 import service_pb2
 import service_pb2_grpc
+from async_server import AsyncHandlersMixin
+from latest_cache import LatestValue, LatestValueCache
+from price_hub import PriceHub, price_update_message
+from rolling_window import RollingAverages
+from user_cache import UserTickerCache, create_invalidation_channel
+from idempotency import InProgressRequests, RequestInProgressError, create_idempotency_store
+from metrics_interceptor import AsyncMetricsInterceptor, MetricsInterceptor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-models.Base.metadata.create_all(bind=engine)
+init_db(engine)
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'threads').lower()
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '50051'))
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', '10'))
+METRICS_PORT = 8000
+# Validità di una voce della cache degli ultimi valori: i nuovi prezzi arrivano dal feed,
+# il TTL limita solo l'obsolescenza se il feed si ferma.
+LATEST_CACHE_TTL = float(os.environ.get('LATEST_CACHE_TTL', os.environ.get('COLLECTION_INTERVAL', '180')))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+USER_CACHE_INVALIDATION = os.environ.get('USER_CACHE_INVALIDATION', 'none')
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '1000'))
+MAX_STATS_WINDOW_DAYS = int(os.environ.get('MAX_STATS_WINDOW_DAYS', '3650'))
+# Di default la finestra coincide con la profondità di retention del cleaner,
+# così le medie servite dalla memoria restano coerenti con quelle del database.
+AVERAGE_WINDOW_SIZE = int(os.environ.get('AVERAGE_WINDOW_SIZE', os.environ.get('RETENTION_DEPTH', '20')))
+PRICE_FEED_INTERVAL = float(os.environ.get('PRICE_FEED_INTERVAL', '2'))
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('SUBSCRIBER_QUEUE_SIZE', '16'))
+# Con SERVER_MODE=threads ogni stream aperto occupa un thread del pool: il limite
+# lascia libera almeno metà dei SERVER_WORKERS per le altre RPC.
+MAX_STREAM_SUBSCRIPTIONS = int(os.environ.get('MAX_STREAM_SUBSCRIPTIONS', str(max(1, SERVER_WORKERS // 2))))
+IDEMPOTENCY_STORE = os.environ.get('IDEMPOTENCY_STORE', 'sharded')
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000'))
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', '600'))
+IDEMPOTENCY_SHARDS = int(os.environ.get('IDEMPOTENCY_SHARDS', '16'))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', '30'))
+
+
+def load_latest_value(ticker):
+    """
+    Legge dal database l'ultimo valore disponibile per il ticker.
+    """
+    session = SessionLocal()
+    try:
+        latest_data = session.query(models.FinancialData)\
+            .filter_by(ticker=ticker)\
+            .order_by(models.FinancialData.timestamp.desc())\
+            .first()
+        if latest_data is None:
+            return None
+        return LatestValue(latest_data.ticker, latest_data.value, latest_data.timestamp)
+    finally:
+        session.close()
 
 class UserService(service_pb2_grpc.UserServiceServicer):
     def __init__(self):
-        self.request_cache = TTLCache(maxsize=10000, ttl=600)  
-        self.cache_lock = threading.Lock()
+        self.idempotency = create_idempotency_store(
+            IDEMPOTENCY_STORE,
+            SessionLocal,
+            maxsize=IDEMPOTENCY_CACHE_SIZE,
+            ttl=IDEMPOTENCY_TTL,
+            shards=IDEMPOTENCY_SHARDS,
+        )
+        self.in_progress = InProgressRequests(
+            self.idempotency,
+            stripes=IDEMPOTENCY_SHARDS,
+            wait_timeout=IDEMPOTENCY_WAIT_TIMEOUT,
+        )
+        self.latest_cache = LatestValueCache(load_latest_value, ttl=LATEST_CACHE_TTL)
+        self.user_cache = UserTickerCache(
+            maxsize=USER_CACHE_SIZE,
+            channel=create_invalidation_channel(USER_CACHE_INVALIDATION, engine),
+        )
+        self.rolling_averages = RollingAverages(self.latest_cache, capacity=AVERAGE_WINDOW_SIZE)
+        self.symbols = SymbolCatalog()
+        self.price_hub = PriceHub(poll_interval=PRICE_FEED_INTERVAL, max_pending=SUBSCRIBER_QUEUE_SIZE)
+        self.stream_slots = threading.BoundedSemaphore(MAX_STREAM_SUBSCRIPTIONS)
+        self.price_hub.add_listener(self.on_new_price)
+        self.price_hub.start()
+
+    def on_new_price(self, update):
+        """
+        Propaga alle cache un record appena letto dal feed dei prezzi.
+        """
+        self.latest_cache.put(LatestValue(update.ticker, update.value, update.timestamp))
+        self.rolling_averages.append(update.ticker, update.row_id, update.value, update.timestamp)
+
+    def begin_request(self, request_id, context):
+        """
+        Restituisce (risposta, None) per un request_id già elaborato, attendendo se la
+        prima richiesta è ancora in corso, altrimenti (None, flight) per eseguirla.
+        """
+        try:
+            message, flight = self.in_progress.begin(request_id)
+        except RequestInProgressError:
+            logger.info(f"Richiesta con request id {request_id} ancora in elaborazione")
+            context.set_details("Una richiesta con lo stesso request id è ancora in elaborazione")
+            context.set_code(grpc.StatusCode.ABORTED)
+            return None, None
+        if flight is None:
+            logger.info(f"Ho trovato una richiesta con request id duplicato: {request_id}")
+        return message, flight
+
+    def get_user_ticker(self, session, email):
+        """
+        Risolve l'email nel ticker dell'utente passando dalla cache; None se l'utente non esiste.
+        """
+        def load(email):
+            user = session.query(models.User).filter_by(email=email).first()
+            return user.ticker if user else None
+        return self.user_cache.get(email, load)
+
+    def resolve_user_tickers(self, session, emails):
+        """
+        Risolve più email in una volta: email -> ticker (None se l'utente non esiste),
+        con al più una query per gli utenti non presenti in cache.
+        """
+        resolved, missing = {}, {}
+        for email in dict.fromkeys(emails):
+            found, ticker, generation = self.user_cache.lookup(email)
+            if found:
+                resolved[email] = ticker
+            else:
+                missing[email] = generation
+        if missing:
+            loaded = queries.users_tickers(session, list(missing))
+            for email, generation in missing.items():
+                self.user_cache.store(email, loaded.get(email), generation)
+                resolved[email] = loaded.get(email)
+        return resolved
+
+    def batch_targets(self, session, request):
+        """
+        Coppie (email, ticker) richieste da una RPC batch: prima le email, poi i ticker diretti.
+        """
+        tickers_by_email = self.resolve_user_tickers(session, request.emails)
+        targets = [(email, tickers_by_email[email]) for email in request.emails]
+        targets.extend(("", ticker) for ticker in request.tickers)
+        return targets
+
+    def check_batch_size(self, request, context):
+        size = len(request.emails) + len(request.tickers)
+        if size > MAX_BATCH_SIZE:
+            context.set_details(f"Troppi elementi nella richiesta: {size} (massimo {MAX_BATCH_SIZE}).")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return False
+        return True
+
+    def window_bounds(self, request, context):
+        """
+        Inizio e fine (UTC) della finestra richiesta, oppure None se non valida.
+        """
+        if request.window_seconds <= 0 or request.window_seconds > MAX_STATS_WINDOW_DAYS * 86400:
+            context.set_details(f"Finestra non valida: deve essere tra 1 secondo e {MAX_STATS_WINDOW_DAYS} giorni.")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return None
+        end = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return end - datetime.timedelta(seconds=request.window_seconds), end
+
+    def window_stats_response(self, request, ticker, stats, end):
+        return service_pb2.GetWindowStatsResponse(
+            email=request.email,
+            ticker=ticker,
+            average_value=stats.average,
+            min_value=stats.minimum,
+            max_value=stats.maximum,
+            stddev=stats.stddev,
+            samples=stats.samples,
+            start=stats.start.strftime("%Y-%m-%d %H:%M:%S"),
+            end=end.strftime("%Y-%m-%d %H:%M:%S"),
+            resolution=stats.resolution,
+        )
 
     def is_valid_email(self, email):
         regex = r'^[\w\.-]+@[\w\.-]+\.\w+$'
@@ -31,18 +198,21 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             return service_pb2.RegisterUserResponse()
 
 
-        with self.cache_lock:
-            if request.request_id in self.request_cache:
-                logger.info(f"Ho trovato una richiesta con request id duplicato: {request.request_id}")
-                message = self.request_cache[request.request_id]
-                return service_pb2.RegisterUserResponse(message=message)
+        message, flight = self.begin_request(request.request_id, context)
+        if flight is None:
+            return service_pb2.RegisterUserResponse(message=message)
 
 
         if not self.is_valid_email(request.email):
             logger.info(f"Formato email non valido: {request.email}")
             message = "Formato email non valido."
-            with self.cache_lock:
-                self.request_cache[request.request_id] = message
+            self.in_progress.complete(request.request_id, flight, message)
+            return service_pb2.RegisterUserResponse(message=message)
+
+        if self.symbols.is_known_invalid(request.ticker):
+            logger.info(f"Ticker non valido: {request.ticker}")
+            message = "Ticker non valido."
+            self.in_progress.complete(request.request_id, flight, message)
             return service_pb2.RegisterUserResponse(message=message)
 
         session = SessionLocal()
@@ -55,11 +225,11 @@ class UserService(service_pb2_grpc.UserServiceServicer):
                 new_user = models.User(email=request.email, ticker=request.ticker)
                 session.add(new_user)
                 session.commit()
+                self.user_cache.invalidate(request.email)
                 message = "Registrazione avvenuta con successo!"
                 logger.info(f"User registered: {request.email}")
                 
-            with self.cache_lock:
-                self.request_cache[request.request_id] = message
+            self.in_progress.complete(request.request_id, flight, message)
 
             return service_pb2.RegisterUserResponse(message=message)
         except Exception as e:
@@ -70,6 +240,7 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             return service_pb2.RegisterUserResponse()
         finally:
             session.close()
+            self.in_progress.abandon(request.request_id, flight)
 
     def UpdateUser(self, request, context):
         if not request.request_id:
@@ -77,18 +248,21 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
             return service_pb2.UpdateUserResponse()
 
-        with self.cache_lock:
-            if request.request_id in self.request_cache:
-                logger.info(f"Ho trovato una richiesta con request id duplicato: {request.request_id}")
-                message = self.request_cache[request.request_id]
-                return service_pb2.UpdateUserResponse(message=message)
+        message, flight = self.begin_request(request.request_id, context)
+        if flight is None:
+            return service_pb2.UpdateUserResponse(message=message)
 
 
         if not self.is_valid_email(request.email):
             logger.info(f"Formato email non valido: {request.email}")
             message = "Formato email non valido."
-            with self.cache_lock:
-                self.request_cache[request.request_id] = message
+            self.in_progress.complete(request.request_id, flight, message)
+            return service_pb2.UpdateUserResponse(message=message)
+
+        if self.symbols.is_known_invalid(request.ticker):
+            logger.info(f"Ticker non valido: {request.ticker}")
+            message = "Ticker non valido."
+            self.in_progress.complete(request.request_id, flight, message)
             return service_pb2.UpdateUserResponse(message=message)
 
         session = SessionLocal()
@@ -101,14 +275,14 @@ class UserService(service_pb2_grpc.UserServiceServicer):
                 else:
                     user.ticker = request.ticker
                     session.commit()
+                    self.user_cache.invalidate(request.email)
                     message = "Utente aggiornato correttamente!"
                     logger.info(f"Utente aggiornato: {request.email}")
             else:
                 message = "Utente non trovato."
                 logger.info(f"Utente non trovato: {request.email}")
 
-            with self.cache_lock:
-                self.request_cache[request.request_id] = message
+            self.in_progress.complete(request.request_id, flight, message)
 
             return service_pb2.UpdateUserResponse(message=message)
         except Exception as e:
@@ -119,6 +293,7 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             return service_pb2.UpdateUserResponse()
         finally:
             session.close()
+            self.in_progress.abandon(request.request_id, flight)
 
     def DeleteUser(self, request, context):
 
@@ -127,17 +302,14 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
             return service_pb2.DeleteUserResponse()
 
-        with self.cache_lock:
-            if request.request_id in self.request_cache:
-                logger.info(f"Ho trovato una richiesta con request id duplicato: {request.request_id}")
-                message = self.request_cache[request.request_id]
-                return service_pb2.DeleteUserResponse(message=message)
+        message, flight = self.begin_request(request.request_id, context)
+        if flight is None:
+            return service_pb2.DeleteUserResponse(message=message)
 
         if not self.is_valid_email(request.email):
             logger.info(f"Formato email non valido: {request.email}")
             message = "Formato email non valido."
-            with self.cache_lock:
-                self.request_cache[request.request_id] = message
+            self.in_progress.complete(request.request_id, flight, message)
             return service_pb2.DeleteUserResponse(message=message)
 
         session = SessionLocal()
@@ -146,14 +318,14 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             if user:
                 session.delete(user)
                 session.commit()
+                self.user_cache.invalidate(request.email)
                 message = "Utente cancellato correttamente"
                 logger.info(f"Utente cancellato: {request.email}")
             else:
                 message = "Utente non trovato"
                 logger.info(f"Utente non trovato: {request.email}")
 
-            with self.cache_lock:
-                self.request_cache[request.request_id] = message
+            self.in_progress.complete(request.request_id, flight, message)
 
             return service_pb2.DeleteUserResponse(message=message)
         except Exception as e:
@@ -164,6 +336,7 @@ class UserService(service_pb2_grpc.UserServiceServicer):
             return service_pb2.DeleteUserResponse()
         finally:
             session.close()
+            self.in_progress.abandon(request.request_id, flight)
 
     def LoginUser(self, request, context):
         """
@@ -175,8 +348,8 @@ class UserService(service_pb2_grpc.UserServiceServicer):
 
         session = SessionLocal()
         try:
-            user = session.query(models.User).filter_by(email=request.email).first()
-            if user:
+            ticker = self.get_user_ticker(session, request.email)
+            if ticker is not None:
                 message = "Login avvenuto con successo!"
                 logger.info(f"L'utente ha acceduto come: {request.email}")
                 success = True
@@ -193,25 +366,33 @@ class UserService(service_pb2_grpc.UserServiceServicer):
         finally:
             session.close()
 
+    def CheckTicker(self, request, context):
+        """
+        Esito della verifica di un ticker nel catalogo dei simboli del server, aggiornato
+        dal data collector: TICKER_UNKNOWN se il ticker non è ancora stato verificato.
+        """
+        valid = self.symbols.lookup(request.ticker)
+        if valid is None:
+            status = service_pb2.TICKER_UNKNOWN
+        else:
+            status = service_pb2.TICKER_VALID if valid else service_pb2.TICKER_INVALID
+        return service_pb2.CheckTickerResponse(ticker=request.ticker, status=status)
+
     def GetLatestValue(self, request, context):
         """
         Recupera l'ultimo valore finanziario disponibile per l'utente.
         """
         session = SessionLocal()
         try:
-            user = session.query(models.User).filter_by(email=request.email).first()
-            if not user:
+            ticker = self.get_user_ticker(session, request.email)
+            if ticker is None:
                 return service_pb2.GetLatestValueResponse(
                     email=request.email,
                     ticker="",
                     value=0.0,
                     timestamp=""
                 )
-            ticker = user.ticker
-            latest_data = session.query(models.FinancialData)\
-                .filter_by(ticker=ticker)\
-                .order_by(models.FinancialData.timestamp.desc())\
-                .first()
+            latest_data = self.latest_cache.get(ticker)
             if latest_data:
                 return service_pb2.GetLatestValueResponse(
                     email=request.email,
@@ -237,22 +418,15 @@ class UserService(service_pb2_grpc.UserServiceServicer):
         """
         session = SessionLocal()
         try:
-            user = session.query(models.User).filter_by(email=request.email).first()
-            if not user:
+            ticker = self.get_user_ticker(session, request.email)
+            if ticker is None:
                 context.set_details("Utente non trovato.")
                 context.set_code(grpc.StatusCode.NOT_FOUND)
                 return service_pb2.GetAverageValueResponse()
 
-            ticker = user.ticker
-
-            data = session.query(models.FinancialData)\
-                .filter_by(ticker=ticker)\
-                .order_by(models.FinancialData.timestamp.desc())\
-                .limit(request.count)\
-                .all()
+            average_value = self.rolling_averages.average(session, ticker, request.count)
 
-            if data and len(data) > 0:
-                average_value = sum(entry.value for entry in data) / len(data)
+            if average_value is not None:
                 return service_pb2.GetAverageValueResponse(
                     email=request.email,
                     ticker=ticker,
@@ -271,15 +445,195 @@ class UserService(service_pb2_grpc.UserServiceServicer):
         finally:
             session.close()
 
-def serve():
+    def GetWindowStats(self, request, context):
+        """
+        Media, minimo, massimo e deviazione standard dei valori del ticker dell'utente
+        negli ultimi window_seconds secondi, calcolati nel database.
+        """
+        bounds = self.window_bounds(request, context)
+        if bounds is None:
+            return service_pb2.GetWindowStatsResponse()
+        start, end = bounds
+        session = SessionLocal()
+        try:
+            ticker = self.get_user_ticker(session, request.email)
+            if ticker is None:
+                context.set_details("Utente non trovato.")
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                return service_pb2.GetWindowStatsResponse()
+
+            stats = queries.window_stats(session, [ticker], start, end).get(ticker)
+            if stats is None:
+                context.set_details(f"Nessun valore disponibile per il ticker {ticker} nella finestra richiesta.")
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                return service_pb2.GetWindowStatsResponse()
+            return self.window_stats_response(request, ticker, stats, end)
+        except Exception as e:
+            logger.error(f"Errore nel calcolo delle statistiche sulla finestra: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.GetWindowStatsResponse()
+        finally:
+            session.close()
+
+    def GetLatestValues(self, request, context):
+        """
+        Ultimo valore per più utenti o ticker con un numero costante di query.
+        """
+        if not self.check_batch_size(request, context):
+            return service_pb2.GetLatestValuesResponse()
+        session = SessionLocal()
+        try:
+            targets = self.batch_targets(session, request)
+            latest, missing = {}, []
+            for ticker in {ticker for _, ticker in targets if ticker is not None}:
+                cached = self.latest_cache.peek(ticker)
+                if cached is not None:
+                    latest[ticker] = cached
+                else:
+                    missing.append(ticker)
+            for ticker, (value, timestamp) in queries.latest_values(session, missing).items():
+                latest[ticker] = LatestValue(ticker, value, timestamp)
+                self.latest_cache.put(latest[ticker])
+
+            items = []
+            for email, ticker in targets:
+                if ticker is None:
+                    items.append(service_pb2.LatestValueItem(email=email, status=service_pb2.USER_NOT_FOUND))
+                elif ticker not in latest:
+                    items.append(service_pb2.LatestValueItem(email=email, ticker=ticker, status=service_pb2.NO_DATA))
+                else:
+                    items.append(service_pb2.LatestValueItem(
+                        email=email,
+                        ticker=ticker,
+                        value=latest[ticker].value,
+                        timestamp=latest[ticker].timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                        status=service_pb2.OK
+                    ))
+            return service_pb2.GetLatestValuesResponse(items=items)
+        except Exception as e:
+            logger.error(f"Errore nel recuperare gli ultimi valori: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.GetLatestValuesResponse()
+        finally:
+            session.close()
+
+    def GetAverageValues(self, request, context):
+        """
+        Media degli ultimi X valori per più utenti o ticker con un numero costante di query.
+        """
+        if not self.check_batch_size(request, context):
+            return service_pb2.GetAverageValuesResponse()
+        session = SessionLocal()
+        try:
+            targets = self.batch_targets(session, request)
+            averages, missing = {}, []
+            for ticker in {ticker for _, ticker in targets if ticker is not None}:
+                latest = self.latest_cache.peek(ticker)
+                average = None
+                if latest is not None and request.count > 0:
+                    average = self.rolling_averages.cached_average(ticker, latest, request.count)
+                if average is not None:
+                    averages[ticker] = average
+                else:
+                    missing.append(ticker)
+            averages.update(queries.average_values(session, missing, request.count))
+
+            items = []
+            for email, ticker in targets:
+                if ticker is None:
+                    items.append(service_pb2.AverageValueItem(email=email, status=service_pb2.USER_NOT_FOUND))
+                elif ticker not in averages:
+                    items.append(service_pb2.AverageValueItem(email=email, ticker=ticker, status=service_pb2.NO_DATA))
+                else:
+                    items.append(service_pb2.AverageValueItem(
+                        email=email,
+                        ticker=ticker,
+                        average_value=averages[ticker],
+                        status=service_pb2.OK
+                    ))
+            return service_pb2.GetAverageValuesResponse(items=items)
+        except Exception as e:
+            logger.error(f"Errore nel calcolare le medie: {e}")
+            context.set_details(f'Errore: {str(e)}')
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return service_pb2.GetAverageValuesResponse()
+        finally:
+            session.close()
+
+    def SubscribePrices(self, request, context):
+        """
+        Invia in streaming i nuovi valori del ticker dell'utente, a partire dall'ultimo
+        disponibile. Ogni stream aperto occupa un thread del pool del server, quindi
+        oltre MAX_STREAM_SUBSCRIPTIONS stream contemporanei la richiesta viene
+        rifiutata con RESOURCE_EXHAUSTED.
+        """
+        session = SessionLocal()
+        try:
+            ticker = self.get_user_ticker(session, request.email)
+        finally:
+            session.close()
+        if ticker is None:
+            context.set_details("Utente non trovato.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return
+        if not self.stream_slots.acquire(blocking=False):
+            context.set_details(f"Troppe sottoscrizioni attive (massimo {MAX_STREAM_SUBSCRIPTIONS}).")
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            return
+
+        subscription = self.price_hub.subscribe(ticker)
+        context.add_callback(subscription.close)
+        try:
+            latest = self.latest_cache.get(ticker)
+            if latest is not None:
+                yield price_update_message(latest)
+            while context.is_active():
+                update = subscription.next(timeout=1.0)
+                if update is not None and (latest is None or update.timestamp > latest.timestamp):
+                    yield price_update_message(update)
+        finally:
+            self.price_hub.unsubscribe(subscription)
+            self.stream_slots.release()
+            logger.info(f"Sottoscrizione ai prezzi terminata: {request.email}")
+
+
+class AsyncUserService(AsyncHandlersMixin, UserService):
     """
-    Avvia il server gRPC e lo mantiene in esecuzione.
+    UserService per il server grpc.aio: stessa semantica, accesso asincrono al database.
+    """
+
+
+def register_service_metrics(service):
     """
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    service_pb2_grpc.add_UserServiceServicer_to_server(UserService(), server)
-    server.add_insecure_port('[::]:50051')
+    Espone sull'endpoint /metrics le statistiche delle cache, del feed dei prezzi
+    e del pool di connessioni.
+    """
+    metrics.register_stats('latest_cache', service.latest_cache.stats)
+    metrics.register_stats('user_cache', service.user_cache.stats)
+    metrics.register_stats('rolling_averages', service.rolling_averages.stats)
+    metrics.register_stats('idempotency_store', service.idempotency.stats)
+    metrics.register_stats('idempotency_requests', service.in_progress.stats)
+    metrics.register_stats('price_hub', lambda: {'subscribers': service.price_hub.subscriber_count()})
+    metrics.register_stats('symbol_catalog', service.symbols.stats)
+    metrics.register_stats('db_pool', pool_status)
+
+def serve_threads():
+    """
+    Avvia il server gRPC con un pool di thread e lo mantiene in esecuzione.
+    """
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=SERVER_WORKERS),
+        interceptors=[MetricsInterceptor()],
+    )
+    service = UserService()
+    service_pb2_grpc.add_UserServiceServicer_to_server(service, server)
+    register_service_metrics(service)
+    metrics.start_metrics_server(METRICS_PORT)
+    server.add_insecure_port(f'[::]:{SERVER_PORT}')
     server.start()
-    logger.info("gRPC Server sta funzionando nella porta 50051...")
+    logger.info(f"gRPC Server sta funzionando nella porta {SERVER_PORT}...")
     try:
         while True:
             time.sleep(86400) 
@@ -287,5 +641,39 @@ def serve():
         server.stop(0)
         logger.info("Hai fermato il server gRPC")
 
+async def serve_async():
+    """
+    Avvia il server grpc.aio: le RPC non ridefinite in AsyncUserService
+    vengono eseguite nel thread pool di migrazione.
+    """
+    server = grpc.aio.server(
+        migration_thread_pool=futures.ThreadPoolExecutor(max_workers=SERVER_WORKERS),
+        interceptors=[AsyncMetricsInterceptor()],
+    )
+    service = AsyncUserService()
+    service_pb2_grpc.add_UserServiceServicer_to_server(service, server)
+    register_service_metrics(service)
+    metrics.register_stats('db_pool_async', async_pool_status)
+    metrics.start_metrics_server(METRICS_PORT)
+    server.add_insecure_port(f'[::]:{SERVER_PORT}')
+    await server.start()
+    logger.info(f"gRPC Server (asyncio) sta funzionando nella porta {SERVER_PORT}...")
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(0)
+
+def serve():
+    """
+    Avvia il server nella modalità scelta con SERVER_MODE ('threads' o 'async').
+    """
+    if SERVER_MODE == 'async':
+        try:
+            asyncio.run(serve_async())
+        except KeyboardInterrupt:
+            logger.info("Hai fermato il server gRPC")
+    else:
+        serve_threads()
+
 if __name__ == '__main__':
     serve()
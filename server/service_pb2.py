@@ -24,37 +24,65 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rservice.proto\x12\x0cuser_service\"!\n\x10LoginUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\"5\n\x11LoginUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\"H\n\x13RegisterUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x12\n\nrequest_id\x18\x03 \x01(\t\"\'\n\x14RegisterUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"F\n\x11UpdateUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x12\n\nrequest_id\x18\x03 \x01(\t\"%\n\x12UpdateUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"6\n\x11\x44\x65leteUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\t\"%\n\x12\x44\x65leteUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"&\n\x15GetLatestValueRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\"Y\n\x16GetLatestValueResponse\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\x01\x12\x11\n\ttimestamp\x18\x04 \x01(\t\"6\n\x16GetAverageValueRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\r\n\x05\x63ount\x18\x02 \x01(\x05\"O\n\x17GetAverageValueResponse\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x15\n\raverage_value\x18\x03 \x01(\x01\x32\x91\x04\n\x0bUserService\x12U\n\x0cRegisterUser\x12!.user_service.RegisterUserRequest\x1a\".user_service.RegisterUserResponse\x12O\n\nUpdateUser\x12\x1f.user_service.UpdateUserRequest\x1a .user_service.UpdateUserResponse\x12O\n\nDeleteUser\x12\x1f.user_service.DeleteUserRequest\x1a .user_service.DeleteUserResponse\x12L\n\tLoginUser\x12\x1e.user_service.LoginUserRequest\x1a\x1f.user_service.LoginUserResponse\x12[\n\x0eGetLatestValue\x12#.user_service.GetLatestValueRequest\x1a$.user_service.GetLatestValueResponse\x12^\n\x0fGetAverageValue\x12$.user_service.GetAverageValueRequest\x1a%.user_service.GetAverageValueResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rservice.proto\x12\x0cuser_service\"!\n\x10LoginUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\"5\n\x11LoginUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\"$\n\x12\x43heckTickerRequest\x12\x0e\n\x06ticker\x18\x01 \x01(\t\"Q\n\x13\x43heckTickerResponse\x12\x0e\n\x06ticker\x18\x01 \x01(\t\x12*\n\x06status\x18\x02 \x01(\x0e\x32\x1a.user_service.TickerStatus\"H\n\x13RegisterUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x12\n\nrequest_id\x18\x03 \x01(\t\"\'\n\x14RegisterUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"F\n\x11UpdateUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x12\n\nrequest_id\x18\x03 \x01(\t\"%\n\x12UpdateUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"6\n\x11\x44\x65leteUserRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\t\"%\n\x12\x44\x65leteUserResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"&\n\x15GetLatestValueRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\"Y\n\x16GetLatestValueResponse\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\x01\x12\x11\n\ttimestamp\x18\x04 \x01(\t\"6\n\x16GetAverageValueRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\r\n\x05\x63ount\x18\x02 \x01(\x05\"O\n\x17GetAverageValueResponse\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x15\n\raverage_value\x18\x03 \x01(\x01\">\n\x15GetWindowStatsRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x16\n\x0ewindow_seconds\x18\x02 \x01(\x03\"\xc5\x01\n\x16GetWindowStatsResponse\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x15\n\raverage_value\x18\x03 \x01(\x01\x12\x11\n\tmin_value\x18\x04 \x01(\x01\x12\x11\n\tmax_value\x18\x05 \x01(\x01\x12\x0e\n\x06stddev\x18\x06 \x01(\x01\x12\x0f\n\x07samples\x18\x07 \x01(\x03\x12\r\n\x05start\x18\x08 \x01(\t\x12\x0b\n\x03\x65nd\x18\t \x01(\t\x12\x12\n\nresolution\x18\n \x01(\t\"9\n\x16GetLatestValuesRequest\x12\x0e\n\x06\x65mails\x18\x01 \x03(\t\x12\x0f\n\x07tickers\x18\x02 \x03(\t\"|\n\x0fLatestValueItem\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\x01\x12\x11\n\ttimestamp\x18\x04 \x01(\t\x12(\n\x06status\x18\x05 \x01(\x0e\x32\x18.user_service.ItemStatus\"G\n\x17GetLatestValuesResponse\x12,\n\x05items\x18\x01 \x03(\x0b\x32\x1d.user_service.LatestValueItem\"I\n\x17GetAverageValuesRequest\x12\x0e\n\x06\x65mails\x18\x01 \x03(\t\x12\x0f\n\x07tickers\x18\x02 \x03(\t\x12\r\n\x05\x63ount\x18\x03 \x01(\x05\"r\n\x10\x41verageValueItem\x12\r\n\x05\x65mail\x18\x01 \x01(\t\x12\x0e\n\x06ticker\x18\x02 \x01(\t\x12\x15\n\raverage_value\x18\x03 \x01(\x01\x12(\n\x06status\x18\x04 \x01(\x0e\x32\x18.user_service.ItemStatus\"I\n\x18GetAverageValuesResponse\x12-\n\x05items\x18\x01 \x03(\x0b\x32\x1e.user_service.AverageValueItem\"\'\n\x16SubscribePricesRequest\x12\r\n\x05\x65mail\x18\x01 \x01(\t\"P\n\x0bPriceUpdate\x12\x0e\n\x06ticker\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01\x12\x11\n\ttimestamp\x18\x03 \x01(\t\x12\x0f\n\x07\x64ropped\x18\x04 \x01(\x05*5\n\nItemStatus\x12\x06\n\x02OK\x10\x00\x12\x12\n\x0eUSER_NOT_FOUND\x10\x01\x12\x0b\n\x07NO_DATA\x10\x02*H\n\x0cTickerStatus\x12\x12\n\x0eTICKER_UNKNOWN\x10\x00\x12\x10\n\x0cTICKER_VALID\x10\x01\x12\x12\n\x0eTICKER_INVALID\x10\x02\x32\xdb\x07\n\x0bUserService\x12U\n\x0cRegisterUser\x12!.user_service.RegisterUserRequest\x1a\".user_service.RegisterUserResponse\x12O\n\nUpdateUser\x12\x1f.user_service.UpdateUserRequest\x1a .user_service.UpdateUserResponse\x12O\n\nDeleteUser\x12\x1f.user_service.DeleteUserRequest\x1a .user_service.DeleteUserResponse\x12L\n\tLoginUser\x12\x1e.user_service.LoginUserRequest\x1a\x1f.user_service.LoginUserResponse\x12R\n\x0b\x43heckTicker\x12 .user_service.CheckTickerRequest\x1a!.user_service.CheckTickerResponse\x12[\n\x0eGetLatestValue\x12#.user_service.GetLatestValueRequest\x1a$.user_service.GetLatestValueResponse\x12^\n\x0fGetAverageValue\x12$.user_service.GetAverageValueRequest\x1a%.user_service.GetAverageValueResponse\x12[\n\x0eGetWindowStats\x12#.user_service.GetWindowStatsRequest\x1a$.user_service.GetWindowStatsResponse\x12^\n\x0fGetLatestValues\x12$.user_service.GetLatestValuesRequest\x1a%.user_service.GetLatestValuesResponse\x12\x61\n\x10GetAverageValues\x12%.user_service.GetAverageValuesRequest\x1a&.user_service.GetAverageValuesResponse\x12T\n\x0fSubscribePrices\x12$.user_service.SubscribePricesRequest\x1a\x19.user_service.PriceUpdate0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_ITEMSTATUS']._serialized_start=1742
+  _globals['_ITEMSTATUS']._serialized_end=1795
+  _globals['_TICKERSTATUS']._serialized_start=1797
+  _globals['_TICKERSTATUS']._serialized_end=1869
   _globals['_LOGINUSERREQUEST']._serialized_start=31
   _globals['_LOGINUSERREQUEST']._serialized_end=64
   _globals['_LOGINUSERRESPONSE']._serialized_start=66
   _globals['_LOGINUSERRESPONSE']._serialized_end=119
-  _globals['_REGISTERUSERREQUEST']._serialized_start=121
-  _globals['_REGISTERUSERREQUEST']._serialized_end=193
-  _globals['_REGISTERUSERRESPONSE']._serialized_start=195
-  _globals['_REGISTERUSERRESPONSE']._serialized_end=234
-  _globals['_UPDATEUSERREQUEST']._serialized_start=236
-  _globals['_UPDATEUSERREQUEST']._serialized_end=306
-  _globals['_UPDATEUSERRESPONSE']._serialized_start=308
-  _globals['_UPDATEUSERRESPONSE']._serialized_end=345
-  _globals['_DELETEUSERREQUEST']._serialized_start=347
-  _globals['_DELETEUSERREQUEST']._serialized_end=401
-  _globals['_DELETEUSERRESPONSE']._serialized_start=403
-  _globals['_DELETEUSERRESPONSE']._serialized_end=440
-  _globals['_GETLATESTVALUEREQUEST']._serialized_start=442
-  _globals['_GETLATESTVALUEREQUEST']._serialized_end=480
-  _globals['_GETLATESTVALUERESPONSE']._serialized_start=482
-  _globals['_GETLATESTVALUERESPONSE']._serialized_end=571
-  _globals['_GETAVERAGEVALUEREQUEST']._serialized_start=573
-  _globals['_GETAVERAGEVALUEREQUEST']._serialized_end=627
-  _globals['_GETAVERAGEVALUERESPONSE']._serialized_start=629
-  _globals['_GETAVERAGEVALUERESPONSE']._serialized_end=708
-  _globals['_USERSERVICE']._serialized_start=711
-  _globals['_USERSERVICE']._serialized_end=1240
+  _globals['_CHECKTICKERREQUEST']._serialized_start=121
+  _globals['_CHECKTICKERREQUEST']._serialized_end=157
+  _globals['_CHECKTICKERRESPONSE']._serialized_start=159
+  _globals['_CHECKTICKERRESPONSE']._serialized_end=240
+  _globals['_REGISTERUSERREQUEST']._serialized_start=242
+  _globals['_REGISTERUSERREQUEST']._serialized_end=314
+  _globals['_REGISTERUSERRESPONSE']._serialized_start=316
+  _globals['_REGISTERUSERRESPONSE']._serialized_end=355
+  _globals['_UPDATEUSERREQUEST']._serialized_start=357
+  _globals['_UPDATEUSERREQUEST']._serialized_end=427
+  _globals['_UPDATEUSERRESPONSE']._serialized_start=429
+  _globals['_UPDATEUSERRESPONSE']._serialized_end=466
+  _globals['_DELETEUSERREQUEST']._serialized_start=468
+  _globals['_DELETEUSERREQUEST']._serialized_end=522
+  _globals['_DELETEUSERRESPONSE']._serialized_start=524
+  _globals['_DELETEUSERRESPONSE']._serialized_end=561
+  _globals['_GETLATESTVALUEREQUEST']._serialized_start=563
+  _globals['_GETLATESTVALUEREQUEST']._serialized_end=601
+  _globals['_GETLATESTVALUERESPONSE']._serialized_start=603
+  _globals['_GETLATESTVALUERESPONSE']._serialized_end=692
+  _globals['_GETAVERAGEVALUEREQUEST']._serialized_start=694
+  _globals['_GETAVERAGEVALUEREQUEST']._serialized_end=748
+  _globals['_GETAVERAGEVALUERESPONSE']._serialized_start=750
+  _globals['_GETAVERAGEVALUERESPONSE']._serialized_end=829
+  _globals['_GETWINDOWSTATSREQUEST']._serialized_start=831
+  _globals['_GETWINDOWSTATSREQUEST']._serialized_end=893
+  _globals['_GETWINDOWSTATSRESPONSE']._serialized_start=896
+  _globals['_GETWINDOWSTATSRESPONSE']._serialized_end=1093
+  _globals['_GETLATESTVALUESREQUEST']._serialized_start=1095
+  _globals['_GETLATESTVALUESREQUEST']._serialized_end=1152
+  _globals['_LATESTVALUEITEM']._serialized_start=1154
+  _globals['_LATESTVALUEITEM']._serialized_end=1278
+  _globals['_GETLATESTVALUESRESPONSE']._serialized_start=1280
+  _globals['_GETLATESTVALUESRESPONSE']._serialized_end=1351
+  _globals['_GETAVERAGEVALUESREQUEST']._serialized_start=1353
+  _globals['_GETAVERAGEVALUESREQUEST']._serialized_end=1426
+  _globals['_AVERAGEVALUEITEM']._serialized_start=1428
+  _globals['_AVERAGEVALUEITEM']._serialized_end=1542
+  _globals['_GETAVERAGEVALUESRESPONSE']._serialized_start=1544
+  _globals['_GETAVERAGEVALUESRESPONSE']._serialized_end=1617
+  _globals['_SUBSCRIBEPRICESREQUEST']._serialized_start=1619
+  _globals['_SUBSCRIBEPRICESREQUEST']._serialized_end=1658
+  _globals['_PRICEUPDATE']._serialized_start=1660
+  _globals['_PRICEUPDATE']._serialized_end=1740
+  _globals['_USERSERVICE']._serialized_start=1872
+  _globals['_USERSERVICE']._serialized_end=2859
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,173 @@
+import logging
+import select
+import threading
+
+from cachetools import LRUCache
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class LocalInvalidationChannel:
+    """
+    Canale di invalidazione in-process: sostituto locale di LISTEN/NOTIFY,
+    utile per far convivere più istanze del servizio nello stesso processo.
+    """
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback, on_reset=None):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def publish(self, email):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            callback(email)
+
+
+class PostgresInvalidationChannel:
+    """
+    Canale di invalidazione tra repliche basato su LISTEN/NOTIFY di Postgres.
+    Un thread dedicato resta in ascolto su una connessione separata. Le notifiche
+    inviate mentre il thread non è in ascolto vanno perse: a ogni (ri)connessione
+    viene quindi chiamato `on_reset` di ciascun iscritto, che svuota la propria cache.
+    """
+    def __init__(self, engine, channel='user_cache_invalidation'):
+        self.engine = engine
+        self.channel = channel
+        self.subscribers = []
+        self.resets = []
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def subscribe(self, callback, on_reset=None):
+        with self.lock:
+            self.subscribers.append(callback)
+            if on_reset is not None:
+                self.resets.append(on_reset)
+            if self.listener is None:
+                self.listener = threading.Thread(target=self._listen, daemon=True)
+                self.listener.start()
+
+    def publish(self, email):
+        with self.engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :email)"),
+                               {'channel': self.channel, 'email': email})
+
+    def _listen(self):
+        while True:
+            try:
+                connection = self.engine.raw_connection()
+                try:
+                    dbapi_connection = connection.dbapi_connection
+                    dbapi_connection.autocommit = True
+                    with dbapi_connection.cursor() as cursor:
+                        cursor.execute(f"LISTEN {self.channel}")
+                    with self.lock:
+                        resets = list(self.resets)
+                    for reset in resets:
+                        reset()
+                    while True:
+                        if select.select([dbapi_connection], [], [], 5) == ([], [], []):
+                            continue
+                        dbapi_connection.poll()
+                        while dbapi_connection.notifies:
+                            notify = dbapi_connection.notifies.pop(0)
+                            with self.lock:
+                                subscribers = list(self.subscribers)
+                            for callback in subscribers:
+                                callback(notify.payload)
+                finally:
+                    connection.invalidate()
+            except Exception as e:
+                logger.error(f"Errore nel canale di invalidazione, riconnessione in corso: {e}")
+                threading.Event().wait(5)
+
+
+class UserTickerCache:
+    """
+    Cache LRU email -> ticker. Le scritture sugli utenti la invalidano in modo
+    sincrono e, se è configurato un canale, notificano anche le altre repliche.
+    Un caricamento iniziato prima di un'invalidazione non viene salvato in cache.
+    """
+    def __init__(self, maxsize=10000, channel=None):
+        self.cache = LRUCache(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.channel = channel
+        if channel is not None:
+            channel.subscribe(self._drop, on_reset=self.clear)
+
+    def lookup(self, email):
+        """
+        Restituisce (trovato, ticker, generazione). La generazione va ripassata a store()
+        dopo aver caricato il ticker dal database.
+        """
+        with self.lock:
+            if email in self.cache:
+                self.hits += 1
+                return True, self.cache[email], self.generation
+            self.misses += 1
+            return False, None, self.generation
+
+    def store(self, email, ticker, generation):
+        if ticker is None:
+            return
+        with self.lock:
+            if generation == self.generation:
+                self.cache[email] = ticker
+
+    def get(self, email, loader):
+        """
+        Restituisce il ticker dell'utente oppure None se l'utente non esiste.
+        """
+        found, ticker, generation = self.lookup(email)
+        if found:
+            return ticker
+        ticker = loader(email)
+        self.store(email, ticker, generation)
+        return ticker
+
+    def _drop(self, email):
+        with self.lock:
+            self.generation += 1
+            self.cache.pop(email, None)
+
+    def clear(self):
+        """
+        Svuota la cache, ad esempio quando alcune invalidazioni potrebbero essere andate perse.
+        """
+        with self.lock:
+            self.generation += 1
+            self.cache.clear()
+
+    def invalidate(self, email):
+        self._drop(email)
+        if self.channel is not None:
+            try:
+                self.channel.publish(email)
+            except Exception as e:
+                logger.error(f"Impossibile notificare l'invalidazione di {email}: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.cache), 'hits': self.hits, 'misses': self.misses}
+
+
+def create_invalidation_channel(kind, engine):
+    """
+    Crea il canale configurato tramite USER_CACHE_INVALIDATION ('none', 'local' o 'postgres').
+    """
+    kind = (kind or 'none').lower()
+    if kind == 'none':
+        return None
+    if kind == 'local':
+        return LocalInvalidationChannel()
+    if kind == 'postgres':
+        return PostgresInvalidationChannel(engine)
+    raise ValueError(f"Canale di invalidazione sconosciuto: {kind}")